@@ -7,6 +7,12 @@ import json
 from typing import Any, Dict
 import config.settings as settings
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 RUNTIME_JSON_PATH = os.path.join(os.path.dirname(__file__), 'runtime_settings.json')
 
 _BOOLEAN_TRUE = {'1','true','t','yes','y','on','True','TRUE'}
@@ -84,20 +90,44 @@ def _coerce_type(key: str, new_value: Any):
     return str(new_value)
 
 
+def read_json_file(path: str) -> Any:
+    """Read a UTF-8 JSON file, parsing with orjson when available."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if HAS_ORJSON:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(raw.decode('utf-8'))
+
+
+def write_json_file(path: str, data: Any) -> None:
+    """Write data as indented UTF-8 JSON (non-ASCII kept as-is), using orjson when available."""
+    payload = None
+    if HAS_ORJSON:
+        try:
+            payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    if payload is None:
+        payload = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(payload)
+
+
 def load_runtime_settings() -> Dict[str, Any]:
     if not os.path.exists(RUNTIME_JSON_PATH):
         return {}
     try:
-        with open(RUNTIME_JSON_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return read_json_file(RUNTIME_JSON_PATH)
     except Exception:
         return {}
 
 
 def save_runtime_settings(data: Dict[str, Any]) -> None:
     os.makedirs(os.path.dirname(RUNTIME_JSON_PATH), exist_ok=True)
-    with open(RUNTIME_JSON_PATH, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    write_json_file(RUNTIME_JSON_PATH, data)
 
 
 def apply_to_settings(data: Dict[str, Any]) -> None:
@@ -3,6 +3,7 @@
 所有原始配置都在這裡，確保向後相容
 """
 import os
+import threading
 from datetime import datetime
 
 # =========== User Config ============
@@ -14,6 +15,8 @@ IGNORE_INDIRECT_CHANGES = True         # 忽略間接影響
 ENABLE_FORMULA_VALUE_CHECK = False
 # 為了效能，只對前 N 個公式儲存格（跨所有表合計）查詢 cached value，超過則跳過值比對
 MAX_FORMULA_VALUE_CELLS = 50000
+# 同時解析工作表的執行緒數（每個執行緒各自開啟 zip），1 表示逐一解析；一般 CPython 受 GIL 限制，free-threaded 版本才明顯受惠
+PARSE_WORKERS = 1
 ENABLE_BLACK_CONSOLE = True
 CONSOLE_POPUP_ON_COMPARISON = True
 CONSOLE_ALWAYS_ON_TOP = False           # 新增：是否始終置頂
@@ -27,6 +30,9 @@ SCAN_ALL_MODE = True
 SCAN_TARGET_FOLDERS = []
 MAX_CHANGES_TO_DISPLAY = 20 # 限制顯示的變更數量，0 表示不限制
 USE_LOCAL_CACHE = True
+# 解析前先把檔案複製到快取；設為 False（且非嚴格模式）時直接唯讀串流讀取原檔，省去整份複製，
+# 但原檔若在讀取期間被寫入，可能讀到不一致的內容
+USE_CACHE_COPY = True
 CACHE_FOLDER = r"C:\Users\user\Desktop\watchdog\cache_folder"
 # 嚴格模式：永不開原檔（copy 失敗則跳過處理）
 STRICT_NO_ORIGINAL_READ = True
@@ -35,7 +41,7 @@ COPY_RETRY_COUNT = 10
 COPY_RETRY_BACKOFF_SEC = 1.0
 # （可選）分塊複製的塊大小（MB），0 表示不用分塊特別處理
 COPY_CHUNK_SIZE_MB = 4
-# 複製完成後的短暫等待（秒），給檔案系統穩定
+# 複製完成後確認快取檔與來源大小一致的最長等待（秒）；大小一致即繼續，不再固定等待
 COPY_POST_SLEEP_SEC = 0.2
 # 複製前穩定性預檢：連續 N 次 mtime 不變才開始複製
 COPY_STABILITY_CHECKS = 5
@@ -84,7 +90,10 @@ WATCH_FOLDERS = [
 MANUAL_BASELINE_TARGET = []
 LOG_FOLDER = r"C:\Users\user\Desktop\watchdog\log_folder"
 LOG_FILE_DATE = datetime.now().strftime('%Y%m%d')
-CSV_LOG_FILE = os.path.join(LOG_FOLDER, f"excel_change_log_{LOG_FILE_DATE}.csv.gz")
+CSV_LOG_FILE = os.path.join(LOG_FOLDER, f"excel_change_log_{LOG_FILE_DATE}.csv.zst")  # 未安裝 zstandard 時自動改用 .csv.gz
+CSV_LOG_FLUSH_SEC = 2.0             # CSV 記錄在背景批次寫入的間隔（秒），每批寫成一個壓縮 frame
+CSV_LOG_BATCH_ROWS = 256            # 佇列累積達此行數時提早寫入
+ZSTD_LOG_DICT_PATH = ''            # CSV 記錄用的 zstd 字典（由 utils.compression.train_zstd_log_dictionary 產生）；留空則不用字典。解壓時需提供同一字典
 # Console 純文字日誌
 CONSOLE_TEXT_LOG_ENABLED = True
 CONSOLE_TEXT_LOG_FILE = os.path.join(LOG_FOLDER, f"console_log_{LOG_FILE_DATE}.txt")
@@ -120,9 +129,17 @@ DENSE_POLLING_INTERVAL_SEC = 10
 DENSE_POLLING_DURATION_SEC = 15
 SPARSE_POLLING_INTERVAL_SEC = 60
 SPARSE_POLLING_DURATION_SEC = 15
+# 執行到期輪詢檢查的工作執行緒數；排程執行緒只負責計時，比較在工作執行緒進行，不會拖慢其他檔案的排程
+POLLING_WORKERS = 2
+# 輪詢中的比較（_poll_for_stability）在子程序解析活頁簿：解析不佔用主程序的 GIL，多個檔案可並行；
+# 每次解析一個子程序，超時只結束該子程序；子程序沿用當時的設定值。靜默預覽與即時比較仍在本程序解析
+PARSE_IN_SUBPROCESS = False
+PARSE_PROCESS_WORKERS = 2
 
 # =========== 全局變數 ============
-current_processing_file = None
-processing_start_time = None
+# 正在解析的檔案 → 開始時間；多個執行緒可同時解析不同檔案，各自登記與移除
+processing_files = {}
 force_stop = False
+# 停止信號：signal_handler 設定 force_stop 時一併 set，主迴圈以 wait() 等待而非定時喚醒
+stop_event = threading.Event()
 baseline_completed = False
\ No newline at end of file
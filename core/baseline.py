@@ -20,7 +20,7 @@ from utils.compression import (
     get_compression_stats,
     migrate_baseline_format
 )
-from core.excel_parser import dump_excel_cells_with_timeout, hash_excel_content, get_excel_last_author
+from core.excel_parser import dump_excel_cells_with_timeout, hash_excel_content, hash_sheet_contents, get_excel_last_author, get_xlsx_zip_fingerprint
 
 def baseline_file_path(base_name):
     """
@@ -43,6 +43,90 @@ def get_baseline_file_with_extension(base_name):
     
     return None
 
+# 基準線路徑（不含副檔名）-> 記錄的來源檔 (source_size, source_mtime)；於本程序載入或保存基準線時更新，
+# 比較前可先以 stat 對照，毋須解壓整份基準線
+_source_stat_cache = {}
+# 基準線路徑（不含副檔名）-> 基準線記錄的 zip 指紋；同樣只在本程序載入或保存基準線時更新
+_zip_fingerprint_cache = {}
+
+def _record_source_stat(base_path, data):
+    if isinstance(data, dict) and 'source_size' in data and 'source_mtime' in data:
+        _source_stat_cache[base_path] = (data['source_size'], data['source_mtime'])
+    else:
+        _source_stat_cache.pop(base_path, None)
+    if isinstance(data, dict) and data.get('zip_fingerprint'):
+        _zip_fingerprint_cache[base_path] = data['zip_fingerprint']
+    else:
+        _zip_fingerprint_cache.pop(base_path, None)
+
+def get_baseline_source_stat(base_name):
+    """
+    取得基準線記錄的來源檔 (size, mtime)；本程序尚未載入或保存過該基準線、或基準線沒有記錄時回傳 None
+    """
+    return _source_stat_cache.get(baseline_file_path(base_name))
+
+def get_baseline_zip_fingerprint(base_name):
+    """
+    取得基準線記錄的 zip 指紋；本程序尚未載入或保存過該基準線、或基準線沒有記錄時回傳 None
+    """
+    return _zip_fingerprint_cache.get(baseline_file_path(base_name))
+
+# 基準線 cells 在磁碟上以欄式 (coords/formulas/values 平行陣列) 儲存，
+# 省去每格重複的 "formula"/"value" 鍵；載入時還原為原本的 {coord: {...}} 格式。
+# sorted_columns 的 coords 已按位址排序，即 sorted_addresses 本身，毋須另存一份
+_CELLS_LAYOUT_COLUMNS = 'columns'
+_CELLS_LAYOUT_SORTED_COLUMNS = 'sorted_columns'
+
+def _pack_cells(cells, sorted_addresses=None):
+    """
+    {sheet: {coord: {formula, value[, cached_value]}}} -> 每表平行陣列（coords 按位址排序）
+    sorted_addresses 與該表位址一致時直接沿用其次序，否則重新排序
+    """
+    packed = {}
+    sorted_addresses = sorted_addresses or {}
+    for ws_name, ws_cells in cells.items():
+        coords = sorted_addresses.get(ws_name)
+        if coords is None or len(coords) != len(ws_cells) or not all(c in ws_cells for c in coords):
+            coords = sorted(ws_cells)
+        cell_list = [ws_cells[c] for c in coords]
+        with_cached = sum(1 for c in cell_list if 'cached_value' in c)
+        if with_cached not in (0, len(cell_list)) or any(len(c) != 2 + (with_cached > 0) for c in cell_list):
+            # 欄位不一致的表維持原格式
+            packed[ws_name] = ws_cells
+            continue
+        cols = {
+            "coords": coords,
+            "formulas": [c.get('formula') for c in cell_list],
+            "values": [c.get('value') for c in cell_list],
+        }
+        if with_cached:
+            cols["cached"] = [c['cached_value'] for c in cell_list]
+        packed[ws_name] = cols
+    return packed
+
+def _unpack_cells(packed):
+    """
+    _pack_cells 的反向操作
+    """
+    cells = {}
+    for ws_name, cols in packed.items():
+        coords = cols.get('coords') if isinstance(cols.get('coords'), list) else None
+        if coords is None:
+            cells[ws_name] = cols
+            continue
+        cached = cols.get('cached')
+        if cached is not None:
+            cells[ws_name] = {
+                c: {"formula": f, "value": v, "cached_value": cv}
+                for c, f, v, cv in zip(coords, cols['formulas'], cols['values'], cached)
+            }
+        else:
+            cells[ws_name] = {
+                c: {"formula": f, "value": v}
+                for c, f, v in zip(coords, cols['formulas'], cols['values'])
+            }
+    return cells
+
 def load_baseline(baseline_file_or_base_name):
     """
     載入基準線檔案，支援多種壓縮格式
@@ -59,9 +143,19 @@ def load_baseline(baseline_file_or_base_name):
         # 使用壓縮工具載入
         from utils.compression import load_compressed_file
         data = load_compressed_file(base_path)
+        layout = data.pop('cells_layout', None) if isinstance(data, dict) else None
+        if layout in (_CELLS_LAYOUT_COLUMNS, _CELLS_LAYOUT_SORTED_COLUMNS):
+            packed = data.get('cells') or {}
+            data['cells'] = _unpack_cells(packed)
+            if layout == _CELLS_LAYOUT_SORTED_COLUMNS:
+                data['sorted_addresses'] = {
+                    ws: (cols['coords'] if isinstance(cols.get('coords'), list) else sorted(cols))
+                    for ws, cols in packed.items()
+                }
         
         # 移除所有 [DEBUG] 載入基準線的訊息
         
+        _record_source_stat(base_path, data)
         return data
         
     except (FileNotFoundError, PermissionError, OSError, json.JSONDecodeError, gzip.BadGzipFile) as e:
@@ -105,9 +199,16 @@ def save_baseline(baseline_file_or_base_name, data):
                     except OSError as e:
                         logging.warning(f"清理舊檔案失敗: {e}")
         
-        # 保存新檔案
+        _source_stat_cache.pop(base_path, None)
+        _zip_fingerprint_cache.pop(base_path, None)
+        # 保存新檔案 (cells 轉為按位址排序的欄式，sorted_addresses 由 coords 還原；不改動呼叫者的 data)
+        if isinstance(data.get('cells'), dict):
+            data = dict(data, cells=_pack_cells(data['cells'], data.get('sorted_addresses')),
+                        cells_layout=_CELLS_LAYOUT_SORTED_COLUMNS)
+            data.pop('sorted_addresses', None)
         # 移除： print(f"[DEBUG] 開始保存壓縮檔案...")
         actual_file = save_compressed_file(base_path, data, compression_format)
+        _record_source_stat(base_path, data)
         # 移除： print(f"[DEBUG] 保存完成: {actual_file}")
         
         # 簡化壓縮統計顯示
@@ -179,7 +280,8 @@ def create_baseline_for_files_robust(xlsx_files, skip_force_baseline=True):
     
     if progress and settings.ENABLE_RESUME:
         print(f"🔄 發現之前的進度記錄: 完成 {progress.get('completed', 0)}/{progress.get('total', 0)}")
-        if input("是否要從上次中斷的地方繼續? (y/n): ").strip().lower() == 'y':
+        from utils.logging import prompt_input
+        if prompt_input("是否要從上次中斷的地方繼續? (y/n): ").strip().lower() == 'y':
             start_index = progress.get('completed', 0)
     
     # 啟動超時處理
@@ -238,16 +340,27 @@ def create_baseline_for_files_robust(xlsx_files, skip_force_baseline=True):
             old_baseline = load_baseline(base_key)
             old_hash = old_baseline['content_hash'] if old_baseline and 'content_hash' in old_baseline else None
             
+            # zip 中央目錄指紋與舊基準線一致時內容未變，毋須解析活頁簿
+            zip_fingerprint = get_xlsx_zip_fingerprint(file_path)
+            if zip_fingerprint is not None and old_baseline and old_baseline.get('zip_fingerprint') == zip_fingerprint:
+                print(f"  結果: [SKIP] (Fingerprint unchanged)")
+                skip_count += 1
+                print(f"  耗時: {time.time() - file_start_time:.2f} 秒")
+                print("")
+                save_progress(i + 1, total)
+                continue
+            
             cell_data = dump_excel_cells_with_timeout(file_path)
             
             if cell_data is None:
-                if settings.current_processing_file is None and (time.time() - file_start_time) > settings.FILE_TIMEOUT_SECONDS:
+                if (time.time() - file_start_time) > settings.FILE_TIMEOUT_SECONDS:
                      print(f"  結果: [TIMEOUT]")
                 else:
                      print(f"  結果: [READ_ERROR]")
                 error_count += 1
             else:
-                curr_hash = hash_excel_content(cell_data)
+                sheet_hashes = hash_sheet_contents(cell_data)
+                curr_hash = hash_excel_content(cell_data, sheet_hashes=sheet_hashes)
                 if old_hash == curr_hash and old_hash is not None:
                     print(f"  結果: [SKIP] (Hash unchanged)")
                     skip_count += 1
@@ -258,6 +371,9 @@ def create_baseline_for_files_robust(xlsx_files, skip_force_baseline=True):
                         "source_size": os.path.getsize(file_path),
                         "last_author": curr_author, 
                         "content_hash": curr_hash, 
+                        "sheet_hashes": sheet_hashes,
+                        "zip_fingerprint": zip_fingerprint,
+                        "sorted_addresses": {ws: sorted(cells) for ws, cells in cell_data.items()},
                         "cells": cell_data
                     }
                     
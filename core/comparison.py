@@ -2,31 +2,81 @@
 比較和差異顯示功能 - 確保 TABLE 一定顯示
 """
 import os
-import csv
-import gzip
-import json
+import io
+import re
 import time
+import atexit
+import threading
+from collections import OrderedDict, deque
 from datetime import datetime
-from wcwidth import wcwidth
 import config.settings as settings
-from utils.logging import _get_display_width
-from utils.helpers import get_file_mtime
-from core.excel_parser import pretty_formula, extract_external_refs, get_excel_last_author
-from core.baseline import load_baseline, baseline_file_path
+from utils.helpers import get_file_mtime, format_ns
 import logging
-import hashlib
 import json as _json
 
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# 每個 code point 的顯示闊度快取（wcwidth 結果固定，可安全重用）
+_WIDTH_CACHE = {}
+
+def _widths(s):
+    """
+    回傳字串每個字元的顯示闊度列表（控制字元為 -1），透過 _WIDTH_CACHE 避免重複呼叫 wcwidth
+    """
+    cache = _WIDTH_CACHE
+    return [cache[o] if o in cache else _char_width(o) for o in map(ord, s)]
+
+def _char_width(o):
+    """
+    快取未命中時才載入 wcwidth 計算闊度
+    """
+    from wcwidth import wcwidth
+    w = _WIDTH_CACHE[o] = wcwidth(chr(o))
+    return w
+
+# 終端闊度快取：(取得時間, 闊度)，避免每次輸出表格都做系統呼叫
+_TERM_WIDTH_CACHE = (0.0, 120)
+_TERM_WIDTH_TTL_SEC = 2.0
+
+# 預先建立的空白字串，pad_line 直接索引取用
+_PAD = [' ' * i for i in range(512)]
+
+def _get_terminal_width():
+    """
+    取得終端闊度（快取 _TERM_WIDTH_TTL_SEC 秒），無法取得時使用 120
+    """
+    global _TERM_WIDTH_CACHE
+    ts, width = _TERM_WIDTH_CACHE
+    now = time.monotonic()
+    if now - ts > _TERM_WIDTH_TTL_SEC:
+        try:
+            width = os.get_terminal_size().columns
+        except OSError:
+            width = 120
+        _TERM_WIDTH_CACHE = (now, width)
+    return width
+
 # ... [print_aligned_console_diff 和其他輔助函數保持不變] ...
-def print_aligned_console_diff(old_data, new_data, file_info=None, max_display_changes=0):
+def print_aligned_console_diff(changes, file_info=None, max_display_changes=0):
     """
     三欄式顯示，能處理中英文對齊，並正確顯示 formula。
     Address 欄固定闊度，Baseline/Current 平均分配。
+    changes 為已排序的 (address, 舊值, 新值) 列表。
     """
-    try:
-        term_width = os.get_terminal_size().columns
-    except OSError:
-        term_width = 120
+    term_width = _get_terminal_width()
 
     address_col_width = 12
     separators_width = 4
@@ -35,30 +85,39 @@ def print_aligned_console_diff(old_data, new_data, file_info=None, max_display_c
     current_col_width = remaining_width - baseline_col_width
 
     def wrap_text(text, width):
+        s = str(text)
+        if s.isascii() and s.isprintable():
+            # 可列印 ASCII 每字元闊度皆為 1，直接按長度切割
+            step = max(width, 1)
+            return [s[i:i + step] for i in range(0, len(s), step)] or ['']
+        widths = _widths(s)
+        if widths and min(widths) < 0:
+            # 移除控制字元（闊度 < 0），令切片結果與逐字累加一致
+            s = ''.join(c for c, w in zip(s, widths) if w >= 0)
+            widths = [w for w in widths if w >= 0]
         lines = []
-        current_line = ""
+        start = 0
         current_width = 0
-        for char in str(text):
-            char_width = wcwidth(char)
-            if char_width < 0:
-                continue
-            if current_width + char_width > width:
-                lines.append(current_line)
-                current_line = char
-                current_width = char_width
-            else:
-                current_line += char
-                current_width += char_width
-        if current_line:
-            lines.append(current_line)
+        for i, char_width in enumerate(widths):
+            if current_width + char_width > width and i > start:
+                lines.append(s[start:i])
+                start = i
+                current_width = 0
+            current_width += char_width
+        if start < len(s):
+            lines.append(s[start:])
         return lines or ['']
 
     def pad_line(line, width):
-        line_width = _get_display_width(line)
-        if line_width is None:
-            line_width = len(str(line))
+        line = str(line)
+        if line.isascii() and line.isprintable():
+            line_width = len(line)
+        else:
+            line_width = sum(w for w in _widths(line) if w > 0)
         padding = width - line_width
-        return str(line) + ' ' * padding if padding > 0 else str(line)
+        if padding <= 0:
+            return line
+        return line + (_PAD[padding] if padding < len(_PAD) else ' ' * padding)
 
     def format_cell(cell_value):
         if cell_value is None or cell_value == {}:
@@ -73,8 +132,9 @@ def print_aligned_console_diff(old_data, new_data, file_info=None, max_display_c
                 return repr(cell_value["value"])
         return repr(cell_value)
     
+    rule = "=" * term_width
     print()
-    print("=" * term_width)
+    print(rule)
     if file_info:
         filename = file_info.get('filename', 'Unknown')
         worksheet = file_info.get('worksheet', '')
@@ -85,7 +145,7 @@ def print_aligned_console_diff(old_data, new_data, file_info=None, max_display_c
         caption = f"{event_str}{file_path} [Worksheet: {worksheet}]" if worksheet else f"{event_str}{file_path}"
         for cap_line in wrap_text(caption, term_width):
             print(cap_line)
-    print("=" * term_width)
+    print(rule)
 
     baseline_time = file_info.get('baseline_time', 'N/A')
     current_time = file_info.get('current_time', 'N/A')
@@ -98,19 +158,15 @@ def print_aligned_console_diff(old_data, new_data, file_info=None, max_display_c
     print(f"{header_addr} | {header_base} | {header_curr}")
     print("-" * term_width)
 
-    all_keys = sorted(list(set(old_data.keys()) | set(new_data.keys())))
-    if not all_keys:
+    if not changes:
         print("(No cell changes)")
     else:
         displayed_changes_count = 0
-        for key in all_keys:
+        for key, old_val, new_val in changes:
             if max_display_changes > 0 and displayed_changes_count >= max_display_changes:
-                print(f"...(僅顯示前 {max_display_changes} 個變更，總計 {len(all_keys)} 個變更)...")
+                print(f"...(僅顯示前 {max_display_changes} 個變更，總計 {len(changes)} 個變更)...")
                 break
 
-            old_val = old_data.get(key)
-            new_val = new_data.get(key)
-
             if old_val is not None and new_val is not None:
                 if old_val != new_val:
                     old_text = format_cell(old_val)
@@ -138,7 +194,7 @@ def print_aligned_console_diff(old_data, new_data, file_info=None, max_display_c
                 formatted_n = n_line
                 print(f"{formatted_a} | {formatted_o} | {formatted_n}")
             displayed_changes_count += 1
-    print("=" * term_width)
+    print(rule)
     print()
 
 def format_timestamp_for_display(timestamp_str):
@@ -154,115 +210,223 @@ def format_timestamp_for_display(timestamp_str):
         logging.error(f"格式化時間戳失敗: {timestamp_str}, 錯誤: {e}")
         return timestamp_str
 
+# 靜默預覽比較讀到的內容，供緊接其後的可見比較重用（同一檔案、stat 相同才採用），只保留一份
+_preview_slot = None  # (file_path, st_size, st_mtime_ns, cells)
+_preview_lock = threading.Lock()
+
+def _dump_current(file_path, is_polling):
+    """
+    解析目前內容：輪詢中的比較交給子程序（PARSE_IN_SUBPROCESS 開啟時），靜默預覽與即時比較仍在本程序解析
+    """
+    from core.excel_parser import dump_excel_cells_with_timeout, dump_excel_cells_in_subprocess
+    dump = dump_excel_cells_in_subprocess if is_polling else dump_excel_cells_with_timeout
+    return dump(file_path, show_sheet_detail=False, silent=True)
+
+def _read_current_cells(file_path, st, silent, is_polling=False):
+    """
+    讀取目前內容：可見比較優先取用剛才靜默預覽的結果；靜默預覽的結果則暫存一份
+    """
+    global _preview_slot
+    key = (file_path, st.st_size, st.st_mtime_ns) if st is not None else None
+    with _preview_lock:
+        slot, _preview_slot = _preview_slot, None
+    if not silent and key is not None and slot is not None and slot[:3] == key:
+        return slot[3]
+    current_data = _dump_current(file_path, is_polling)
+    if silent and key is not None and current_data:
+        with _preview_lock:
+            _preview_slot = key + (current_data,)
+    return current_data
+
+def _stat_matches_source(st, source):
+    """
+    stat 結果與基準線記錄的 (source_size, source_mtime) 是否一致（mtime 容許 MTIME_TOLERANCE_SEC 誤差）
+    """
+    if not source or source[0] is None or source[1] is None:
+        return False
+    try:
+        return (st.st_size == int(source[0])
+                and abs(st.st_mtime - float(source[1])) <= float(getattr(settings, 'MTIME_TOLERANCE_SEC', 2.0)))
+    except (TypeError, ValueError):
+        return False
+
 def compare_excel_changes(file_path, silent=False, event_number=None, is_polling=False):
     """
     [最終修正版] 統一日誌記錄和顯示邏輯
     """
     try:
-        from core.excel_parser import dump_excel_cells_with_timeout
+        from core.excel_parser import hash_excel_content, hash_sheet_contents, get_xlsx_zip_fingerprint, get_excel_last_author, ParseTimeoutError
+        from core.baseline import load_baseline, get_baseline_source_stat
         
         from utils.helpers import _baseline_key_for_path
         base_key = _baseline_key_for_path(file_path)
         
+        # 只做一次 stat，供快速跳過、作者快取與基準線更新共用
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            st = None
+        # 快速跳過：若與基準線的 mtime/size 一致（容差內），直接判定無變化；
+        # 本程序已載入或保存過該基準線時，先以記錄的 stat 對照，連基準線都毋須載入
+        quick_skip = settings.QUICK_SKIP_BY_STAT and st is not None
+        if quick_skip and _stat_matches_source(st, get_baseline_source_stat(base_key)):
+            if not silent:
+                print(f"[快速通過] {os.path.basename(file_path)} mtime/size 未變，略過讀取。")
+            return False
         old_baseline = load_baseline(base_key)
-        # 快速跳過：若與基準線的 mtime/size 一致（容差內），直接判定無變化
-        if settings.QUICK_SKIP_BY_STAT and old_baseline and \
-           ("source_mtime" in old_baseline) and ("source_size" in old_baseline):
-            try:
-                cur_mtime = os.path.getmtime(file_path)
-                cur_size  = os.path.getsize(file_path)
-                base_mtime = float(old_baseline.get("source_mtime", 0))
-                base_size  = int(old_baseline.get("source_size", -1))
-                if (cur_size == base_size) and (abs(cur_mtime - base_mtime) <= float(getattr(settings,'MTIME_TOLERANCE_SEC',2.0))):
-                    if not silent:
-                        print(f"[快速通過] {os.path.basename(file_path)} mtime/size 未變，略過讀取。")
-                    return False
-            except Exception:
-                pass
+        if quick_skip and old_baseline and \
+           _stat_matches_source(st, (old_baseline.get("source_size"), old_baseline.get("source_mtime"))):
+            if not silent:
+                print(f"[快速通過] {os.path.basename(file_path)} mtime/size 未變，略過讀取。")
+            return False
         if old_baseline is None:
             old_baseline = {}
 
-        current_data = dump_excel_cells_with_timeout(file_path, show_sheet_detail=False, silent=True)
-        if not current_data:
-            time.sleep(1)
-            current_data = dump_excel_cells_with_timeout(file_path, show_sheet_detail=False, silent=True)
+        # 第二道快速跳過：zip 中央目錄指紋一致代表內容未變，毋須解析活頁簿
+        zip_fingerprint = get_xlsx_zip_fingerprint(file_path)
+        if zip_fingerprint is not None and old_baseline.get('zip_fingerprint') == zip_fingerprint:
+            if not silent:
+                print(f"[快速通過] {os.path.basename(file_path)} zip 指紋未變，略過讀取。")
+            return False
+
+        try:
+            current_data = _read_current_cells(file_path, st, silent, is_polling)
             if not current_data:
-                if not silent:
-                    print(f"❌ 重試後仍無法讀取檔案: {os.path.basename(file_path)}")
-                return False
+                time.sleep(1)
+                current_data = _dump_current(file_path, is_polling)
+        except ParseTimeoutError:
+            # 子程序解析超時（已記錄錯誤）：同一檔案不再在本程序重試，留待下次事件或輪詢
+            if not silent:
+                print(f"⏰ 解析超時，略過本次比較: {os.path.basename(file_path)}")
+            return False
+        if not current_data:
+            if not silent:
+                print(f"❌ 重試後仍無法讀取檔案: {os.path.basename(file_path)}")
+            return False
         
         baseline_cells = old_baseline.get('cells', {})
-        if baseline_cells == current_data:
+        # 先以內容雜湊比對，相同則毋須逐格比較
+        current_sheet_hashes = hash_sheet_contents(current_data) or {}
+        current_hash = hash_excel_content(current_data, sheet_hashes=current_sheet_hashes)
+        hash_unchanged = current_hash is not None and old_baseline.get('content_hash') == current_hash
+        if hash_unchanged or baseline_cells == current_data:
+            # 內容未變但指紋或雜湊已不同（例如另存只改了 docProps）：更新基準線的指紋，之後的檢查即可快速通過；
+            # 靜默預覽不寫入任何東西，留給隨後的可見比較更新
+            if not silent and old_baseline and ((zip_fingerprint is not None and zip_fingerprint != old_baseline.get('zip_fingerprint'))
+                                                or not hash_unchanged):
+                refreshed = dict(old_baseline, content_hash=current_hash, sheet_hashes=current_sheet_hashes,
+                                 zip_fingerprint=zip_fingerprint)
+                if st is not None:
+                    refreshed["source_mtime"] = st.st_mtime
+                    refreshed["source_size"] = st.st_size
+                from core.baseline import save_baseline
+                save_baseline(base_key, refreshed)
             # 如果是輪詢且無變化，則不顯示任何內容
             if is_polling:
                 print(f"    [輪詢檢查] {os.path.basename(file_path)} 內容無變化。")
             return False
         
-        any_sheet_has_changes = False
-        
         old_author = old_baseline.get('last_author', 'N/A')
         try:
             new_author = get_excel_last_author(file_path)
         except Exception:
             new_author = 'Unknown'
 
+        old_sheet_hashes = old_baseline.get('sheet_hashes') or {}
+        changed_sheets = []
         for worksheet_name in set(baseline_cells.keys()) | set(current_data.keys()):
             old_ws = baseline_cells.get(worksheet_name, {})
             new_ws = current_data.get(worksheet_name, {})
             
+            old_sheet_hash = old_sheet_hashes.get(worksheet_name)
+            if old_sheet_hash is not None and old_sheet_hash == current_sheet_hashes.get(worksheet_name):
+                continue
             if old_ws == new_ws:
                 continue
+            changed_sheets.append((worksheet_name, old_ws, new_ws))
 
-            any_sheet_has_changes = True
-            
-            # 只有在非靜默模式下才顯示和記錄
-            if not silent:
-                baseline_timestamp = old_baseline.get('timestamp', 'N/A')
-                current_timestamp = get_file_mtime(file_path)
-                
-                # 準備顯示的資料
-                all_addresses = set(old_ws.keys()) | set(new_ws.keys())
-                display_old = {addr: old_ws.get(addr) for addr in all_addresses if old_ws.get(addr) != new_ws.get(addr)}
-                display_new = {addr: new_ws.get(addr) for addr in all_addresses if old_ws.get(addr) != new_ws.get(addr)}
-
-                # 確保比較表格一定顯示
-                print_aligned_console_diff(
-                    display_old,
-                    display_new,
-                    {
-                        'filename': os.path.basename(file_path),
-                        'file_path': file_path,
-                        'event_number': event_number,
-                        'worksheet': worksheet_name,
-                        'baseline_time': format_timestamp_for_display(baseline_timestamp),
-                        'current_time': format_timestamp_for_display(current_timestamp),
-                        'old_author': old_author,
-                        'new_author': new_author,
-                    },
-                    max_display_changes=settings.MAX_CHANGES_TO_DISPLAY
-                )
+        any_sheet_has_changes = bool(changed_sheets)
+        current_sorted_addresses = {}
+        
+        # 只有在非靜默模式下才顯示和記錄
+        if changed_sheets and not silent:
+            max_display_changes = settings.MAX_CHANGES_TO_DISPLAY
+            # 新基準線存 timestamp_ns（顯示時才格式化）；舊基準線只有 ISO 字串 timestamp
+            baseline_ns = old_baseline.get('timestamp_ns')
+            baseline_timestamp = format_ns(baseline_ns) if baseline_ns else old_baseline.get('timestamp', 'N/A')
+            current_timestamp = get_file_mtime(file_path)
+
+            # 基準線已存有各表排序好的位址，與本次排序結果合併即可，毋須再做集合聯集和排序
+            old_sorted_addresses = old_baseline.get('sorted_addresses') or {}
+            # 多個工作表有變更時，分析工作交給執行緒池；顯示與記錄仍按次序在本執行緒進行
+            pool = analyses = None
+            if len(changed_sheets) > 1:
+                from concurrent.futures import ThreadPoolExecutor
+                pool = ThreadPoolExecutor(max_workers=min(4, len(changed_sheets)))
+                analyses = [pool.submit(analyze_meaningful_changes, old_ws, new_ws)
+                            for _, old_ws, new_ws in changed_sheets]
+
+            try:
+                for idx, (worksheet_name, old_ws, new_ws) in enumerate(changed_sheets):
+                    # 準備顯示的資料：(位址, 舊值, 新值)，只取有差異的位址
+                    old_sorted = old_sorted_addresses.get(worksheet_name)
+                    if old_sorted is None or len(old_sorted) != len(old_ws):
+                        old_sorted = sorted(old_ws)
+                    new_sorted = current_sorted_addresses[worksheet_name] = sorted(new_ws)
+                    display_changes = []
+                    for addr in _merge_sorted_addresses(old_sorted, new_sorted):
+                        old_cell = old_ws.get(addr)
+                        new_cell = new_ws.get(addr)
+                        if old_cell != new_cell:
+                            display_changes.append((addr, old_cell, new_cell))
+
+                    # 確保比較表格一定顯示
+                    print_aligned_console_diff(
+                        display_changes,
+                        {
+                            'filename': os.path.basename(file_path),
+                            'file_path': file_path,
+                            'event_number': event_number,
+                            'worksheet': worksheet_name,
+                            'baseline_time': format_timestamp_for_display(baseline_timestamp),
+                            'current_time': format_timestamp_for_display(current_timestamp),
+                            'old_author': old_author,
+                            'new_author': new_author,
+                        },
+                        max_display_changes=max_display_changes
+                    )
                 
-                # 分析並記錄有意義的變更
-                meaningful_changes = analyze_meaningful_changes(old_ws, new_ws)
-                if meaningful_changes:
-                    # 只在非輪詢的第一次檢查時記錄日誌，避免重複
-                    if not is_polling:
-                        log_meaningful_changes_to_csv(file_path, worksheet_name, meaningful_changes, new_author)
+                    # 分析並記錄有意義的變更
+                    if analyses is not None:
+                        meaningful_changes = analyses[idx].result()
+                    else:
+                        meaningful_changes = analyze_meaningful_changes(old_ws, new_ws)
+                    if meaningful_changes:
+                        # 只在非輪詢的第一次檢查時記錄日誌，避免重複
+                        if not is_polling:
+                            log_meaningful_changes_to_csv(file_path, worksheet_name, meaningful_changes, new_author)
+            finally:
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
 
         # 任何可見的比較（非靜默）且確實有變更時，都即時更新基準線（包括輪詢中的可見比較）
         if any_sheet_has_changes and not silent:
             if settings.AUTO_UPDATE_BASELINE_AFTER_COMPARE:
                 print(f"🔄 自動更新基準線: {os.path.basename(file_path)}")
-                cur_mtime = os.path.getmtime(file_path)
-                cur_size  = os.path.getsize(file_path)
                 updated_baseline = {
                     "last_author": new_author,
-                    "content_hash": f"updated_{int(time.time())}",
+                    "content_hash": current_hash,
+                    "sheet_hashes": current_sheet_hashes,
+                    "zip_fingerprint": zip_fingerprint,
+                    "sorted_addresses": {ws: current_sorted_addresses.get(ws) or sorted(cells)
+                                         for ws, cells in current_data.items()},
                     "cells": current_data,
-                    "timestamp": datetime.now().isoformat(),
-                     "source_mtime": cur_mtime,
-                     "source_size": cur_size
+                    "timestamp_ns": time.time_ns(),
                 }
+                # 使用讀取前的 stat：若讀取期間檔案再被改動，下次比較不會被誤判為可快速跳過
+                if st is not None:
+                    updated_baseline["source_mtime"] = st.st_mtime
+                    updated_baseline["source_size"] = st.st_size
                 from core.baseline import save_baseline
                 if not save_baseline(base_key, updated_baseline):
                     print(f"[WARNING] 基準線更新失敗: {os.path.basename(file_path)}")
@@ -274,27 +438,55 @@ def compare_excel_changes(file_path, silent=False, event_number=None, is_polling
             logging.error(f"比較過程出錯: {e}")
         return False
 
+def _merge_sorted_addresses(a, b):
+    """
+    合併兩個已排序的位址列表（去除重複），結果等同 sorted(set(a) | set(b))
+    """
+    i = j = 0
+    len_a, len_b = len(a), len(b)
+    while i < len_a and j < len_b:
+        x, y = a[i], b[j]
+        if x < y:
+            yield x
+            i += 1
+        elif y < x:
+            yield y
+            j += 1
+        else:
+            yield x
+            i += 1
+            j += 1
+    yield from a[i:]
+    yield from b[j:]
+
 def analyze_meaningful_changes(old_ws, new_ws):
     """
     🧠 分析有意義的變更
     """
     meaningful_changes = []
-    all_addresses = set(old_ws.keys()) | set(new_ws.keys())
+    # 迴圈前一次過讀取設定，組成需略過的變更類型
+    skip_types = set()
+    if not settings.TRACK_FORMULA_CHANGES:
+        skip_types.add('FORMULA_CHANGE')
+    if not settings.TRACK_DIRECT_VALUE_CHANGES:
+        skip_types.add('DIRECT_VALUE_CHANGE')
+    if not settings.TRACK_EXTERNAL_REFERENCES:
+        skip_types.add('EXTERNAL_REF_UPDATE')
+    if settings.IGNORE_INDIRECT_CHANGES:
+        skip_types.add('INDIRECT_CHANGE')
+    # 先把每格投影成 tuple，再只挑出有差異的位址分類
+    old_items = {k: (v.get('formula'), v.get('value'), v.get('cached_value')) for k, v in old_ws.items()}
+    new_items = {k: (v.get('formula'), v.get('value'), v.get('cached_value')) for k, v in new_ws.items()}
+    changed = [k for k in (old_items.keys() | new_items.keys()) if old_items.get(k) != new_items.get(k)]
     
-    for addr in all_addresses:
+    for addr in changed:
         old_cell = old_ws.get(addr, {})
         new_cell = new_ws.get(addr, {})
-        
-        if old_cell == new_cell:
-            continue
 
         change_type = classify_change_type(old_cell, new_cell)
         
         # 根據設定過濾變更
-        if (change_type == 'FORMULA_CHANGE' and not settings.TRACK_FORMULA_CHANGES) or \
-           (change_type == 'DIRECT_VALUE_CHANGE' and not settings.TRACK_DIRECT_VALUE_CHANGES) or \
-           (change_type == 'EXTERNAL_REF_UPDATE' and not settings.TRACK_EXTERNAL_REFERENCES) or \
-           (change_type == 'INDIRECT_CHANGE' and settings.IGNORE_INDIRECT_CHANGES):
+        if change_type in skip_types:
             continue
 
         meaningful_changes.append({
@@ -308,28 +500,58 @@ def analyze_meaningful_changes(old_ws, new_ws):
     
     return meaningful_changes
 
+def _build_classify_table():
+    """
+    預先計算分類表：索引為 5-bit 狀態
+    (有舊格<<4)|(有新格<<3)|(公式相同<<2)|(值相同<<1)|(有公式)
+    None 代表需再檢查外部參照（EXTERNAL_REF_UPDATE / INDIRECT_CHANGE）
+    """
+    table = []
+    for state in range(32):
+        has_old = state & 0b10000
+        has_new = state & 0b01000
+        same_formula = state & 0b00100
+        same_value = state & 0b00010
+        has_formula = state & 0b00001
+        if not has_old and has_new:
+            table.append('CELL_ADDED')
+        elif has_old and not has_new:
+            table.append('CELL_DELETED')
+        elif not same_formula:
+            table.append('FORMULA_CHANGE')
+        elif not has_formula and not same_value:
+            table.append('DIRECT_VALUE_CHANGE')
+        elif has_formula and not same_value:
+            table.append(None)
+        else:
+            table.append('NO_CHANGE')
+    return tuple(table)
+
+_CLASSIFY = _build_classify_table()
+
 def classify_change_type(old_cell, new_cell):
     """
     🔍 分類變更類型
     """
-    old_val = old_cell.get('value')
-    new_val = new_cell.get('value')
     old_formula = old_cell.get('formula')
     new_formula = new_cell.get('formula')
-    
-    if not old_cell and new_cell: return 'CELL_ADDED'
-    if old_cell and not new_cell: return 'CELL_DELETED'
-    if old_formula != new_formula: return 'FORMULA_CHANGE'
-    if not old_formula and not new_formula and old_val != new_val: return 'DIRECT_VALUE_CHANGE'
-    if old_formula and new_formula and old_formula == new_formula and old_val != new_val:
+    state = ((bool(old_cell) << 4) | (bool(new_cell) << 3)
+             | ((old_formula == new_formula) << 2)
+             | ((old_cell.get('value') == new_cell.get('value')) << 1)
+             | bool(old_formula))
+    result = _CLASSIFY[state]
+    if result is None:
         return 'EXTERNAL_REF_UPDATE' if has_external_reference(old_formula) else 'INDIRECT_CHANGE'
-    return 'NO_CHANGE'
+    return result
+
+_EXTERNAL_REF_RE = re.compile(r"\['|!'")
 
 def has_external_reference(formula):
     if not formula: return False
-    return "['" in formula or "!'" in formula
+    return _EXTERNAL_REF_RE.search(formula) is not None
 
-_recent_log_signatures = {}
+# 去重簽名（64-bit 整數）-> 記錄時間；OrderedDict 保持時間順序，過期項目一律在最前
+_recent_log_signatures = OrderedDict()
 
 def log_meaningful_changes_to_csv(file_path, worksheet_name, changes, current_author):
     """
@@ -339,71 +561,187 @@ def log_meaningful_changes_to_csv(file_path, worksheet_name, changes, current_au
     if not current_author or current_author == 'N/A' or not changes:
         return
 
+    import csv
+    import hashlib
+
     # 構建變更的穩定簽名（檔名+表名+變更內容）
     try:
         # 規範化 changes 項目（避免相同內容不同順序造成簽名不同）
+        def _dumps(v):
+            if orjson is not None:
+                return orjson.dumps(v, option=orjson.OPT_SORT_KEYS)
+            return _json.dumps(v, ensure_ascii=False, sort_keys=True).encode('utf-8')
         def _norm(x):
             return (
-                str(x.get('address','')),
-                str(x.get('change_type','')),
-                _json.dumps(x.get('old_value', ''), ensure_ascii=False, sort_keys=True),
-                _json.dumps(x.get('new_value', ''), ensure_ascii=False, sort_keys=True),
-                str(x.get('old_formula','')),
-                str(x.get('new_formula','')),
+                str(x.get('address','')).encode('utf-8'),
+                str(x.get('change_type','')).encode('utf-8'),
+                _dumps(x.get('old_value', '')),
+                _dumps(x.get('new_value', '')),
+                str(x.get('old_formula','')).encode('utf-8'),
+                str(x.get('new_formula','')).encode('utf-8'),
             )
         normalized_changes = sorted([_norm(c) for c in (changes or [])])
-        payload = {
-            'file': os.path.abspath(file_path),
-            'sheet': worksheet_name,
-            'changes': normalized_changes,
-        }
-        sig = hashlib.md5(_json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+        # 直接把各欄位 bytes 逐段餵入 64-bit 雜湊，毋須再序列化整個 payload
+        h = xxhash.xxh3_64() if xxhash is not None else hashlib.blake2b(digest_size=8)
+        h.update(os.path.abspath(file_path).encode('utf-8'))
+        h.update(b'\x1e')
+        h.update(str(worksheet_name).encode('utf-8'))
+        for parts in normalized_changes:
+            h.update(b'\x1e')
+            for part in parts:
+                h.update(part)
+                h.update(b'\x1f')
+        sig = h.intdigest() if xxhash is not None else int.from_bytes(h.digest(), 'big')
         now = time.time()
         window = float(getattr(settings, 'LOG_DEDUP_WINDOW_SEC', 300))
-        # 清理過期的簽名
-        for k in list(_recent_log_signatures.keys()):
-            if now - _recent_log_signatures[k] > window:
-                _recent_log_signatures.pop(k, None)
+        # 清理過期的簽名：按寫入時間排序，只需從最舊一端移除
+        while _recent_log_signatures and now - next(iter(_recent_log_signatures.values())) > window:
+            _recent_log_signatures.popitem(last=False)
         # 如果簽名仍在時間窗內，跳過記錄
         if sig in _recent_log_signatures:
             return
         _recent_log_signatures[sig] = now
+        _recent_log_signatures.move_to_end(sig)
     except Exception:
         pass
 
     try:
-        os.makedirs(os.path.dirname(settings.CSV_LOG_FILE), exist_ok=True)
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        file_exists = os.path.exists(settings.CSV_LOG_FILE)
         
-        with gzip.open(settings.CSV_LOG_FILE, 'at', encoding='utf-8', newline='') as f:
-            writer = csv.writer(f)
-            
-            if not file_exists:
-                writer.writerow([
-                    'Timestamp', 'Filename', 'Worksheet', 'Cell', 'Change_Type',
-                    'Old_Value', 'New_Value', 'Old_Formula', 'New_Formula', 'Last_Author'
-                ])
-            
-            for change in changes:
-                writer.writerow([
-                    timestamp,
-                    os.path.basename(file_path),
-                    worksheet_name,
-                    change['address'],
-                    change['change_type'],
-                    change.get('old_value', ''),
-                    change.get('new_value', ''),
-                    change.get('old_formula', ''),
-                    change.get('new_formula', ''),
-                    current_author
-                ])
+        base_name = os.path.basename(file_path)
+        needs_quote = _CSV_NEEDS_QUOTE
+        lines = []
+        for change in changes:
+            row = [
+                timestamp,
+                base_name,
+                worksheet_name,
+                change['address'],
+                change['change_type'],
+                change.get('old_value', ''),
+                change.get('new_value', ''),
+                change.get('old_formula', ''),
+                change.get('new_formula', ''),
+                current_author
+            ]
+            # 常見情況毋須加引號，直接組字串；否則交由 csv.writer 處理
+            fields = ['' if x is None else str(x) for x in row]
+            if any(map(needs_quote, fields)):
+                buf = io.StringIO()
+                csv.writer(buf).writerow(row)
+                lines.append(buf.getvalue())
+            else:
+                lines.append(','.join(fields) + '\r\n')
+
+        # 只放入佇列，由背景執行緒批次寫入
+        _enqueue_csv_log_lines(_csv_log_path(), lines)
         
         print(f"📝 {len(changes)} 項變更已記錄到 CSV")
         
-    except (OSError, csv.Error) as e:
+    except csv.Error as e:
         logging.error(f"記錄有意義的變更到 CSV 時發生錯誤: {e}")
 
+# CSV 記錄佇列：(路徑, 已格式化的一行)；背景執行緒每 CSV_LOG_FLUSH_SEC 秒或累積 CSV_LOG_BATCH_ROWS 行時寫入一次
+_csv_log_queue = deque()
+_csv_log_lock = threading.Lock()
+_csv_log_wakeup = threading.Event()
+_csv_log_thread = None
+
+# csv.writer（QUOTE_MINIMAL）需要加引號的字元
+_CSV_NEEDS_QUOTE = re.compile(r'[,"\r\n]').search
+
+_CSV_HEADER = [
+    'Timestamp', 'Filename', 'Worksheet', 'Cell', 'Change_Type',
+    'Old_Value', 'New_Value', 'Old_Formula', 'New_Formula', 'Last_Author'
+]
+
+def _csv_log_path():
+    """
+    取得 CSV 記錄檔路徑；未安裝 zstandard 時 .zst 改為 .gz
+    """
+    path = settings.CSV_LOG_FILE
+    if zstd is None and path.endswith('.zst'):
+        path = path[:-len('.zst')] + '.gz'
+    return path
+
+_csv_log_dict = (None, None)  # (字典路徑, ZstdCompressionDict)
+
+def _load_csv_log_dict():
+    """
+    載入 settings.ZSTD_LOG_DICT_PATH 指定的 zstd 字典（按路徑快取），未設定或讀取失敗時回傳 None
+    """
+    global _csv_log_dict
+    dict_path = getattr(settings, 'ZSTD_LOG_DICT_PATH', '')
+    if not dict_path:
+        return None
+    if _csv_log_dict[0] != dict_path:
+        try:
+            with open(dict_path, 'rb') as f:
+                _csv_log_dict = (dict_path, zstd.ZstdCompressionDict(f.read()))
+        except (OSError, zstd.ZstdError) as e:
+            logging.warning(f"載入 CSV 記錄 zstd 字典失敗，改為不用字典: {dict_path}, {e}")
+            _csv_log_dict = (dict_path, None)
+    return _csv_log_dict[1]
+
+def _enqueue_csv_log_lines(path, lines):
+    """
+    把格式化好的 CSV 行放入佇列，必要時啟動背景寫入執行緒
+    """
+    global _csv_log_thread
+    _csv_log_queue.extend((path, line) for line in lines)
+    if _csv_log_thread is None:
+        with _csv_log_lock:
+            if _csv_log_thread is None:
+                _csv_log_thread = threading.Thread(target=_csv_log_worker, name="csv-log-writer", daemon=True)
+                _csv_log_thread.start()
+    if len(_csv_log_queue) >= int(getattr(settings, 'CSV_LOG_BATCH_ROWS', 256)):
+        _csv_log_wakeup.set()
+
+def _csv_log_worker():
+    """
+    背景執行緒：定時或被喚醒時把佇列寫入檔案
+    """
+    while True:
+        _csv_log_wakeup.wait(float(getattr(settings, 'CSV_LOG_FLUSH_SEC', 2.0)))
+        _csv_log_wakeup.clear()
+        flush_csv_log_queue()
+
+def _write_csv_log_batch(path, lines):
+    """
+    以單一壓縮 frame 追加寫入一批 CSV 行，新檔案會先寫入標題列
+    """
+    import gzip
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+    data = ''.join(lines)
+    if is_new:
+        data = ','.join(_CSV_HEADER) + '\r\n' + data
+    if path.endswith('.zst') and zstd is not None:
+        cctx = zstd.ZstdCompressor(level=settings.ZSTD_COMPRESSION_LEVEL, dict_data=_load_csv_log_dict())
+        with open(path, 'ab') as f:
+            f.write(cctx.compress(data.encode('utf-8')))
+    else:
+        with gzip.open(path, 'at', encoding='utf-8', newline='') as f:
+            f.write(data)
+
+def flush_csv_log_queue():
+    """
+    取出佇列中所有 CSV 行，按檔案分組後各自一次寫入
+    """
+    with _csv_log_lock:
+        batches = {}
+        while _csv_log_queue:
+            path, line = _csv_log_queue.popleft()
+            batches.setdefault(path, []).append(line)
+        for path, lines in batches.items():
+            try:
+                _write_csv_log_batch(path, lines)
+            except Exception as e:
+                logging.error(f"寫入 CSV 記錄檔失敗: {path}, 錯誤: {e}")
+
+atexit.register(flush_csv_log_queue)
+
 # 輔助函數
 def set_current_event_number(event_number):
     # 這個函數可能不再需要，但暫時保留
@@ -2,65 +2,136 @@
 Excel 檔案解析功能
 """
 import os
+import sys
 import time
 import zipfile
+import posixpath
 import xml.etree.ElementTree as ET
 import re
 import json
 import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from openpyxl import load_workbook
-from openpyxl.worksheet.formula import ArrayFormula
+from functools import lru_cache
+from contextlib import contextmanager
 import config.settings as settings
 from utils.cache import copy_to_cache
 import logging
 import urllib.parse
 
+# 可選加速庫：缺少時回退到標準庫
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import xxhash
+    HAS_XXHASH = True
+except ImportError:
+    HAS_XXHASH = False
+
+try:
+    import blake3
+    HAS_BLAKE3 = True
+except ImportError:
+    HAS_BLAKE3 = False
+
+_NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_NS_PKG = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_NS_DOC_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_TAG_REL = f'{{{_NS_PKG}}}Relationship'
+_TAG_EXTERNAL_BOOK_PR = f'.//{{{_NS_MAIN}}}externalBookPr'
+_RE_EXT_LINK_NUM = re.compile(r'externalLink(\d+)\.xml')
+# 每檔字串值共用池的上限
+_VALUE_POOL_MAX = 100000
+# docProps/core.xml 的最後修改者（cp 或少數模板的 dc 前綴）
+_AUTHOR_RE = re.compile(rb'<(?:cp|dc):lastModifiedBy(?:\s[^>]*)?>([^<]*)</(?:cp|dc):lastModifiedBy>')
+
+# 最後修改者快取 {(路徑, mtime_ns, size): author}，按最近使用排序，上限 _AUTHOR_CACHE_MAX；
+# 一次存檔會觸發多個事件，而作者在同一版本內固定，毋須每次都複製並解壓 core.xml
+_author_cache = OrderedDict()
+_author_cache_lock = threading.Lock()
+_AUTHOR_CACHE_MAX = 256
+
+# 外部參照映射快取 {路徑: ((size, mtime_ns), ref_map)}，按最近使用排序，上限 _REF_MAP_CACHE_MAX；
+# 輪詢期間檔案未變時毋須重新解壓解析
+_ref_map_cache = OrderedDict()
+_ref_map_cache_lock = threading.Lock()
+_REF_MAP_CACHE_MAX = 256
+
 def extract_external_refs(xlsx_path):
     """
     解析 Excel xlsx 中 external reference mapping: [n] -> 路徑
     支援兩種來源：
     - xl/externalLinks/externalLinkN.xml 的 externalBookPr@href
     - xl/externalLinks/_rels/externalLinkN.xml.rels 中 Relationship@Target
+    以 (size, mtime_ns) 判斷檔案是否變更，未變則直接回傳上次的結果
     """
+    try:
+        st = os.stat(xlsx_path)
+        sig = (st.st_size, st.st_mtime_ns)
+    except OSError:
+        sig = None
+    if sig is not None:
+        with _ref_map_cache_lock:
+            cached = _ref_map_cache.get(xlsx_path)
+            if cached is not None and cached[0] == sig:
+                _ref_map_cache.move_to_end(xlsx_path)
+                return dict(cached[1])
+
     ref_map = {}
     try:
         with zipfile.ZipFile(xlsx_path, 'r') as z:
+            names = set(z.namelist())
             rels = ET.fromstring(z.read('xl/_rels/workbook.xml.rels'))
-            for rel in rels.findall('{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'):
+            for rel in rels.iterfind(_TAG_REL):
                 if rel.attrib.get('Type','').endswith('/externalLink'):
                     target = rel.attrib.get('Target','')  # e.g., externalLinks/externalLink1.xml
-                    m = re.search(r'externalLink(\d+)\.xml', target)
+                    m = _RE_EXT_LINK_NUM.search(target)
                     if not m:
                         continue
                     num = int(m.group(1))
                     path = ''
                     # 1) 嘗試 externalLinkN.xml 的 externalBookPr@href
-                    try:
-                        link_xml = z.read(f'xl/{target}')
-                        link_tree = ET.fromstring(link_xml)
-                        book_elem = link_tree.find('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}externalBookPr')
-                        if book_elem is not None:
-                            path = book_elem.attrib.get('href', '')
-                    except Exception:
-                        pass
+                    # externalLinkN.xml 附帶外部檔案整份 cached 資料 (sheetDataSet)，可達數 MB；
+                    # 一般檔案沒有 externalBookPr，先以 bytes 搜尋確認存在才解析整份 XML
+                    link_part = f'xl/{target}'
+                    if link_part in names:
+                        try:
+                            link_xml = z.read(link_part)
+                            if b'externalBookPr' in link_xml:
+                                book_elem = ET.fromstring(link_xml).find(_TAG_EXTERNAL_BOOK_PR)
+                                if book_elem is not None:
+                                    path = book_elem.attrib.get('href', '')
+                        except ET.ParseError:
+                            pass
                     # 2) 若仍無，嘗試 externalLinks/_rels/externalLinkN.xml.rels 的 Relationship@Target
                     if not path:
-                        try:
-                            rels_path = f"xl/externalLinks/_rels/externalLink{num}.xml.rels"
-                            if rels_path in z.namelist():
-                                link_rels_xml = z.read(rels_path)
-                                link_rels = ET.fromstring(link_rels_xml)
-                                rel_node = link_rels.find('{http://schemas.openxmlformats.org/package/2006/relationships}Relationship')
+                        rels_path = f"xl/externalLinks/_rels/externalLink{num}.xml.rels"
+                        if rels_path in names:
+                            try:
+                                rel_node = ET.fromstring(z.read(rels_path)).find(_TAG_REL)
                                 if rel_node is not None:
                                     path = rel_node.attrib.get('Target','')
-                        except Exception:
-                            pass
+                            except ET.ParseError:
+                                pass
                     ref_map[num] = path or ''
     except (zipfile.BadZipFile, KeyError, ET.ParseError) as e:
         logging.error(f"提取外部參照時發生錯誤: {xlsx_path}, 錯誤: {e}")
+        return ref_map
+    if sig is not None:
+        with _ref_map_cache_lock:
+            _ref_map_cache[xlsx_path] = (sig, dict(ref_map))
+            _ref_map_cache.move_to_end(xlsx_path)
+            if len(_ref_map_cache) > _REF_MAP_CACHE_MAX:
+                _ref_map_cache.popitem(last=False)
     return ref_map
 
+# 純字串轉換，同一批外部連結路徑會在多個檔案反覆出現
+@lru_cache(maxsize=4096)
 def _normalize_path(p: str) -> str:
     if not p:
         return p
@@ -83,19 +154,20 @@ def _normalize_path(p: str) -> str:
         s = s[5:].lstrip('/\\')
     # normalize backslashes
     s = s.replace('/', '\\')
-    # collapse duplicate backslashes but keep UNC prefix
+    # collapse duplicate backslashes in one split/join, keeping the UNC prefix and a leading/trailing separator
+    body = '\\'.join([part for part in s.split('\\') if part])
+    if not body:
+        return '\\' if s else s
     if s.startswith('\\\\'):
-        prefix = '\\'
-        t = s[2:]
-        while '\\' in t:
-            t = t.replace('\\\\', '\\')
-        s = '\\' + t
+        lead = '\\\\'
+    elif s.startswith('\\'):
+        lead = '\\'
     else:
-        while '\\' in s and '\\\\' in s:
-            s = s.replace('\\\\', '\\')
-    return s
+        lead = ''
+    return lead + body + ('\\' if s.endswith('\\') else '')
 
 
+@lru_cache(maxsize=1024)
 def _excel_external_prefix(norm_path: str, sheet: str) -> str:
     """
     將歸一化路徑與工作表組裝為 Excel 標準外部參照前綴：
@@ -117,52 +189,82 @@ def _excel_external_prefix(norm_path: str, sheet: str) -> str:
     return f"'{inside}'"
 
 
-def pretty_formula(formula, ref_map=None):
+# 外部參照標記：[n]Sheet!（group 2 為工作表名）或未帶工作表名的 [n]，一次掃描處理
+# 工作表名部分遇到 ] 或 ! 即止，每次嘗試最多掃到下一個 [n] 為止，整體為線性時間，毋須改用 re2
+_RE_EXT_REF = re.compile(r"\[(\d+)\](?:([^!\]]+)!)?")
+
+def _prepare_ref_map(ref_map):
+    """
+    每個檔案只需做一次：把 ref_map 的路徑歸一化，並預組好外部參照前綴中工作表名之前的部分
+    回傳 {n: (歸一化路徑, 'dir\\[檔名]')}
+    """
+    norm_ref_map = {}
+    for n, raw_path in (ref_map or {}).items():
+        norm_path = _normalize_path(raw_path)
+        head = None
+        if norm_path:
+            dir_ = os.path.dirname(norm_path)
+            head = (dir_.rstrip('\\') + '\\' if dir_ else '') + f"[{os.path.basename(norm_path)}]"
+        norm_ref_map[n] = (norm_path, head)
+    return norm_ref_map
+
+# openpyxl 只在後備讀取或遇到 ArrayFormula 時才需要，延後到首次使用才載入
+_ArrayFormula = None
+
+def _array_formula_cls():
+    global _ArrayFormula
+    if _ArrayFormula is None:
+        from openpyxl.worksheet.formula import ArrayFormula
+        _ArrayFormula = ArrayFormula
+    return _ArrayFormula
+
+def pretty_formula(formula, ref_map=None, norm_ref_map=None):
     """
     將公式中的外部參照 [n]Sheet! 還原為 'full\\normalized\\path'!Sheet! 的可讀形式。
     同時保留 Excel 語法結構，避免造成假差異。
+    逐格呼叫時應傳入 _prepare_ref_map 預先處理好的 norm_ref_map。
     """
     if formula is None:
         return None
     
     # 修改：處理 ArrayFormula 物件
-    if isinstance(formula, ArrayFormula):
+    if formula.__class__ is str:
+        formula_str = formula
+    elif isinstance(formula, _array_formula_cls()):
         formula_str = formula.text if hasattr(formula, 'text') else str(formula)
     else:
         formula_str = str(formula)
     
-    if ref_map:
-        # 1) 直接替換形如 [n]Sheet! 為 'path'!Sheet!
-        def repl_path_with_sheet(m):
-            n = int(m.group(1))
-            sheet = m.group(2)
-            raw_path = ref_map.get(n, '')
-            norm_path = _normalize_path(raw_path)
-            if norm_path:
-                prefix = _excel_external_prefix(norm_path, sheet)
-                return f"{prefix}!"
-            return m.group(0)
-        s = re.sub(r"\[(\d+)\]([^!\]]+)!", repl_path_with_sheet, formula_str)
-        
-        # 2) 對其餘殘留的 [n] 標記（未帶 sheet 名）插入可讀提示
-        def repl_annotate(m):
-            n = int(m.group(1))
-            raw_path = ref_map.get(n, '')
-            norm_path = _normalize_path(raw_path)
-            if norm_path:
-                return f"[外部檔案{n}: {norm_path}]"
-            return m.group(0)
-        s = re.sub(r"\[(\d+)\]", repl_annotate, s)
-        return s
-    else:
+    # 沒有 [ 就不可能有外部參照，毋須跑正則
+    if '[' not in formula_str:
+        return formula_str
+    if norm_ref_map is None and ref_map:
+        norm_ref_map = _prepare_ref_map(ref_map)
+    if not norm_ref_map:
         return formula_str
 
+    def repl(m):
+        n = int(m.group(1))
+        norm_path, head = norm_ref_map.get(n, (None, None))
+        sheet = m.group(2)
+        if sheet is not None:
+            # 1) [n]Sheet! -> 'path\[file]Sheet'!
+            if head:
+                sheet_escaped = sheet.replace("'", "''")
+                return f"'{head}{sheet_escaped}'!"
+            return m.group(0)
+        # 2) 未帶 sheet 名的 [n] 插入可讀提示
+        if norm_path:
+            return f"[外部檔案{n}: {norm_path}]"
+        return m.group(0)
+    return _RE_EXT_REF.sub(repl, formula_str)
+
 def get_cell_formula(cell):
     """
     取得 cell 公式（不論係普通 formula or array formula），一律回傳公式字串
     """
     if cell.data_type == 'f':
-        if isinstance(cell.value, ArrayFormula):
+        if isinstance(cell.value, _array_formula_cls()):
             # 修改：返回 ArrayFormula 的實際公式字符串，而不是物件
             return cell.value.text if hasattr(cell.value, 'text') else str(cell.value)
         return cell.value
@@ -174,51 +276,79 @@ def serialize_cell_value(value):
     """
     if value is None: 
         return None
-    if isinstance(value, ArrayFormula): 
-        return None
-    if isinstance(value, datetime): 
-        return value.isoformat()
     if isinstance(value, (int, float, str, bool)): 
         return value
+    if isinstance(value, datetime): 
+        return value.isoformat()
+    if isinstance(value, _array_formula_cls()): 
+        return None
     return str(value)
 
+def _source_for_read(path, silent=False):
+    """
+    取得實際讀取的路徑：預設先複製到本地快取；USE_CACHE_COPY=False 且非嚴格模式時直接唯讀開啟原檔
+    （串流解析不會對原檔加寫入鎖，但若讀取期間原檔正被寫入，可能讀到不一致的內容）
+    """
+    if not getattr(settings, 'USE_CACHE_COPY', True) and not getattr(settings, 'STRICT_NO_ORIGINAL_READ', False):
+        return path
+    return copy_to_cache(path, silent=silent)
+
 def get_excel_last_author(path):
     """
     以非鎖定方式讀取 Excel 檔案的最後修改者：
-    - 優先從快取副本的 docProps/core.xml 解析 cp:lastModifiedBy（不開啟原檔，不用 openpyxl）。
-    - 如遇非常規檔案或解析失敗，才退回以 openpyxl 讀取「快取檔」。
+    - 從快取副本（或 USE_CACHE_COPY=False 時的原檔）的 docProps/core.xml 解析 cp:lastModifiedBy（不用 openpyxl）。
+    - openpyxl 的 wb.properties 同樣取自 core.xml，缺少或損壞時它也讀不到，故不再退回 openpyxl。
+    - 結果以 (路徑, mtime_ns, size) 快取，檔案未變時直接回傳。
     """
     try:
-        # 先複製到本地快取，避免直接打開原始檔案
-        local_path = copy_to_cache(path, silent=True)
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, st.st_size)
+    except OSError:
+        key = None
+    if key is not None:
+        with _author_cache_lock:
+            if key in _author_cache:
+                _author_cache.move_to_end(key)
+                return _author_cache[key]
+    author = _read_last_author(path)
+    if key is not None:
+        with _author_cache_lock:
+            _author_cache[key] = author
+            if len(_author_cache) > _AUTHOR_CACHE_MAX:
+                _author_cache.popitem(last=False)
+    return author
+
+def _read_last_author(path):
+    """
+    get_excel_last_author 的實際讀取（不經快取）
+    """
+    try:
+        # 預設先複製到本地快取，避免直接打開原始檔案
+        local_path = _source_for_read(path, silent=True)
         if not local_path or not os.path.exists(local_path):
             return None
         try:
             with zipfile.ZipFile(local_path, 'r') as z:
                 core_xml = z.read('docProps/core.xml')
-                root = ET.fromstring(core_xml)
-                ns = {
-                    'cp': 'http://schemas.openxmlformats.org/package/2006/metadata/core-properties',
-                    'dc': 'http://purl.org/dc/elements/1.1/'
-                }
-                node = root.find('cp:lastModifiedBy', ns)
-                if node is None:
-                    node = root.find('dc:lastModifiedBy', ns)  # 極少數模板可能使用 dc
-                author = (node.text or '').strip() if node is not None else None
-                return author or None
-        except (KeyError, zipfile.BadZipFile, ET.ParseError):
-            # 結構異常或非 zip 格式（例如舊 xls），退回 openpyxl（仍用本地快取檔）
-            pass
-
-        # Fallback：對快取檔使用 openpyxl（不會鎖定原檔）
-        try:
-            wb = load_workbook(local_path, read_only=True)
-            author = wb.properties.lastModifiedBy
-            wb.close()
-            del wb
-            return author
-        except Exception as e:
-            logging.warning(f"openpyxl 讀取核心屬性失敗: {local_path}, {e}")
+            # 常規的 core.xml 以正則直接取值；含實體字元或前綴不同時才以 ET 解析
+            m = _AUTHOR_RE.search(core_xml)
+            if m and b'&' not in m.group(1):
+                return m.group(1).decode('utf-8').strip() or None
+            root = ET.fromstring(core_xml)
+            ns = {
+                'cp': 'http://schemas.openxmlformats.org/package/2006/metadata/core-properties',
+                'dc': 'http://purl.org/dc/elements/1.1/'
+            }
+            node = root.find('cp:lastModifiedBy', ns)
+            if node is None:
+                node = root.find('dc:lastModifiedBy', ns)  # 極少數模板可能使用 dc
+            author = (node.text or '').strip() if node is not None else None
+            return author or None
+        except KeyError:
+            # 沒有 core.xml（部分工具產生的檔案），即沒有作者資訊
+            return None
+        except (zipfile.BadZipFile, ET.ParseError, UnicodeDecodeError) as e:
+            logging.warning(f"讀取核心屬性失敗: {local_path}, {e}")
             return None
 
     except FileNotFoundError:
@@ -231,81 +361,410 @@ def get_excel_last_author(path):
         logging.error(f"Excel 檔案讀取 I/O 錯誤: {path}, {e}")
         return None
 
-def safe_load_workbook(path, max_retry=5, delay=0.5, **kwargs):
+def get_xlsx_zip_fingerprint(path):
+    """
+    以 zip 中央目錄的 (檔名, CRC, 大小) 計算指紋，不需解壓任何內容。
+    讀取與 dump_excel_cells_with_timeout 相同的來源，失敗時回傳 None。
+    """
+    try:
+        local_path = _source_for_read(path, silent=True)
+        if not local_path or not os.path.exists(local_path):
+            return None
+        h = hashlib.blake2b(digest_size=16)
+        with zipfile.ZipFile(local_path, 'r') as z:
+            for info in z.infolist():
+                h.update(f"{info.filename}\0{info.CRC}\0{info.file_size}\n".encode('utf-8'))
+        return h.hexdigest()
+    except (OSError, zipfile.BadZipFile) as e:
+        logging.warning(f"計算 zip 指紋失敗: {path}, {e}")
+        return None
+
+def _probe_readable(path):
+    """
+    以唯讀方式開啟再關閉，確認檔案目前可被讀取（Excel 開啟檔案時仍允許共用讀取，只有真正的共用衝突才會失敗）
+    """
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    os.close(fd)
+
+def safe_load_workbook(path, max_retry=2, delay=0.25, **kwargs):
     """
-    安全載入 Excel 檔案，帶重試機制
+    安全載入 Excel 檔案：先探測能否唯讀開啟，遇到共用衝突只短暫重試一次，不再多次睡眠等待
     """
+    from openpyxl import load_workbook
     last_err = None
     for i in range(max_retry):
         try:
-            wb = load_workbook(path, **kwargs)
-            return wb
+            _probe_readable(path)
+            return load_workbook(path, **kwargs)
         except PermissionError as e:
             last_err = e
-            time.sleep(delay)
+            if i + 1 < max_retry:
+                time.sleep(delay)
         except Exception as e:
-            last_err = e
             logging.error(f"載入 Excel 檔案時發生意外錯誤: {path}, 錯誤: {e}")
-            break
+            raise
     raise last_err
 
-def dump_excel_cells_with_timeout(path, show_sheet_detail=True, silent=False):
+def _resolve_part(target, base_dir='xl'):
     """
-    提取 Excel 檔案中的所有儲存格數據（含公式）
+    將 .rels 的 Target 轉為 zip 內的完整路徑
     """
-    # 更新全局變數
-    settings.current_processing_file = path
-    settings.processing_start_time = time.time()
-    
-    wb = None
-    try:
-        if not silent: 
-            print(f"   📊 檔案大小: {os.path.getsize(path)/(1024*1024):.1f} MB")
-        
-        local_path = copy_to_cache(path, silent=silent)
-        if not local_path or not os.path.exists(local_path):
-            if not silent:
-                print("   ❌ 無法使用快取副本（嚴格模式下不會讀取原檔），略過此檔案。")
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join(base_dir, target))
+
+def _text_content(node):
+    """
+    取得 <si>/<is> 的純文字（直接的 <t> 加上各 <r> 內的 <t>，略過注音 <rPh>），與 openpyxl 相同
+    """
+    parts = []
+    t = node.find(f'{{{_NS_MAIN}}}t')
+    if t is not None and t.text:
+        parts.append(t.text)
+    for r in node.iterfind(f'{{{_NS_MAIN}}}r'):
+        rt = r.find(f'{{{_NS_MAIN}}}t')
+        if rt is not None and rt.text:
+            parts.append(rt.text)
+    return ''.join(parts)
+
+def _read_workbook_parts(z):
+    """
+    從 xl/workbook.xml 及其 .rels 取得工作表清單和共用資料：
+    {'sheets': [(名稱, part)], 'shared_strings': [...], 'date_styles': set, 'timedelta_styles': set, 'epoch': datetime}
+    """
+    from openpyxl.utils.datetime import WINDOWS_EPOCH, MAC_EPOCH
+
+    rels = {}
+    for rel in ET.fromstring(z.read('xl/_rels/workbook.xml.rels')).iter(f'{{{_NS_PKG}}}Relationship'):
+        rels[rel.attrib.get('Id')] = (rel.attrib.get('Type', ''), _resolve_part(rel.attrib.get('Target', '')))
+
+    wb_root = ET.fromstring(z.read('xl/workbook.xml'))
+    pr = wb_root.find(f'{{{_NS_MAIN}}}workbookPr')
+    date1904 = pr is not None and pr.attrib.get('date1904', '').lower() in ('1', 'true')
+
+    sheets = []
+    for sheet in wb_root.iter(f'{{{_NS_MAIN}}}sheet'):
+        rel = rels.get(sheet.attrib.get(f'{{{_NS_DOC_REL}}}id'))
+        # 只取一般工作表（略過 chartsheet 等），與 openpyxl 的 wb.worksheets 一致
+        if rel and rel[0].endswith('/worksheet'):
+            sheets.append((sys.intern(sheet.attrib.get('name', '')), rel[1]))
+
+    shared_strings = []
+    styles_part = None
+    for rel_type, part in rels.values():
+        if rel_type.endswith('/sharedStrings'):
+            si_tag = f'{{{_NS_MAIN}}}si'
+            with z.open(part) as f:
+                for _, node in ET.iterparse(f):
+                    if node.tag == si_tag:
+                        shared_strings.append(_text_content(node).replace('x005F_', ''))
+                        node.clear()
+        elif rel_type.endswith('/styles'):
+            styles_part = part
+
+    date_styles, timedelta_styles = _read_date_styles(z, styles_part)
+    return {
+        'sheets': sheets,
+        'shared_strings': shared_strings,
+        'date_styles': date_styles,
+        'timedelta_styles': timedelta_styles,
+        'epoch': MAC_EPOCH if date1904 else WINDOWS_EPOCH,
+        'formula_pool': {},
+        'value_pool': {},
+    }
+
+def _read_date_styles(z, styles_part):
+    """
+    找出數字格式為日期／時間長度的 cellXfs 索引（判斷規則沿用 openpyxl）
+    """
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+
+    date_styles, timedelta_styles = set(), set()
+    if not styles_part:
+        return date_styles, timedelta_styles
+    root = ET.fromstring(z.read(styles_part))
+    custom = {}
+    num_fmts = root.find(f'{{{_NS_MAIN}}}numFmts')
+    if num_fmts is not None:
+        for fmt in num_fmts.iterfind(f'{{{_NS_MAIN}}}numFmt'):
+            custom[int(fmt.attrib.get('numFmtId', 0))] = fmt.attrib.get('formatCode')
+    cell_xfs = root.find(f'{{{_NS_MAIN}}}cellXfs')
+    if cell_xfs is None:
+        return date_styles, timedelta_styles
+    for idx, xf in enumerate(cell_xfs.iterfind(f'{{{_NS_MAIN}}}xf')):
+        fmt_id = int(xf.attrib.get('numFmtId', 0))
+        fmt = custom[fmt_id] if fmt_id in custom else BUILTIN_FORMATS.get(fmt_id)
+        if is_date_format(fmt):
+            date_styles.add(idx)
+        if is_timedelta_format(fmt):
+            timedelta_styles.add(idx)
+    return date_styles, timedelta_styles
+
+def _cast_number(value):
+    """
+    與 openpyxl 相同：含小數點或指數記號為 float，否則為 int
+    """
+    if '.' in value or 'E' in value or 'e' in value:
+        return float(value)
+    return int(value)
+
+def _stream_sheet_cells(zipf, sheet_part, book, with_cached=False):
+    """
+    以 iterparse 串流讀取 sheetN.xml，逐格產生 (座標, 公式, 值, cached value)，
+    公式與值的表示方式與 openpyxl read_only 模式相同（公式為 '=...' 字串，陣列公式的值為 None）。
+    with_cached 為 True 時，公式格一併回傳 <v> 的 cached value（等同 data_only=True 讀到的值）。
+    每處理完一列即清空 sheetData，記憶體維持平穩；讀完 sheetData 即停止，不解析其後的內容。
+    空白工作表解析到 </sheetData> 即結束（每張不到 1ms），故不預先讀 <dimension> 篩選工作表：
+    ref="A1" 無法區分空白表與只有 A1 有值的表，且部分程式不寫或寫錯 dimension。
+    註：曾試以 lxml.etree.iterparse(tag=...) 取代，但 lxml 每存取一個元素都要建立 Python 代理物件，
+    實測與標準庫（同為 C 實作的 expat + TreeBuilder）相若甚至較慢，故不引入 lxml 依賴。
+    """
+    from openpyxl.utils import get_column_letter, column_index_from_string
+    from openpyxl.utils.datetime import from_excel, from_ISO8601
+
+    ns = f'{{{_NS_MAIN}}}'
+    tag_c, tag_row, tag_sheet_data = ns + 'c', ns + 'row', ns + 'sheetData'
+    tag_f, tag_v, tag_is = ns + 'f', ns + 'v', ns + 'is'
+    shared_strings = book['shared_strings']
+    # 樣式索引直接以 s 屬性字串比對，省去每格 int() 轉換
+    date_styles = {str(i) for i in book['date_styles']}
+    timedelta_styles = {str(i) for i in book['timedelta_styles']}
+    epoch = book['epoch']
+    shared_formulae = {}
+    translator = None
+
+    def convert(raw, data_type, style_id):
+        # 按儲存格類型 t 轉換 <v> 文字（與 openpyxl 相同）
+        if raw is None:
             return None
-        
-        read_only_mode = True
-        if not silent: 
-            print(f"   🚀 讀取模式: read_only={read_only_mode}, data_only=False")
-        
-        wb = safe_load_workbook(local_path, read_only=read_only_mode, data_only=False)
+        if data_type == 'n':
+            value = _cast_number(raw)
+            if style_id in date_styles:
+                try:
+                    value = from_excel(value, epoch, timedelta=style_id in timedelta_styles)
+                except (OverflowError, ValueError):
+                    value = '#VALUE!'
+            return value
+        if data_type == 's':
+            return shared_strings[int(raw)]
+        if data_type == 'b':
+            return bool(int(raw))
+        if data_type == 'd':
+            return from_ISO8601(raw)
+        return raw
+
+    sheet_data = None
+    row_idx = 0
+    last_coord = None
+    with zipf.open(sheet_part) as f:
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            tag = elem.tag
+            if event == 'start':
+                if tag == tag_row:
+                    r = elem.get('r')
+                    row_idx = int(r) if r else row_idx + 1
+                    last_coord = None
+                elif tag == tag_sheet_data:
+                    sheet_data = elem
+                continue
+            if tag == tag_row:
+                if sheet_data is not None:
+                    sheet_data.clear()
+                continue
+            if tag == tag_sheet_data:
+                # sheetData 之後只剩格式化、驗證等與儲存格內容無關的部分；空白工作表在此即結束
+                break
+            if tag != tag_c:
+                continue
+
+            coord = elem.get('r')
+            if coord:
+                last_coord = coord
+            else:
+                # 缺少 r 屬性時按上一格的欄號遞增（與 openpyxl 相同）
+                col_idx = column_index_from_string(last_coord.rstrip('0123456789')) if last_coord else 0
+                last_coord = coord = f"{get_column_letter(col_idx + 1)}{row_idx}"
+
+            data_type = elem.get('t', 'n')
+            f_elem = elem.find(tag_f)
+            if f_elem is not None:
+                formula = '=' + (f_elem.text or '')
+                f_type = f_elem.get('t')
+                if f_type == 'shared':
+                    si = f_elem.get('si')
+                    if si in shared_formulae:
+                        formula = shared_formulae[si].translate_formula(coord)
+                    elif formula != '=':
+                        if translator is None:
+                            from openpyxl.formula.translate import Translator as translator
+                        shared_formulae[si] = translator(formula, coord)
+                    value = formula
+                elif f_type == 'array':
+                    value = None
+                else:
+                    value = formula
+                # 公式格的 <v> 即 Excel 上次計算的 cached value，同一次走訪順帶讀取
+                cached = convert(elem.findtext(tag_v) or None, data_type, elem.get('s')) if with_cached else None
+                yield coord, formula, value, cached
+                continue
+
+            if data_type == 'inlineStr':
+                is_elem = elem.find(tag_is)
+                yield coord, None, (_text_content(is_elem) if is_elem is not None else None), None
+                continue
+
+            raw = elem.findtext(tag_v) or None
+            if raw is None:
+                continue
+            yield coord, None, convert(raw, data_type, elem.get('s')), None
+
+def _parse_sheet_part(local_path, part, book, norm_ref_map, with_cached=False, zipf=None):
+    """
+    解析單一工作表，回傳 (ws_data, 公式格位址列表)；未提供 zipf 時自行開啟（供平行解析，ZipFile 不宜跨執行緒共用）
+    """
+    if zipf is None:
+        with zipfile.ZipFile(local_path, 'r') as z:
+            return _parse_sheet_part(local_path, part, book, norm_ref_map, with_cached, zipf=z)
+    ws_data = {}
+    formula_addrs = []
+    # 沒有外部連結時公式毋須 prettify（串流解析的公式已是字串）
+    prettify = norm_ref_map or None
+    # 同一檔案內相同的公式字串（整片貼上的公式）共用同一物件
+    formula_pool = book['formula_pool']
+    value_pool = book['value_pool']
+    for coord, fstr, value, cached in _stream_sheet_cells(zipf, part, book, with_cached):
+        vstr = serialize_cell_value(value)
+        if vstr.__class__ is str and not fstr:
+            # 重複的字串值（分類標籤、日期等）共用同一物件；池過大時重置避免高基數表佔用記憶體
+            if len(value_pool) > _VALUE_POOL_MAX:
+                value_pool = book['value_pool'] = {}
+            vstr = value_pool.setdefault(vstr, vstr)
+        if fstr:
+            if value is fstr:
+                # 一般公式格的值即公式字串本身
+                vstr = fstr = formula_pool.setdefault(fstr, fstr)
+            # 對外部參照做正規化展示（還原路徑，解 %20，統一反斜線）
+            if prettify:
+                fstr = pretty_formula(fstr, norm_ref_map=prettify)
+                fstr = formula_pool.setdefault(fstr, fstr)
+            formula_addrs.append(coord)
+        if fstr is not None or vstr is not None:
+            cell = ws_data[coord] = {"formula": fstr, "value": vstr}
+            if fstr and with_cached:
+                cell['cached_value'] = serialize_cell_value(cached)
+    return ws_data, formula_addrs
+
+def _drain_in_order(pool, max_in_flight, calls):
+    """
+    依序提交 (函數, 參數...) 到執行緒池並按提交次序產生結果；同時最多 max_in_flight 個未收集的工作
+    """
+    from collections import deque
+    pending = deque()
+    for fn, *args in calls:
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+        pending.append(pool.submit(fn, *args))
+    while pending:
+        yield pending.popleft().result()
+
+def _dump_cells_streaming(local_path, norm_ref_map, show_sheet_detail, silent, with_cached=False):
+    """
+    直接解壓並串流解析各工作表 XML，回傳 (結果, {工作表: 公式格位址列表})
+    多於一張工作表且 PARSE_WORKERS > 1 時以執行緒池平行解析，結果仍按工作表次序收集
+    """
+    result = {}
+    formula_coords_by_sheet = {}
+    with zipfile.ZipFile(local_path, 'r') as z:
+        book = _read_workbook_parts(z)
+        sheets = book['sheets']
+        worksheet_count = len(sheets)
+        if not silent and show_sheet_detail:
+            print(f"   📋 工作表數量: {worksheet_count}")
+
+        workers = min(int(getattr(settings, 'PARSE_WORKERS', 1) or 1), worksheet_count)
+        pool = None
+        if workers > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            pool = ThreadPoolExecutor(max_workers=workers)
+            items = _drain_in_order(pool, workers * 2, (
+                (_parse_sheet_part, local_path, part, book, norm_ref_map, with_cached) for _, part in sheets))
+        else:
+            items = (_parse_sheet_part(local_path, part, book, norm_ref_map, with_cached, zipf=z) for _, part in sheets)
+
+        try:
+            for idx, ((title, _), (ws_data, formula_addrs)) in enumerate(zip(sheets, items), 1):
+                if show_sheet_detail and not silent:
+                    print(f"      處理工作表 {idx}/{worksheet_count}: {title}（{len(ws_data)} 有資料 cell）")
+
+                if ws_data:
+                    result[title] = ws_data
+                if formula_addrs:
+                    formula_coords_by_sheet[title] = formula_addrs
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+    return result, formula_coords_by_sheet
+
+def _iter_sheet_values(ws):
+    """
+    以 values_only=True 走訪 read_only 工作表，按列／欄序號組出位址，產生非空的 (位址, 值)
+    （read_only 會為中間的空列補上空 tuple，列序號即行號）
+    """
+    from openpyxl.utils import get_column_letter
+    for r_idx, row in enumerate(ws.iter_rows(min_row=1, min_col=1, values_only=True), 1):
+        for c_idx, value in enumerate(row, 1):
+            if value is not None:
+                yield f"{get_column_letter(c_idx)}{r_idx}", value
+
+def _dump_cells_openpyxl(local_path, norm_ref_map, show_sheet_detail, silent, with_cached=False):
+    """
+    以 openpyxl read_only 模式逐格讀取（串流解析失敗時的後備），回傳 (結果, {工作表: 公式格位址列表})
+    """
+    with open_workbook(local_path, read_only=True, data_only=False) as wb:
         result = {}
+        formula_coords_by_sheet = {}
         worksheet_count = len(wb.worksheets)
         
         if not silent and show_sheet_detail: 
             print(f"   📋 工作表數量: {worksheet_count}")
-        
-        # 解析一次外部參照映射，供 prettify 使用
-        ref_map = extract_external_refs(local_path)
-        formula_cells_global = 0
-        formula_coords_by_sheet = {}
 
+        array_formula = _array_formula_cls()
+        # 與串流解析相同：整片貼上的公式與重複字串值共用同一物件
+        formula_pool = {}
+        value_pool = {}
         for idx, ws in enumerate(wb.worksheets, 1):
             cell_count = 0
             ws_data = {}
             formula_addrs = []
             
-            if ws.max_row > 1 or ws.max_column > 1:
-                for row in ws.iter_rows(values_only=False):  # ⚡️ 保證每個 cell 都係 cell object
-                    for cell in row:
-                        # ⚡️ Patch: formula 直接存 cell.formula if present, fallback get_cell_formula
-                        if hasattr(cell, 'formula') and cell.formula:
-                            fstr = cell.formula
+            # read_only 工作表本身即串流讀取，空白表自然不產生任何值；毋須先探測 max_row/max_column（亦不會漏掉只有 A1 的表）
+            for row in ws.iter_rows(values_only=False):  # ⚡️ 保證每個 cell 都係 cell object
+                for cell in row:
+                    value = cell.value
+                    # read_only 儲存格沒有 formula 屬性，公式格以 data_type 'f' 判斷（即 get_cell_formula 的內聯版）
+                    if cell.data_type == 'f':
+                        fstr = value.text if isinstance(value, array_formula) else value
+                    else:
+                        fstr = None
+                    vstr = serialize_cell_value(value)
+                    if fstr is None and vstr is None:
+                        continue
+                    if vstr.__class__ is str:
+                        if fstr is not None:
+                            vstr = formula_pool.setdefault(vstr, vstr)
                         else:
-                            fstr = get_cell_formula(cell)
-                        # 對外部參照做正規化展示（還原路徑，解 %20，統一反斜線）
-                        if fstr:
-                            fstr = pretty_formula(fstr, ref_map=ref_map)
-                            formula_addrs.append(cell.coordinate)
-                            formula_cells_global += 1
-                        vstr = serialize_cell_value(cell.value)
-                        if fstr is not None or vstr is not None:
-                            ws_data[cell.coordinate] = {"formula": fstr, "value": vstr}
-                            cell_count += 1
+                            if len(value_pool) > _VALUE_POOL_MAX:
+                                value_pool = {}
+                            vstr = value_pool.setdefault(vstr, vstr)
+                    coord = cell.coordinate
+                    # 對外部參照做正規化展示（還原路徑，解 %20，統一反斜線）
+                    if fstr:
+                        if norm_ref_map or not isinstance(fstr, str):
+                            fstr = pretty_formula(fstr, norm_ref_map=norm_ref_map)
+                        fstr = formula_pool.setdefault(fstr, fstr)
+                        formula_addrs.append(coord)
+                    ws_data[coord] = {"formula": fstr, "value": vstr}
+                    cell_count += 1
             
             if show_sheet_detail and not silent: 
                 print(f"      處理工作表 {idx}/{worksheet_count}: {ws.title}（{cell_count} 有資料 cell）")
@@ -315,40 +774,103 @@ def dump_excel_cells_with_timeout(path, show_sheet_detail=True, silent=False):
             if formula_addrs:
                 formula_coords_by_sheet[ws.title] = formula_addrs
 
-        # Phase 2：可選的 cached value 比對（僅對公式格），避免外部參照刷新導致假變更
-        try:
-            if getattr(settings, 'ENABLE_FORMULA_VALUE_CHECK', False) and formula_cells_global > 0:
-                cap = int(getattr(settings, 'MAX_FORMULA_VALUE_CELLS', 50000))
-                if formula_cells_global > cap:
-                    if not silent:
-                        print(f"   ⏩ 公式格數量 {formula_cells_global} 超過上限 {cap}，略過值比對。")
-                else:
-                    if not silent:
-                        print(f"   🔍 讀取公式儲存格的 cached value（共 {formula_cells_global} 格）…")
-                    wb_values = safe_load_workbook(local_path, read_only=True, data_only=True)
-                    try:
-                        for sheet_name, coords in formula_coords_by_sheet.items():
-                            if sheet_name not in wb_values.sheetnames:
-                                continue
-                            ws2 = wb_values[sheet_name]
-                            for addr in coords:
-                                try:
-                                    val = ws2[addr].value
-                                except Exception:
-                                    val = None
-                                sval = serialize_cell_value(val)
-                                if sheet_name in result and addr in result[sheet_name]:
-                                    result[sheet_name][addr]['cached_value'] = sval
-                    finally:
-                        try:
-                            wb_values.close()
-                        except Exception:
-                            pass
-        except Exception as e:
-            logging.warning(f"讀取 cached value 失敗：{e}")
-        
+    # openpyxl 無法同時取得公式與 cached value，只能以 data_only=True 再讀一次
+    if with_cached and formula_coords_by_sheet:
+        with open_workbook(local_path, read_only=True, data_only=True) as wb_values:
+            for sheet_name, coords in formula_coords_by_sheet.items():
+                if sheet_name not in wb_values.sheetnames:
+                    continue
+                ws_data = result[sheet_name]
+                for addr in coords:
+                    ws_data[addr]['cached_value'] = None
+                # read_only 工作表按位址逐格取值需重新掃描，改為整表走訪一次
+                wanted = set(coords)
+                for coord, value in _iter_sheet_values(wb_values[sheet_name]):
+                    if coord in wanted:
+                        ws_data[coord]['cached_value'] = serialize_cell_value(value)
+    return result, formula_coords_by_sheet
+
+@contextmanager
+def open_workbook(path, **kwargs):
+    """
+    以 safe_load_workbook 載入並保證離開時 close（read_only 模式會保持檔案開啟）
+    """
+    wb = safe_load_workbook(path, **kwargs)
+    try:
+        yield wb
+    finally:
         wb.close()
-        wb = None
+
+_processing_lock = threading.Lock()
+
+@contextmanager
+def _track_processing(path):
+    """
+    於 settings.processing_files 登記正在解析的檔案與開始時間（多執行緒同時解析時各自一項），結束時只移除自己登記的項目
+    """
+    started = time.time()
+    with _processing_lock:
+        settings.processing_files[path] = started
+    try:
+        yield
+    finally:
+        with _processing_lock:
+            if settings.processing_files.get(path) is started:
+                del settings.processing_files[path]
+
+def dump_excel_cells_with_timeout(path, show_sheet_detail=True, silent=False):
+    """
+    提取 Excel 檔案中的所有儲存格數據（含公式）
+    優先直接串流解析工作表 XML，失敗時退回 openpyxl
+    """
+    with _track_processing(path):
+        return _dump_excel_cells(path, show_sheet_detail, silent)
+
+def _dump_excel_cells(path, show_sheet_detail, silent):
+    """
+    dump_excel_cells_with_timeout 的本體（登記 processing_files 由外層負責）
+    """
+    try:
+        if not silent: 
+            print(f"   📊 檔案大小: {os.path.getsize(path)/(1024*1024):.1f} MB")
+        
+        local_path = _source_for_read(path, silent=silent)
+        if not local_path or not os.path.exists(local_path):
+            if not silent:
+                print("   ❌ 無法使用快取副本（嚴格模式下不會讀取原檔），略過此檔案。")
+            return None
+        
+        # 解析一次外部參照映射並預先歸一化路徑，供 prettify 使用
+        norm_ref_map = _prepare_ref_map(extract_external_refs(local_path))
+
+        # 可選的 cached value 比對（僅對公式格），避免外部參照刷新導致假變更
+        with_cached = bool(getattr(settings, 'ENABLE_FORMULA_VALUE_CHECK', False))
+
+        result = None
+        try:
+            if not silent: 
+                print(f"   🚀 讀取模式: 串流 XML（公式{'＋cached value' if with_cached else ''}）")
+            result, formula_coords_by_sheet = _dump_cells_streaming(
+                local_path, norm_ref_map, show_sheet_detail, silent, with_cached)
+        except (KeyError, ValueError, IndexError, ET.ParseError, zipfile.BadZipFile) as e:
+            logging.warning(f"串流解析失敗，改用 openpyxl: {local_path}, {e}")
+        if result is None:
+            if not silent: 
+                print(f"   🚀 讀取模式: read_only=True, data_only=False")
+            result, formula_coords_by_sheet = _dump_cells_openpyxl(
+                local_path, norm_ref_map, show_sheet_detail, silent, with_cached)
+
+        if with_cached:
+            formula_cells_global = sum(len(v) for v in formula_coords_by_sheet.values())
+            cap = int(getattr(settings, 'MAX_FORMULA_VALUE_CELLS', 50000))
+            if formula_cells_global > cap:
+                # 超過上限則整份檔案不作值比對（與以往一致），移除已讀取的 cached value
+                if not silent:
+                    print(f"   ⏩ 公式格數量 {formula_cells_global} 超過上限 {cap}，略過值比對。")
+                for sheet_name, coords in formula_coords_by_sheet.items():
+                    ws_data = result[sheet_name]
+                    for addr in coords:
+                        ws_data[addr].pop('cached_value', None)
         
         if not silent and show_sheet_detail: 
             print(f"   ✅ Excel 讀取完成")
@@ -359,25 +881,188 @@ def dump_excel_cells_with_timeout(path, show_sheet_detail=True, silent=False):
         if not silent: 
             logging.error(f"Excel 讀取失敗: {e}")
         return None
+
+# 子程序解析：每次解析各用一個子程序，超時只結束該子程序，不影響其他檔案的解析；
+# 同時執行的子程序數以 PARSE_PROCESS_WORKERS 限制（首次使用時建立）
+_parse_slots = None
+_parse_slots_lock = threading.Lock()
+_SNAPSHOT_TYPES = (str, int, float, bool, list, tuple, dict, type(None))
+
+class ParseTimeoutError(Exception):
+    """
+    子程序解析超過 FILE_TIMEOUT_SECONDS（該子程序已被結束）；呼叫者不應在本程序重試同一檔案
+    """
+
+def _parse_slot():
+    global _parse_slots
+    with _parse_slots_lock:
+        if _parse_slots is None:
+            workers = max(1, min(int(getattr(settings, 'PARSE_PROCESS_WORKERS', 2) or 1), os.cpu_count() or 1))
+            _parse_slots = threading.BoundedSemaphore(workers)
+        return _parse_slots
+
+def _settings_snapshot():
+    """
+    目前設定中可傳到子程序的大寫設定值（設定於執行期可被改動，故每次解析都傳一份）
+    """
+    return {k: v for k, v in vars(settings).items() if k.isupper() and isinstance(v, _SNAPSHOT_TYPES)}
+
+def _dump_in_subprocess(conn, snapshot, path, kwargs):
+    """
+    子程序入口：套用主程序的設定後解析，結果經 conn 傳回 (成功與否, 結果或錯誤訊息)
+    """
+    try:
+        for k, v in snapshot.items():
+            setattr(settings, k, v)
+        conn.send((True, dump_excel_cells_with_timeout(path, **kwargs)))
+    except Exception as e:
+        try:
+            conn.send((False, repr(e)))
+        except Exception:
+            pass
     finally:
-        if wb: 
-            wb.close()
-            del wb
-        
-        # 重置全局變數
-        settings.current_processing_file = None
-        settings.processing_start_time = None
+        conn.close()
 
-def hash_excel_content(cells_dict):
+def dump_excel_cells_in_subprocess(path, **kwargs):
+    """
+    在子程序執行 dump_excel_cells_with_timeout，解析期間不佔用本程序的 GIL，多個檔案可真正並行；
+    未開啟 PARSE_IN_SUBPROCESS 時直接在本程序解析；無法建立子程序或子程序意外結束時，本次改在本程序解析；
+    超過 FILE_TIMEOUT_SECONDS 時結束該子程序並拋出 ParseTimeoutError
+    """
+    if not getattr(settings, 'PARSE_IN_SUBPROCESS', False):
+        return dump_excel_cells_with_timeout(path, **kwargs)
+    import multiprocessing
+    timeout = float(settings.FILE_TIMEOUT_SECONDS) if getattr(settings, 'ENABLE_TIMEOUT', True) else None
+    with _parse_slot():
+        try:
+            recv_conn, send_conn = multiprocessing.Pipe(duplex=False)
+            proc = multiprocessing.Process(target=_dump_in_subprocess, name="excel-parse",
+                                           args=(send_conn, _settings_snapshot(), path, kwargs), daemon=True)
+            proc.start()
+        except Exception as e:
+            logging.warning(f"子程序解析不可用，改在本程序解析: {e}")
+        else:
+            send_conn.close()
+            try:
+                with _track_processing(path):
+                    # 子程序結束而未傳回結果時 poll 亦會返回，之後 recv 拋出 EOFError
+                    if not recv_conn.poll(timeout):
+                        proc.kill()
+                        logging.error(f"子程序解析超時: {path}")
+                        raise ParseTimeoutError(path)
+                    ok, payload = recv_conn.recv()
+            except EOFError:
+                ok, payload = False, None
+            finally:
+                recv_conn.close()
+                proc.join(5)
+            if ok:
+                return payload
+            if payload is None:
+                payload = f"子程序意外結束 (exitcode={proc.exitcode})"
+            logging.warning(f"子程序解析失敗，改在本程序解析: {path}, 錯誤: {payload}")
+    return dump_excel_cells_with_timeout(path, **kwargs)
+
+def _canonical_bytes(obj, sort_keys=True):
+    """
+    以 JSON bytes 作為雜湊輸入（orjson 可用時使用 orjson）；sort_keys=False 時按 dict 插入次序輸出
+    orjson 不接受超過 64-bit 的整數等內容，遇到時改用標準庫 json（輸出同為 UTF-8、不轉義非 ASCII）
     """
-    計算 Excel 內容的雜湊值
+    if HAS_ORJSON:
+        try:
+            if sort_keys:
+                return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(obj, sort_keys=sort_keys, ensure_ascii=False).encode('utf-8')
+
+def _new_hasher():
+    """
+    64-bit 增量雜湊器：優先 xxh3_64，其次 blake3，否則 blake2b(8 bytes)
+    """
+    if HAS_XXHASH:
+        return xxhash.xxh3_64()
+    if HAS_BLAKE3:
+        return _Blake3Hasher()
+    return hashlib.blake2b(digest_size=8)
+
+class _Blake3Hasher:
+    """
+    blake3 的 hexdigest 需指定長度，包一層以與其他雜湊器相同的介面輸出 8 bytes 摘要
+    """
+    __slots__ = ('_h',)
+
+    def __init__(self):
+        self._h = blake3.blake3()
+
+    def update(self, data):
+        self._h.update(data)
+
+    def hexdigest(self):
+        return self._h.hexdigest(length=8)
+
+def _digest(data):
+    """
+    64-bit 內容摘要（演算法同 _new_hasher）
+    """
+    if HAS_XXHASH:
+        return xxhash.xxh3_64(data).hexdigest()
+    h = _new_hasher()
+    h.update(data)
+    return h.hexdigest()
+
+def _digest_cells_incremental(cells):
+    """
+    未安裝 orjson 時使用：按解析次序逐格把 repr 餵入雜湊，不需先組成整張表的 JSON 字串
+    """
+    h = _new_hasher()
+    for coord, cell in cells.items():
+        cached = repr(cell['cached_value']) if 'cached_value' in cell else ''
+        h.update(f"{coord}\0{cell.get('formula')!r}\0{cell.get('value')!r}\0{cached}\x1e".encode('utf-8', 'surrogatepass'))
+    return h.hexdigest()
+
+def _hash_sheet(cells):
+    """
+    單一工作表的雜湊：orjson 可用時一次序列化整張表（C 實作較快），否則逐格增量雜湊
+    兩種讀取方式都按 XML 的列／欄次序建立 cells，每格鍵序亦固定，故直接按插入次序序列化，
+    毋須逐層排序鍵（只對剛解析出來的結果計算雜湊；從基準線檔載入的 cells 次序不同，不應拿來重算）
+    """
+    if HAS_ORJSON:
+        return _digest(_canonical_bytes(cells, sort_keys=False))
+    return _digest_cells_incremental(cells)
+
+def _combine_sheet_hashes(sheet_hashes):
+    """
+    由各工作表雜湊組成整份檔案的雜湊
+    """
+    return _digest(_canonical_bytes(sheet_hashes))
+
+def hash_sheet_contents(cells_dict):
+    """
+    計算每個工作表的內容雜湊值 {工作表: hash}
+    """
+    if cells_dict is None:
+        return None
+    try:
+        return {ws: _hash_sheet(cells) for ws, cells in cells_dict.items()}
+    except (TypeError, ValueError) as e:
+        logging.error(f"計算工作表雜湊值失敗: {e}")
+        return None
+
+def hash_excel_content(cells_dict, sheet_hashes=None):
+    """
+    計算 Excel 內容的雜湊值（由各工作表雜湊值組成，可傳入已計算的 sheet_hashes 以免重算）
     """
     if cells_dict is None: 
         return None
     
+    if sheet_hashes is None:
+        sheet_hashes = hash_sheet_contents(cells_dict)
+    if sheet_hashes is None:
+        return None
     try:
-        content_str = json.dumps(cells_dict, sort_keys=True, ensure_ascii=False)
-        return hashlib.md5(content_str.encode('utf-8')).hexdigest()
-    except (TypeError, json.JSONEncodeError) as e:
+        return _combine_sheet_hashes(sheet_hashes)
+    except (TypeError, ValueError) as e:
         logging.error(f"計算 Excel 內容雜湊值失敗: {e}")
         return None
\ No newline at end of file
@@ -1,95 +1,175 @@
 import os
 import time
+import heapq
+import itertools
+import queue
 import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import config.settings as settings
+from utils.helpers import _TMP_PREFIX, supported_ext_set, get_file_mtime, _baseline_key_for_path
+from core.excel_parser import get_excel_last_author, dump_excel_cells_with_timeout, hash_excel_content, hash_sheet_contents, get_xlsx_zip_fingerprint
+from core.baseline import create_baseline_for_files_robust, get_baseline_file_with_extension, save_baseline, get_baseline_zip_fingerprint, get_baseline_source_stat
+from core.comparison import compare_excel_changes, set_current_event_number
 import logging
-from datetime import datetime
 
-class ActivePollingHandler:
+# 自適應輪詢間隔：有變動時縮短、無變動時拉長，限制在密集／稀疏輪詢間隔之間
+_POLL_SPEEDUP = 0.7
+_POLL_BACKOFF = 1.5
+
+@lru_cache(maxsize=64)
+def _root_prefixes(roots):
     """
-    主動輪詢處理器，採用新的智慧輪詢邏輯 + 穩定窗口/冷靜期
+    根目錄 tuple -> 正規化且以分隔符結尾的前綴 tuple；以設定值本身作鍵，設定改動後自然重算
     """
-    def __init__(self):
-        self.polling_tasks = {}
-        self.lock = threading.Lock()
-        self.stop_event = threading.Event()
-        # Phase 1: 狀態表（每檔案）
-        # { file_path: {"last_mtime":float, "last_size":int, "stable":int, "cooldown_until":float} }
-        self.state = {}
+    return tuple(os.path.normcase(os.path.abspath(r)).rstrip(os.sep) + os.sep for r in roots)
+
+@lru_cache(maxsize=4096)
+def _path_prefix(path):
+    """
+    事件路徑正規化為與 _root_prefixes 相同的形式，以 startswith 取代 os.path.commonpath
+    """
+    return os.path.normcase(os.path.abspath(path)).rstrip(os.sep) + os.sep
 
+class PollingTask:
     """
-    主動輪詢處理器，採用新的智慧輪詢邏輯
+    單一檔案一次輪詢期間的狀態；以 __slots__ 物件取代原本的排程 dict、狀態 dict 與事件時間表
+    """
+    __slots__ = ('file_path', 'event_number', 'seq', 'last_mtime', 'last_size', 'stable', 'cooldown_until',
+                 'last_check', 'last_event', 'min_interval', 'max_interval')
+
+    def __init__(self, file_path, event_number, last_mtime, last_size, min_interval, max_interval):
+        self.file_path = file_path
+        self.event_number = event_number
+        # 目前有效的排程序號；堆內序號不符的項目視為已取消
+        self.seq = 0
+        self.last_mtime = last_mtime
+        self.last_size = last_size
+        self.stable = 0
+        self.cooldown_until = 0.0
+        # 上次輪詢檢查及最近一次收到修改事件的時間（time.monotonic()）
+        self.last_check = time.monotonic()
+        self.last_event = 0.0
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+class ActivePollingHandler:
+    """
+    主動輪詢處理器，採用新的智慧輪詢邏輯 + 穩定窗口/冷靜期
     """
     def __init__(self):
+        # { file_path: PollingTask }；輪詢結束或停止時移除。
+        # 事件執行緒、工作執行緒及 stop() 都會增刪項目，增刪須持 _tasks_lock；讀取單一項目毋須加鎖
         self.polling_tasks = {}
-        self.lock = threading.Lock()
+        self._tasks_lock = threading.Lock()
         self.stop_event = threading.Event()
-        self.state = {}
+        # 單一排程執行緒取代每次輪詢各開一個 threading.Timer：
+        # 排程請求經 SimpleQueue 交給排程執行緒，堆只由排程執行緒存取，毋須加鎖；
+        # 堆內為 (到期時間, seq, file_path, callback)，seq 與該檔案 PollingTask.seq 不符者視為已取消；
+        # 到期的 callback 交給工作執行緒池執行，排程執行緒本身不做比較
+        self._inbox = queue.SimpleQueue()
+        self._seq = itertools.count(1)
+        self._executor = None
+        self._thread = threading.Thread(target=self._run_scheduler, name='polling-scheduler', daemon=True)
+        self._thread.start()
+
+    def _schedule(self, file_path, delay, callback, task=None):
+        """
+        delay 秒後在排程執行緒呼叫 callback；同一檔案只保留最後一次排程，已結束輪詢的檔案不再排程；
+        指定 task 時，該檔案的輪詢已由新一輪取代則不排程（避免舊一輪令新一輪的排程失效）
+        """
+        if self.stop_event.is_set():
+            return
+        with self._tasks_lock:
+            current = self.polling_tasks.get(file_path)
+            if current is None or (task is not None and current is not task):
+                return
+            seq = current.seq = next(self._seq)
+        self._inbox.put((time.monotonic() + delay, seq, file_path, callback))
 
-    def start_polling(self, file_path, event_number):
+    def _run_scheduler(self):
         """
-        根據檔案大小決定輪詢策略（用 mtime/size 穩定檢查，不再用與 baseline 的差異判斷）
+        排程執行緒：等待新排程直到最早的到期時間，取出到期項目後交給工作執行緒池；收到 None 即結束
         """
-        try:
-            file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
-        except (FileNotFoundError, PermissionError, OSError) as e:
-            logging.warning(f"獲取檔案大小失敗: {file_path}, 錯誤: {e}")
-            file_size_mb = 0
+        heap = []
+        while True:
+            timeout = max(0.0, heap[0][0] - time.monotonic()) if heap else None
+            try:
+                item = self._inbox.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+            if item is None or self.stop_event.is_set():
+                return
+            if item:
+                heapq.heappush(heap, item)
+            now = time.monotonic()
+            while heap and heap[0][0] <= now:
+                _, seq, file_path, callback = heapq.heappop(heap)
+                task = self.polling_tasks.get(file_path)
+                if task is None or task.seq != seq:
+                    # 已結束輪詢或已被新的排程取代
+                    continue
+                if self._executor is None:
+                    workers = max(1, int(getattr(settings, 'POLLING_WORKERS', 2) or 1))
+                    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='polling-worker')
+                try:
+                    self._executor.submit(self._run_task, file_path, callback)
+                except RuntimeError:
+                    # 執行緒池已關閉（stop）
+                    return
 
-        interval = settings.DENSE_POLLING_INTERVAL_SEC if file_size_mb < settings.POLLING_SIZE_THRESHOLD_MB else settings.SPARSE_POLLING_INTERVAL_SEC
-        polling_type = "密集" if file_size_mb < settings.POLLING_SIZE_THRESHOLD_MB else "稀疏"
-        
-        print(f"[輪詢] 檔案: {os.path.basename(file_path)} ({polling_type}輪詢，每 {interval}s 檢查一次)")
-        # 初始化 last_mtime/size 與狀態
-        try:
-            last_mtime = os.path.getmtime(file_path)
-        except Exception:
-            last_mtime = 0
+    @staticmethod
+    def _run_task(file_path, callback):
         try:
-            last_size = os.path.getsize(file_path)
-        except Exception:
-            last_size = -1
-        with self.lock:
-            self.state[file_path] = {"last_mtime": last_mtime, "last_size": last_size, "stable": 0, "cooldown_until": 0.0}
-        self._start_adaptive_polling(file_path, event_number, interval, last_mtime)
+            callback()
+        except Exception as e:
+            logging.error(f"輪詢任務執行失敗: {file_path}, 錯誤: {e}")
 
+    def start_polling(self, file_path, event_number):
         """
-        根據檔案大小決定輪詢策略（用 mtime 穩定檢查，不再用與 baseline 的差異判斷）
+        根據檔案大小決定輪詢策略（用 mtime/size 穩定檢查，不再用與 baseline 的差異判斷）
         """
+        name = os.path.basename(file_path)
+        # 一次 stat 同時取得大小與 mtime（網絡磁碟上每次 stat 都是一次往返）
         try:
-            file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
-        except (FileNotFoundError, PermissionError, OSError) as e:
+            fst = os.stat(file_path)
+            last_size, last_mtime = fst.st_size, fst.st_mtime
+        except OSError as e:
             logging.warning(f"獲取檔案大小失敗: {file_path}, 錯誤: {e}")
-            file_size_mb = 0
+            last_size, last_mtime = -1, 0
+        file_size_mb = max(last_size, 0) / (1024 * 1024)
 
         interval = settings.DENSE_POLLING_INTERVAL_SEC if file_size_mb < settings.POLLING_SIZE_THRESHOLD_MB else settings.SPARSE_POLLING_INTERVAL_SEC
         polling_type = "密集" if file_size_mb < settings.POLLING_SIZE_THRESHOLD_MB else "稀疏"
         
-        print(f"[輪詢] 檔案: {os.path.basename(file_path)} ({polling_type}輪詢，每 {interval}s 檢查一次)")
-        # 初始化 last_mtime
-        try:
-            last_mtime = os.path.getmtime(file_path)
-        except Exception:
-            last_mtime = 0
+        print(f"[輪詢] 檔案: {name} ({polling_type}輪詢，每 {interval}s 檢查一次)")
+        # 初始化狀態
+        dense, sparse = settings.DENSE_POLLING_INTERVAL_SEC, settings.SPARSE_POLLING_INTERVAL_SEC
+        task = PollingTask(file_path, event_number, last_mtime, last_size, min(dense, sparse), max(dense, sparse))
+        with self._tasks_lock:
+            self.polling_tasks[file_path] = task
         self._start_adaptive_polling(file_path, event_number, interval, last_mtime)
 
+    def note_event(self, file_path):
+        """
+        記錄輪詢中檔案收到修改事件；下次輪詢檢查時直接視為有變動
+        """
+        task = self.polling_tasks.get(file_path)
+        if task is not None:
+            task.last_event = time.monotonic()
+
     def _start_adaptive_polling(self, file_path, event_number, interval, last_mtime):
         """
         開始自適應輪詢
         """
-        with self.lock:
-            if file_path in self.polling_tasks:
-                self.polling_tasks[file_path]['timer'].cancel()
-
-            def task_wrapper():
-                self._poll_for_stability(file_path, event_number, interval, last_mtime)
+        # 新排程的 seq 會令同一檔案先前的排程失效
+        def task_wrapper():
+            self._poll_for_stability(file_path, event_number, interval, last_mtime)
 
-            timer = threading.Timer(interval, task_wrapper)
-            self.polling_tasks[file_path] = {'timer': timer}
-            timer.start()
-            print(f"    [輪詢啟動] {interval} 秒後首次檢查 {os.path.basename(file_path)}")
+        self._schedule(file_path, interval, task_wrapper)
+        print(f"    [輪詢啟動] {interval} 秒後首次檢查 {os.path.basename(file_path)}")
 
     def _poll_for_stability(self, file_path, event_number, interval, last_mtime):
         """
@@ -97,141 +177,105 @@ class ActivePollingHandler:
         """
         if self.stop_event.is_set():
             return
+        tasks = self.polling_tasks
+        task = tasks.get(file_path)
+        if task is None:
+            return
+        name = os.path.basename(file_path)
+        stable_checks = getattr(settings, 'POLLING_STABLE_CHECKS', 3)
+
+        def reschedule(delay):
+            self._schedule(file_path, delay, lambda: self._poll_for_stability(file_path, event_number, delay, last_mtime), task)
 
         # 冷靜期判斷
-        st = self.state.get(file_path, {})
         now = time.time()
-        if st and now < st.get("cooldown_until", 0):
-            print(f"    [cooldown] {os.path.basename(file_path)} 尚在冷靜期，略過本次。")
+        if now < task.cooldown_until:
+            print(f"    [cooldown] {name} 尚在冷靜期，略過本次。")
             # 重新排程
-            with self.lock:
-                if file_path in self.polling_tasks:
-                    new_timer = threading.Timer(interval, lambda: self._poll_for_stability(file_path, event_number, interval, last_mtime))
-                    self.polling_tasks[file_path]['timer'] = new_timer
-                    new_timer.start()
+            reschedule(interval)
             return
 
         # 檢測暫存鎖檔 (~$)
         if getattr(settings, 'SKIP_WHEN_TEMP_LOCK_PRESENT', True):
-            tmp_lock = os.path.join(os.path.dirname(file_path), "~$" + os.path.basename(file_path))
+            tmp_name = _TMP_PREFIX + name
             try:
-                if os.path.exists(tmp_lock):
-                    print(f"    [鎖檔] 偵測到 {os.path.basename(tmp_lock)}，延後檢查。")
-                    with self.lock:
-                        if file_path in self.polling_tasks:
-                            new_timer = threading.Timer(interval, lambda: self._poll_for_stability(file_path, event_number, interval, last_mtime))
-                            self.polling_tasks[file_path]['timer'] = new_timer
-                            new_timer.start()
+                if os.path.exists(os.path.join(os.path.dirname(file_path), tmp_name)):
+                    print(f"    [鎖檔] 偵測到 {tmp_name}，延後檢查。")
+                    reschedule(interval)
                     return
             except Exception:
                 pass
 
-        print(f"    [輪詢檢查] 正在檢查 {os.path.basename(file_path)} 的變更...")
+        print(f"    [輪詢檢查] 正在檢查 {name} 的變更...")
 
-        # 以 mtime/size 穩定判斷
-        try:
-            cur_mtime = os.path.getmtime(file_path)
-        except Exception:
-            cur_mtime = last_mtime
+        # 上次檢查後收到過修改事件即視為有變動（mtime 精度不足或大小不變的寫入也不會漏掉）；
+        # 否則才以 mtime/size 判斷（Excel 以暫存檔改名方式存檔時未必有 modified 事件，網絡磁碟亦可能漏報）
+        check_time = time.monotonic()
+        event_seen = task.last_event > task.last_check
+        task.last_check = check_time
         try:
-            cur_size = os.path.getsize(file_path)
-        except Exception:
-            cur_size = self.state.get(file_path, {}).get('last_size', -1)
+            fst = os.stat(file_path)
+            cur_mtime, cur_size = fst.st_mtime, fst.st_size
+        except OSError:
+            cur_mtime, cur_size = last_mtime, task.last_size
 
         changed = False
-        st = self.state.get(file_path, {})
-        if st:
-            if cur_mtime != st.get('last_mtime') or cur_size != st.get('last_size'):
-                changed = True
-                st['last_mtime'] = cur_mtime
-                st['last_size'] = cur_size
-                st['stable'] = 0
-                print(f"    [輪詢] 檢測到變動，等待穩定窗口（{getattr(settings,'POLLING_STABLE_CHECKS',3)} 次）…")
-            else:
-                st['stable'] = st.get('stable', 0) + 1
+        if event_seen or cur_mtime != task.last_mtime or cur_size != task.last_size:
+            changed = True
+            task.last_mtime = cur_mtime
+            task.last_size = cur_size
+            task.stable = 0
+            print(f"    [輪詢] 檢測到變動，等待穩定窗口（{stable_checks} 次）…")
+        else:
+            task.stable += 1
         
         has_changes = False
-        if st and st.get('stable', 0) >= getattr(settings, 'POLLING_STABLE_CHECKS', 3):
-            from core.comparison import compare_excel_changes, set_current_event_number
-            set_current_event_number(event_number)
-            print(f"    [輪詢] 已穩定，開始比較…")
-            has_changes = compare_excel_changes(file_path, silent=False, event_number=event_number, is_polling=True)
-
-        with self.lock:
-            if file_path not in self.polling_tasks:
-                return
-
-            if has_changes:
-                print(f"    [輪詢] 變更仍持續，啟動冷靜期，{getattr(settings,'POLLING_COOLDOWN_SEC',20)} 秒後再次檢查。")
-                st['cooldown_until'] = time.time() + float(getattr(settings, 'POLLING_COOLDOWN_SEC', 20))
-                st['stable'] = 0
-                new_timer = threading.Timer(interval, lambda: self._poll_for_stability(file_path, event_number, interval, last_mtime))
-                self.polling_tasks[file_path]['timer'] = new_timer
-                new_timer.start()
+        if task.stable >= stable_checks:
+            # zip 指紋（經快取副本讀取）與本程序已載入／保存的基準線相同：內容與基準線一致，毋須再解析；
+            # 基準線只在比較確認或更新後才會記錄新指紋，比較失敗時下次仍會重試
+            fp = get_xlsx_zip_fingerprint(file_path)
+            if fp is not None and fp == get_baseline_zip_fingerprint(_baseline_key_for_path(file_path)):
+                print(f"    [輪詢] 已穩定，zip 指紋與基準線相同，略過比較。")
             else:
-                # 若尚未達穩定次數，或剛檢測到變動，繼續等待；若已穩定且無變更，結束輪詢
-                if st and st.get('stable', 0) < getattr(settings, 'POLLING_STABLE_CHECKS', 3):
-                    new_timer = threading.Timer(interval, lambda: self._poll_for_stability(file_path, event_number, interval, last_mtime))
-                    self.polling_tasks[file_path]['timer'] = new_timer
-                    new_timer.start()
-                elif changed:
-                    new_timer = threading.Timer(interval, lambda: self._poll_for_stability(file_path, event_number, interval, last_mtime))
-                    self.polling_tasks[file_path]['timer'] = new_timer
-                    new_timer.start()
-                else:
-                    print(f"    [輪詢結束] {os.path.basename(file_path)} 檔案已穩定。")
-                    self.polling_tasks.pop(file_path, None)
-                    self.state.pop(file_path, None)
+                set_current_event_number(event_number)
+                print(f"    [輪詢] 已穩定，開始比較…")
+                has_changes = compare_excel_changes(file_path, silent=False, event_number=event_number, is_polling=True)
 
-        """
-        執行輪詢檢查，如果檔案變更則延長輪詢，否則結束
-        """
-        if self.stop_event.is_set():
+        # 比較期間輪詢已被停止或由新一輪取代
+        if tasks.get(file_path) is not task:
             return
 
-        print(f"    [輪詢檢查] 正在檢查 {os.path.basename(file_path)} 的變更...")
-
-        # 以 mtime 穩定判斷：如果 mtime 沒再變，視為穩定
-        try:
-            current_mtime = os.path.getmtime(file_path)
-        except Exception:
-            current_mtime = last_mtime
-
-        has_changes = False
-        if current_mtime != last_mtime:
-            # 有新變更，更新 last_mtime 並做一次比較
-            last_mtime = current_mtime
-            from core.comparison import compare_excel_changes, set_current_event_number
-            set_current_event_number(event_number)
-            # 在輪詢期間做可見比較；配合「比較後即時更新基準線」，可避免重覆打印相同變更
-            has_changes = compare_excel_changes(file_path, silent=False, event_number=event_number, is_polling=True)
-
-        with self.lock:
-            if file_path not in self.polling_tasks:
-                return
-
-            if has_changes:
-                print(f"    [輪詢] 檔案仍在變更，延長等待時間，{interval} 秒後再次檢查。")
-                
-                def task_wrapper():
-                    self._poll_for_stability(file_path, event_number, interval, last_mtime)
-                
-                new_timer = threading.Timer(interval, task_wrapper)
-                self.polling_tasks[file_path]['timer'] = new_timer
-                new_timer.start()
+        if has_changes:
+            print(f"    [輪詢] 變更仍持續，啟動冷靜期，{getattr(settings,'POLLING_COOLDOWN_SEC',20)} 秒後再次檢查。")
+            task.cooldown_until = time.time() + float(getattr(settings, 'POLLING_COOLDOWN_SEC', 20))
+            task.stable = 0
+            reschedule(interval)
+        else:
+            # 若尚未達穩定次數，或剛檢測到變動，繼續等待（間隔隨有無變動自適應）；若已穩定且無變更，結束輪詢
+            if changed or task.stable < stable_checks:
+                if changed:
+                    next_interval = max(task.min_interval, interval * _POLL_SPEEDUP)
+                else:
+                    next_interval = min(task.max_interval, interval * _POLL_BACKOFF)
+                reschedule(next_interval)
             else:
-                print(f"    [輪詢結束] {os.path.basename(file_path)} 檔案已穩定。")
-                self.polling_tasks.pop(file_path, None)
+                print(f"    [輪詢結束] {name} 檔案已穩定。")
+                # 只移除本輪的項目：檢查身分後至此期間可能已有新一輪輪詢（新的存檔）開始
+                with self._tasks_lock:
+                    if tasks.get(file_path) is task:
+                        del tasks[file_path]
 
     def stop(self):
         """
         停止所有輪詢任務
         """
         self.stop_event.set()
-        with self.lock:
-            for task in self.polling_tasks.values():
-                task['timer'].cancel()
+        with self._tasks_lock:
             self.polling_tasks.clear()
+        self._inbox.put(None)
+        executor = self._executor
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
 
 class ExcelFileEventHandler(FileSystemEventHandler):
     """
@@ -239,15 +283,19 @@ class ExcelFileEventHandler(FileSystemEventHandler):
     """
     def __init__(self, polling_handler):
         self.polling_handler = polling_handler
-        self.last_event_times = {}
+        # 每個檔案最後一次成功處理時的 (st_size, st_mtime_ns)，用於略過內容未變的修改事件
+        self._last_stat = {}
         self.event_counter = 0
+        # 合併中的修改事件 {file_path: 最後事件時間 (time.monotonic())}；
+        # 同一檔案連串事件只保留最後時間，靜止 DEBOUNCE_INTERVAL_SEC 後才由背景執行緒處理一次
+        self._pending = {}
+        self._pending_cv = threading.Condition()
+        self._worker = None
         
     def _is_cache_ignored(self, path: str) -> bool:
         try:
             if getattr(settings, 'IGNORE_CACHE_FOLDER', False) and getattr(settings, 'CACHE_FOLDER', None):
-                p = os.path.abspath(path)
-                c = os.path.abspath(settings.CACHE_FOLDER)
-                return os.path.commonpath([p, c]) == c
+                return _path_prefix(path).startswith(_root_prefixes((settings.CACHE_FOLDER,)))
         except Exception:
             pass
         return False
@@ -255,58 +303,44 @@ class ExcelFileEventHandler(FileSystemEventHandler):
     def _is_log_ignored(self, path: str) -> bool:
         try:
             if getattr(settings, 'IGNORE_LOG_FOLDER', False) and getattr(settings, 'LOG_FOLDER', None):
-                p = os.path.abspath(path)
-                l = os.path.abspath(settings.LOG_FOLDER)
-                return os.path.commonpath([p, l]) == l
-        except Exception:
-            pass
-        return False
-        try:
-            if getattr(settings, 'IGNORE_CACHE_FOLDER', False) and getattr(settings, 'CACHE_FOLDER', None):
-                p = os.path.abspath(path)
-                c = os.path.abspath(settings.CACHE_FOLDER)
-                return os.path.commonpath([p, c]) == c
+                return _path_prefix(path).startswith(_root_prefixes((settings.LOG_FOLDER,)))
         except Exception:
             pass
         return False
 
+    @staticmethod
+    def _should_ignore(event) -> bool:
+        """
+        目錄、非支援副檔名或 Excel 臨時檔 (~$) 的事件一律忽略
+        """
+        if event.is_directory:
+            return True
+        path = event.src_path
+        return (os.path.splitext(path)[1].lower() not in supported_ext_set()
+                or os.path.basename(path)[:2] == _TMP_PREFIX)
+
     def on_created(self, event):
         """
         檔案建立事件處理
         """
-        if event.is_directory:
+        if self._should_ignore(event):
             return
 
         file_path = event.src_path
 
-        # 檢查是否為支援的 Excel 檔案
-        if not file_path.lower().endswith(settings.SUPPORTED_EXTS):
-            return
-
-        # 檢查是否為臨時檔案
-        if os.path.basename(file_path).startswith('~$'):
-            return
-
         print(f"\n✨ 發現新檔案: {os.path.basename(file_path)}")
         print(f"📊 正在建立基準線...")
 
-        from core.baseline import create_baseline_for_files_robust
         create_baseline_for_files_robust([file_path])
 
         print(f"✅ 基準線建立完成，已納入監控: {os.path.basename(file_path)}")
 
     def _is_in_watch_folders(self, path: str) -> bool:
         try:
-            p = os.path.abspath(path)
-            for root in (settings.WATCH_FOLDERS or []):
-                r = os.path.abspath(root)
-                if os.path.commonpath([p, r]) == r:
-                    # 排除清單
-                    for ex in (getattr(settings, 'WATCH_EXCLUDE_FOLDERS', []) or []):
-                        exa = os.path.abspath(ex)
-                        if os.path.commonpath([p, exa]) == exa:
-                            return False
-                    return True
+            p = _path_prefix(path)
+            if p.startswith(_root_prefixes(tuple(settings.WATCH_FOLDERS or ()))):
+                # 排除清單
+                return not p.startswith(_root_prefixes(tuple(getattr(settings, 'WATCH_EXCLUDE_FOLDERS', []) or ())))
         except Exception:
             pass
         return False
@@ -316,16 +350,10 @@ class ExcelFileEventHandler(FileSystemEventHandler):
         if self._is_in_watch_folders(path):
             return False
         try:
-            p = os.path.abspath(path)
-            for root in (settings.MONITOR_ONLY_FOLDERS or []):
-                r = os.path.abspath(root)
-                if os.path.commonpath([p, r]) == r:
-                    # 排除清單
-                    for ex in (getattr(settings, 'MONITOR_ONLY_EXCLUDE_FOLDERS', []) or []):
-                        exa = os.path.abspath(ex)
-                        if os.path.commonpath([p, exa]) == exa:
-                            return False
-                    return True
+            p = _path_prefix(path)
+            if p.startswith(_root_prefixes(tuple(settings.MONITOR_ONLY_FOLDERS or ()))):
+                # 排除清單
+                return not p.startswith(_root_prefixes(tuple(getattr(settings, 'MONITOR_ONLY_EXCLUDE_FOLDERS', []) or ())))
         except Exception:
             pass
         return False
@@ -334,7 +362,7 @@ class ExcelFileEventHandler(FileSystemEventHandler):
         """
         檔案修改事件處理
         """
-        if event.is_directory:
+        if self._should_ignore(event):
             return
             
         file_path = event.src_path
@@ -342,56 +370,106 @@ class ExcelFileEventHandler(FileSystemEventHandler):
         # 忽略 cache 與 log 目錄下的所有事件
         if self._is_cache_ignored(file_path) or self._is_log_ignored(file_path):
             return
-        
-        # 檢查是否為支援的 Excel 檔案
-        if not file_path.lower().endswith(settings.SUPPORTED_EXTS):
-            return
-            
-        # 檢查是否為臨時檔案
-        if os.path.basename(file_path).startswith('~$'):
+
+        # 輪詢中的檔案：在防抖動前通知輪詢器，讓穩定窗口重新計算
+        self.polling_handler.note_event(file_path)
+
+        # 防抖動：只記下最後事件時間，比較交由背景執行緒在事件靜止後處理，不阻塞 watchdog 的事件分派執行緒
+        with self._pending_cv:
+            self._pending[file_path] = time.monotonic()
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._drain_loop, name='excel-event-worker', daemon=True)
+                self._worker.start()
+            self._pending_cv.notify()
+
+    def _drain_loop(self):
+        """
+        取出已靜止 DEBOUNCE_INTERVAL_SEC 的檔案，每個連串事件只處理一次
+        """
+        while True:
+            with self._pending_cv:
+                while True:
+                    if not self._pending:
+                        self._pending_cv.wait()
+                        continue
+                    debounce = float(settings.DEBOUNCE_INTERVAL_SEC)
+                    now = time.monotonic()
+                    due = [p for p, ts in self._pending.items() if now - ts >= debounce]
+                    if due:
+                        for p in due:
+                            del self._pending[p]
+                        break
+                    self._pending_cv.wait(min(self._pending.values()) + debounce - now)
+            for file_path in due:
+                try:
+                    self._process_settled(file_path)
+                except Exception as e:
+                    logging.error(f"處理檔案變更事件失敗: {file_path}, 錯誤: {e}")
+
+    def _process_settled(self, file_path):
+        """
+        連串事件靜止後處理一次：大小與修改時間都沒變（雲端同步掃描等造成的假事件）則毋須比較
+        """
+        try:
+            st = os.stat(file_path)
+            key = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            st = key = None
+        if key is not None and self._last_stat.get(file_path) == key:
             return
-            
-        # 防抖動處理
-        current_time = time.time()
-        if file_path in self.last_event_times:
-            if current_time - self.last_event_times[file_path] < settings.DEBOUNCE_INTERVAL_SEC:
-                return
-                
-        self.last_event_times[file_path] = current_time
+
         self.event_counter += 1
-        
+        self._handle_modified(file_path, self.event_counter)
+
+        # 處理完成且基準線已對應這次的 size/mtime（比較確認或已更新）才記下；
+        # 比較失敗時基準線不變，之後同樣 size/mtime 的事件仍會重新處理
+        if key is not None and get_baseline_source_stat(_baseline_key_for_path(file_path)) == (st.st_size, st.st_mtime):
+            self._last_stat[file_path] = key
+
+    def _handle_modified(self, file_path, event_number):
+        """
+        修改事件的實際處理：作者、靜默預覽比較、monitor-only 基準線、即時比較及啟動輪詢
+        """
+        # 檢查檔案是否已經在輪詢中：輪詢會自行比較，毋須再讀取檔案做預覽
+        if file_path in self.polling_handler.polling_tasks:
+            print(f"    [偵測] {os.path.basename(file_path)} 正在輪詢中，忽略本次即時檢查。")
+            return
+
         # 獲取檔案最後作者
         try:
-            from core.excel_parser import get_excel_last_author
             last_author = get_excel_last_author(file_path)
             author_info = f" (最後儲存者: {last_author})" if last_author != 'Unknown' else ""
         except Exception as e:
             author_info = ""
         
         # 先做一次靜默比對，若無變更則不噪音輸出（仍可後續輪詢）
-        from core.comparison import compare_excel_changes, set_current_event_number
-        set_current_event_number(self.event_counter)
-        has_changes_preview = compare_excel_changes(file_path, silent=True, event_number=self.event_counter, is_polling=False)
+        set_current_event_number(event_number)
+        has_changes_preview = compare_excel_changes(file_path, silent=True, event_number=event_number, is_polling=False)
         
         if has_changes_preview:
-            print(f"\n🔔 檔案變更偵測: {os.path.basename(file_path)} (事件 #{self.event_counter}){author_info}")
+            print(f"\n🔔 檔案變更偵測: {os.path.basename(file_path)} (事件 #{event_number}){author_info}")
         
         # 監控但不預先 baseline 的區域：首次變更只紀錄資訊並建立 baseline，之後才比較
         if self._is_monitor_only(file_path):
             try:
-                from utils.helpers import get_file_mtime
                 mtime = get_file_mtime(file_path)
                 print(f"    [MONITOR-ONLY] {file_path}\n       - 最後修改時間: {mtime}\n       - 最後儲存者: {last_author}")
                 # 若尚未有 baseline，先建立一份；已存在則繼續走下面的比較流程
-                from core.baseline import get_baseline_file_with_extension, save_baseline
-                from core.excel_parser import dump_excel_cells_with_timeout, hash_excel_content
-                from utils.helpers import _baseline_key_for_path
                 base_key = _baseline_key_for_path(file_path)
                 baseline_exists = bool(get_baseline_file_with_extension(base_key))
                 if not baseline_exists:
+                    # 讀取前的 stat：讀取期間檔案再被改動時，下次比較不會被誤判為可快速跳過
+                    try:
+                        src_st = os.stat(file_path)
+                    except OSError:
+                        src_st = None
                     cur = dump_excel_cells_with_timeout(file_path)
                     if cur:
-                        bdata = {"last_author": last_author, "content_hash": hash_excel_content(cur), "cells": cur, "timestamp": datetime.now().isoformat()}
+                        sheet_hashes = hash_sheet_contents(cur)
+                        bdata = {"last_author": last_author, "content_hash": hash_excel_content(cur, sheet_hashes=sheet_hashes), "sheet_hashes": sheet_hashes, "zip_fingerprint": get_xlsx_zip_fingerprint(file_path), "sorted_addresses": {ws: sorted(cells) for ws, cells in cur.items()}, "cells": cur, "timestamp_ns": time.time_ns()}
+                        if src_st is not None:
+                            bdata["source_mtime"] = src_st.st_mtime
+                            bdata["source_size"] = src_st.st_size
                         save_baseline(base_key, bdata)
                         print("    [MONITOR-ONLY] 已建立首次基準線（本次不比較）。")
                         return
@@ -399,17 +477,9 @@ class ExcelFileEventHandler(FileSystemEventHandler):
                 logging.warning(f"monitor-only 初始化失敗: {e}")
                 return
         
-        # 🔥 設定事件編號並立即執行一次比較
-        from core.comparison import compare_excel_changes, set_current_event_number
-        set_current_event_number(self.event_counter)
-        
-        # 檢查檔案是否已經在輪詢中
-        if file_path in self.polling_handler.polling_tasks:
-            print(f"    [偵測] {os.path.basename(file_path)} 正在輪詢中，忽略本次即時檢查。")
-            return
-
+        # 🔥 立即執行一次比較（可重用靜默預覽剛讀到的內容；事件編號已於預覽前設定）
         print(f"📊 立即檢查變更...")
-        has_changes = compare_excel_changes(file_path, silent=False, event_number=self.event_counter, is_polling=False)
+        has_changes = compare_excel_changes(file_path, silent=False, event_number=event_number, is_polling=False)
         
         if has_changes:
             print(f"✅ 偵測到變更，啟動輪詢以監控後續活動...")
@@ -417,8 +487,19 @@ class ExcelFileEventHandler(FileSystemEventHandler):
             print(f"ℹ️  未發現即時變更，啟動輪詢以監控後續活動...")
         
         # 開始輪詢
-        self.polling_handler.start_polling(file_path, self.event_counter)
+        self.polling_handler.start_polling(file_path, event_number)
 
-# 創建全局輪詢處理器實例
-active_polling_handler = ActivePollingHandler()
+# 全局輪詢處理器實例：首次取用時才建立，import 本模組不會產生任何狀態
+_polling_handler = None
+_polling_handler_lock = threading.Lock()
+
+def get_polling_handler():
+    """
+    取得全局 ActivePollingHandler（延遲建立）
+    """
+    global _polling_handler
+    with _polling_handler_lock:
+        if _polling_handler is None:
+            _polling_handler = ActivePollingHandler()
+        return _polling_handler
 
@@ -6,7 +6,6 @@ import os
 import sys
 import signal
 import threading
-import time
 from datetime import datetime
 import logging
 
@@ -22,7 +21,7 @@ from utils.helpers import get_all_excel_files, timeout_handler
 from utils.compression import CompressionFormat, test_compression_support  # 新增
 from ui.console import init_console
 from core.baseline import create_baseline_for_files_robust
-from core.watcher import active_polling_handler, ExcelFileEventHandler
+from core.watcher import get_polling_handler, ExcelFileEventHandler
 from core.comparison import set_current_event_number
 from watchdog.observers import Observer
 
@@ -32,10 +31,11 @@ def signal_handler(signum, frame):
     """
     if not settings.force_stop:
         settings.force_stop = True
+        settings.stop_event.set()
         print("\n🛑 收到中斷信號，正在安全停止...")
-        if settings.current_processing_file: 
-            print(f"   目前處理檔案: {settings.current_processing_file}")
-        active_polling_handler.stop()
+        for path in list(settings.processing_files):
+            print(f"   目前處理檔案: {path}")
+        get_polling_handler().stop()
         print("   (再按一次 Ctrl+C 強制退出)")
     else:
         print("\n💥 強制退出...")
@@ -122,7 +122,7 @@ def main():
     
     # 啟動檔案監控
     print("\n👀 啟動檔案監控...")
-    event_handler = ExcelFileEventHandler(active_polling_handler)
+    event_handler = ExcelFileEventHandler(get_polling_handler())
     observer = Observer()
     
     # 對 WATCH_FOLDERS 與 MONITOR_ONLY_FOLDERS 都要註冊監控
@@ -150,15 +150,18 @@ def main():
     print("\n按 Ctrl+C 停止監控...")
     
     try:
-        while not settings.force_stop:
-            time.sleep(1)
+        # POSIX 上 wait() 可被信號中斷，閒置時毋須定時喚醒；
+        # Windows 的 wait() 期間不會執行 Ctrl+C 的信號處理器，仍須定時返回
+        timeout = 1.0 if os.name == 'nt' else None
+        while not settings.stop_event.wait(timeout):
+            pass
     except KeyboardInterrupt:
         pass
     finally:
         print("\n🔄 正在停止監控...")
         observer.stop()
         observer.join()
-        active_polling_handler.stop()
+        get_polling_handler().stop()
         print("✅ 監控已停止")
 
 if __name__ == "__main__":
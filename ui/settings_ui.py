@@ -6,529 +6,770 @@ Startup Settings UI (Tkinter)
 """
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import os, json, sys
-from typing import Dict, Any
+import os, sys, re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, NamedTuple
 import config.settings as settings
 import config.runtime as runtime
 from config.runtime import load_runtime_settings, save_runtime_settings, apply_to_settings
 
-PARAMS_SPEC = [
+class Param(NamedTuple):
+    """
+    單一設定項目的描述：鍵名、標籤、說明、輸入元件類型及類型相關的選項
+    """
+    key: str
+    label: str
+    help: str
+    type: str
+    priority: int = 100
+    path_kind: str = ''
+    choices: tuple = ()
+
+# SUPPORTED_EXTS 輸入的分隔符：逗號、分號、空白，以及一律略過的引號與括號
+_EXT_SPLIT_RE = re.compile(r"[,;\s'\"()\[\]{}]+")
+
+def _normalize_exts(text):
+    # 一次切分取出各副檔名（轉小寫，未以 . 開頭的補上 .）
+    exts = (x.lower() for x in _EXT_SPLIT_RE.split(text) if x)
+    return [x if x.startswith('.') else '.' + x for x in exts]
+
+PARAMS_SPEC = (
     # 監控與檔案類型
-    {
-        'key': 'WATCH_FOLDERS',
-        'priority': 1,
-        'label': '監控資料夾（可多個）',
-        'help': '指定需要監控的資料夾（可多個）。支援網路磁碟。系統會遞迴監控子資料夾。可用下方「新增資料夾」按鈕加入。',
-        'type': 'paths',
-        'path_kind': 'dir',
-    },
-    {
-        'key': 'SUPPORTED_EXTS',
-        'label': '檔案類型 (Excel 為 .xlsx,.xlsm)',
-        'help': '設定需要監控的檔案副檔名，逗號分隔（例如 .xlsx,.xlsm）。會自動正規化為小寫並加上點號。',
-        'type': 'text',
-    },
-    {
-        'key': 'MANUAL_BASELINE_TARGET',
-        'priority': 3,
-        'label': '手動建立基準線的檔案清單',
-        'help': '啟動時會先對這些檔案建立基準線（可多個）。使用「新增檔案」加入。',
-        'type': 'paths',
-        'path_kind': 'file',
-    },
-    {
-        'key': 'MONITOR_ONLY_FOLDERS',
-        'priority': 4,
-        'label': '只監控變更的根目錄（Issue B）',
-        'help': '在此清單內的根目錄底下，第一次偵測到 Excel 檔變更時，系統只會記錄路徑、最後修改時間與最後儲存者，並建立首次基準線；下一次變更才進入普通比較流程。若某子資料夾同時在 WATCH_FOLDERS，則以 WATCH_FOLDERS 的即時比較為優先。',
-        'type': 'paths',
-        'path_kind': 'dir',
-    },
-    {
-        'key': 'WATCH_EXCLUDE_FOLDERS',
-        'priority': 2,
-        'label': '即時比較的排除清單（子資料夾）',
-        'help': '若在 WATCH_FOLDERS 中，這些子資料夾會被排除，不進行即時比較。',
-        'type': 'paths',
-        'path_kind': 'dir',
-    },
-    {
-        'key': 'MONITOR_ONLY_EXCLUDE_FOLDERS',
-        'priority': 5,
-        'label': '只監控變更的排除清單（子資料夾）',
-        'help': '若在 MONITOR_ONLY_FOLDERS 中，這些子資料夾會被排除，不進行 monitor-only。',
-        'type': 'paths',
-        'path_kind': 'dir',
-    },
-    {
-        'key': 'SCAN_TARGET_FOLDERS',
-        'priority': 3,
-        'label': '啟動掃描的指定目錄（可多個）',
-        'help': '啟動掃描時建立基準線的目錄清單。預設會以 WATCH_FOLDERS 全部為準；你可在此列表移除不想掃描的目錄或自行新增。',
-        'type': 'paths',
-        'path_kind': 'dir',
-    },
-    {
-        'key': 'AUTO_SYNC_SCAN_TARGETS',
-        'priority': 3,
-        'label': '啟動掃描清單自動同步監控資料夾',
-        'help': '開啟後，「啟動掃描的指定目錄」會自動與「監控資料夾」一致；關閉可手動指定子集。',
-        'type': 'bool',
-    },
-    {
-        'key': 'SCAN_ALL_MODE',
-        'priority': 3,
-        'label': '啟動時掃描所有 Excel 並建立基準線',
-        'help': '開啟後，啟動時會掃描 WATCH_FOLDERS 內所有支援檔案並建立初始基準線。關閉可縮短大型磁碟啟動時間。',
-        'type': 'bool',
-    },
+    Param(
+        key='WATCH_FOLDERS',
+        priority=1,
+        label='監控資料夾（可多個）',
+        help='指定需要監控的資料夾（可多個）。支援網路磁碟。系統會遞迴監控子資料夾。可用下方「新增資料夾」按鈕加入。',
+        type='paths',
+        path_kind='dir',
+    ),
+    Param(
+        key='SUPPORTED_EXTS',
+        label='檔案類型 (Excel 為 .xlsx,.xlsm)',
+        help='設定需要監控的檔案副檔名，逗號分隔（例如 .xlsx,.xlsm）。會自動正規化為小寫並加上點號。',
+        type='text',
+    ),
+    Param(
+        key='MANUAL_BASELINE_TARGET',
+        priority=3,
+        label='手動建立基準線的檔案清單',
+        help='啟動時會先對這些檔案建立基準線（可多個）。使用「新增檔案」加入。',
+        type='paths',
+        path_kind='file',
+    ),
+    Param(
+        key='MONITOR_ONLY_FOLDERS',
+        priority=4,
+        label='只監控變更的根目錄（Issue B）',
+        help='在此清單內的根目錄底下，第一次偵測到 Excel 檔變更時，系統只會記錄路徑、最後修改時間與最後儲存者，並建立首次基準線；下一次變更才進入普通比較流程。若某子資料夾同時在 WATCH_FOLDERS，則以 WATCH_FOLDERS 的即時比較為優先。',
+        type='paths',
+        path_kind='dir',
+    ),
+    Param(
+        key='WATCH_EXCLUDE_FOLDERS',
+        priority=2,
+        label='即時比較的排除清單（子資料夾）',
+        help='若在 WATCH_FOLDERS 中，這些子資料夾會被排除，不進行即時比較。',
+        type='paths',
+        path_kind='dir',
+    ),
+    Param(
+        key='MONITOR_ONLY_EXCLUDE_FOLDERS',
+        priority=5,
+        label='只監控變更的排除清單（子資料夾）',
+        help='若在 MONITOR_ONLY_FOLDERS 中，這些子資料夾會被排除，不進行 monitor-only。',
+        type='paths',
+        path_kind='dir',
+    ),
+    Param(
+        key='SCAN_TARGET_FOLDERS',
+        priority=3,
+        label='啟動掃描的指定目錄（可多個）',
+        help='啟動掃描時建立基準線的目錄清單。預設會以 WATCH_FOLDERS 全部為準；你可在此列表移除不想掃描的目錄或自行新增。',
+        type='paths',
+        path_kind='dir',
+    ),
+    Param(
+        key='AUTO_SYNC_SCAN_TARGETS',
+        priority=3,
+        label='啟動掃描清單自動同步監控資料夾',
+        help='開啟後，「啟動掃描的指定目錄」會自動與「監控資料夾」一致；關閉可手動指定子集。',
+        type='bool',
+    ),
+    Param(
+        key='SCAN_ALL_MODE',
+        priority=3,
+        label='啟動時掃描所有 Excel 並建立基準線',
+        help='開啟後，啟動時會掃描 WATCH_FOLDERS 內所有支援檔案並建立初始基準線。關閉可縮短大型磁碟啟動時間。',
+        type='bool',
+    ),
 
     # 快取與暫存
-    {
-        'key': 'USE_LOCAL_CACHE',
-        'label': '啟用本地快取',
-        'help': '讀取網路檔前先複製到本地快取，提高穩定性與速度。',
-        'type': 'bool',
-    },
-    {
-        'key': 'CACHE_FOLDER',
-        'priority': 3,
-        'label': '本地快取資料夾',
-        'help': '設定本地快取位置。需具備讀寫權限。可透過「瀏覽」選擇資料夾。',
-        'type': 'path',
-        'path_kind': 'dir',
-    },
+    Param(
+        key='USE_LOCAL_CACHE',
+        label='啟用本地快取',
+        help='讀取網路檔前先複製到本地快取，提高穩定性與速度。',
+        type='bool',
+    ),
+    Param(
+        key='CACHE_FOLDER',
+        priority=3,
+        label='本地快取資料夾',
+        help='設定本地快取位置。需具備讀寫權限。可透過「瀏覽」選擇資料夾。',
+        type='path',
+        path_kind='dir',
+    ),
 
     # 超時/記憶體/恢復
-    {
-        'key': 'ENABLE_TIMEOUT',
-        'label': '啟用檔案處理超時保護',
-        'help': '當單一檔案處理超過 FILE_TIMEOUT_SECONDS 時中止該檔處理，避免長時間卡住。',
-        'type': 'bool',
-    },
-    {
-        'key': 'FILE_TIMEOUT_SECONDS',
-        'label': '單檔超時秒數',
-        'help': '超過此秒數仍未完成讀取/比較會視為超時。',
-        'type': 'int',
-    },
-    {
-        'key': 'ENABLE_MEMORY_MONITOR',
-        'label': '啟用記憶體監控',
-        'help': '當行程記憶體超過限制時自動觸發垃圾回收並告警。',
-        'type': 'bool',
-    },
-    {
-        'key': 'MEMORY_LIMIT_MB',
-        'label': '記憶體上限 (MB)',
-        'help': '超過此數值時會嘗試釋放記憶體並提示。',
-        'type': 'int',
-    },
-    {
-        'key': 'ENABLE_RESUME',
-        'label': '啟用進度恢復',
-        'help': '建立大量基準線時，將進度寫入 RESUME_LOG_FILE，重新啟動可續傳。',
-        'type': 'bool',
-    },
-    {
-        'key': 'RESUME_LOG_FILE',
-        'priority': 4,
-        'label': '進度紀錄檔路徑',
-        'help': '保存基準線建立進度的檔案路徑，建議放在本機磁碟。',
-        'type': 'path',
-        'path_kind': 'save_file',
-    },
+    Param(
+        key='ENABLE_TIMEOUT',
+        label='啟用檔案處理超時保護',
+        help='當單一檔案處理超過 FILE_TIMEOUT_SECONDS 時中止該檔處理，避免長時間卡住。',
+        type='bool',
+    ),
+    Param(
+        key='FILE_TIMEOUT_SECONDS',
+        label='單檔超時秒數',
+        help='超過此秒數仍未完成讀取/比較會視為超時。',
+        type='int',
+    ),
+    Param(
+        key='ENABLE_MEMORY_MONITOR',
+        label='啟用記憶體監控',
+        help='當行程記憶體超過限制時自動觸發垃圾回收並告警。',
+        type='bool',
+    ),
+    Param(
+        key='MEMORY_LIMIT_MB',
+        label='記憶體上限 (MB)',
+        help='超過此數值時會嘗試釋放記憶體並提示。',
+        type='int',
+    ),
+    Param(
+        key='ENABLE_RESUME',
+        label='啟用進度恢復',
+        help='建立大量基準線時，將進度寫入 RESUME_LOG_FILE，重新啟動可續傳。',
+        type='bool',
+    ),
+    Param(
+        key='RESUME_LOG_FILE',
+        priority=4,
+        label='進度紀錄檔路徑',
+        help='保存基準線建立進度的檔案路徑，建議放在本機磁碟。',
+        type='path',
+        path_kind='save_file',
+    ),
 
     # 監視邏輯/防抖
-    {
-        'key': 'DEBOUNCE_INTERVAL_SEC',
-        'label': '防抖動間隔 (秒)',
-        'help': '相同檔案在短時間內多次事件，會合併為一次。',
-        'type': 'int',
-    },
+    Param(
+        key='DEBOUNCE_INTERVAL_SEC',
+        label='防抖動間隔 (秒)',
+        help='相同檔案在短時間內多次事件，會合併為一次。',
+        type='int',
+    ),
 
     # 比較邏輯
-    {
-        'key': 'FORMULA_ONLY_MODE',
-        'label': '只關注公式變更',
-        'help': '啟用後，僅比較與顯示公式的變更。',
-        'type': 'bool',
-    },
-    {
-        'key': 'TRACK_DIRECT_VALUE_CHANGES',
-        'label': '追蹤直接值變更',
-        'help': '若某格為輸入文字/數字（非公式），其值變更會被記錄。',
-        'type': 'bool',
-    },
-    {
-        'key': 'TRACK_FORMULA_CHANGES',
-        'label': '追蹤公式變更',
-        'help': '只要儲存格的公式字串有改動（例如 =A1+B1 → =A1+B2）便會記錄。',
-        'type': 'bool',
-    },
-    {
-        'key': 'ENABLE_FORMULA_VALUE_CHECK',
-        'label': '外部參照：值不變視為無變更',
-        'help': '當外部參照公式的字串因刷新而有差異，但其儲存的數值（cached value）沒有改變時，忽略該變更（避免假警報）。只對快取副本進行 read-only 讀取。',
-        'type': 'bool',
-    },
-    {
-        'key': 'MAX_FORMULA_VALUE_CELLS',
-        'label': '值比對的最大公式格數（跨表合計）',
-        'help': '為了效能，只對前 N 個含公式的儲存格查詢其 cached value。超過此數量時跳過值比對（仍會比較公式字串）。',
-        'type': 'int',
-    },
-    {
-        'key': 'TRACK_EXTERNAL_REFERENCES',
-        'label': '追蹤外部參照更新',
-        'help': '公式不變、但外部連結刷新導致結果變更時記錄。',
-        'type': 'bool',
-    },
-    {
-        'key': 'IGNORE_INDIRECT_CHANGES',
-        'label': '忽略間接影響變更',
-        'help': '公式不變、僅因工作簿內其他儲存格改動導致結果變化時忽略。',
-        'type': 'bool',
-    },
-    {
-        'key': 'MAX_CHANGES_TO_DISPLAY',
-        'label': '畫面顯示變更上限 (0=不限制)',
-        'help': '限制 console 表格一次展示的變更數，有助於大檔案閱讀。',
-        'type': 'int',
-    },
-    {
-        'key': 'AUTO_UPDATE_BASELINE_AFTER_COMPARE',
-        'label': '比較後自動更新基準線',
-        'help': '當偵測到變更後，是否自動以「目前內容」更新成新的基準線。',
-        'type': 'bool',
-    },
+    Param(
+        key='FORMULA_ONLY_MODE',
+        label='只關注公式變更',
+        help='啟用後，僅比較與顯示公式的變更。',
+        type='bool',
+    ),
+    Param(
+        key='TRACK_DIRECT_VALUE_CHANGES',
+        label='追蹤直接值變更',
+        help='若某格為輸入文字/數字（非公式），其值變更會被記錄。',
+        type='bool',
+    ),
+    Param(
+        key='TRACK_FORMULA_CHANGES',
+        label='追蹤公式變更',
+        help='只要儲存格的公式字串有改動（例如 =A1+B1 → =A1+B2）便會記錄。',
+        type='bool',
+    ),
+    Param(
+        key='ENABLE_FORMULA_VALUE_CHECK',
+        label='外部參照：值不變視為無變更',
+        help='當外部參照公式的字串因刷新而有差異，但其儲存的數值（cached value）沒有改變時，忽略該變更（避免假警報）。只對快取副本進行 read-only 讀取。',
+        type='bool',
+    ),
+    Param(
+        key='MAX_FORMULA_VALUE_CELLS',
+        label='值比對的最大公式格數（跨表合計）',
+        help='為了效能，只對前 N 個含公式的儲存格查詢其 cached value。超過此數量時跳過值比對（仍會比較公式字串）。',
+        type='int',
+    ),
+    Param(
+        key='TRACK_EXTERNAL_REFERENCES',
+        label='追蹤外部參照更新',
+        help='公式不變、但外部連結刷新導致結果變更時記錄。',
+        type='bool',
+    ),
+    Param(
+        key='IGNORE_INDIRECT_CHANGES',
+        label='忽略間接影響變更',
+        help='公式不變、僅因工作簿內其他儲存格改動導致結果變化時忽略。',
+        type='bool',
+    ),
+    Param(
+        key='MAX_CHANGES_TO_DISPLAY',
+        label='畫面顯示變更上限 (0=不限制)',
+        help='限制 console 表格一次展示的變更數，有助於大檔案閱讀。',
+        type='int',
+    ),
+    Param(
+        key='AUTO_UPDATE_BASELINE_AFTER_COMPARE',
+        label='比較後自動更新基準線',
+        help='當偵測到變更後，是否自動以「目前內容」更新成新的基準線。',
+        type='bool',
+    ),
 
     # 壓縮/歸檔
-    {
-        'key': 'DEFAULT_COMPRESSION_FORMAT',
-        'label': '基準線壓縮格式',
-        'help': '選擇基準線儲存格式：lz4 (讀寫快), zstd (壓縮高), gzip (相容性)。',
-        'type': 'choice',
-        'choices': ['lz4','zstd','gzip']
-    },
-    {
-        'key': 'LZ4_COMPRESSION_LEVEL',
-        'label': 'LZ4 壓縮等級 (0-16)',
-        'help': '速度最快，讀取幾乎不受影響。等級越高壓縮率越好但寫入較慢：0-3 非常快、壓縮較低；4-9 折衝；10-16 壓縮更高但明顯變慢。',
-        'type': 'int',
-    },
-    {
-        'key': 'ZSTD_COMPRESSION_LEVEL',
-        'label': 'Zstd 壓縮等級 (1-22)',
-        'help': '高壓縮比通用首選：1-3 偏速度；4-9 折衝（常用 3-6）；10-18 更高壓縮但寫入耗時；19-22 極致壓縮、CPU時間很長（僅限空間極度敏感）。',
-        'type': 'int',
-    },
-    {
-        'key': 'GZIP_COMPRESSION_LEVEL',
-        'label': 'gzip 壓縮等級 (1-9)',
-        'help': '兼容性最佳：1-3 較快、壓縮一般；4-6 折衝（6 常用）；7-9 壓縮略升但耗時顯著，除非相容性/可攜性為先。',
-        'type': 'int',
-    },
-    {
-        'key': 'ENABLE_ARCHIVE_MODE',
-        'label': '啟用歸檔模式',
-        'help': '基準線建立一段時間後可轉存為較高壓縮格式以節省空間。',
-        'type': 'bool',
-    },
-    {
-        'key': 'ARCHIVE_AFTER_DAYS',
-        'label': '轉為歸檔的天數',
-        'help': '建立後超過此天數的基準線將轉為歸檔格式。',
-        'type': 'int',
-    },
-    {
-        'key': 'ARCHIVE_COMPRESSION_FORMAT',
-        'label': '歸檔壓縮格式',
-        'help': '歸檔時使用的壓縮格式。',
-        'type': 'choice',
-        'choices': ['lz4','zstd','gzip']
-    },
-    {
-        'key': 'SHOW_COMPRESSION_STATS',
-        'label': '顯示壓縮統計',
-        'help': '在儲存/讀取基準線時顯示壓縮比與耗時。',
-        'type': 'bool',
-    },
-    {
-        'key': 'SHOW_DEBUG_MESSAGES',
-        'label': '顯示除錯訊息',
-        'help': '輸出較詳細的內部流程訊息。',
-        'type': 'bool',
-    },
+    Param(
+        key='DEFAULT_COMPRESSION_FORMAT',
+        label='基準線壓縮格式',
+        help='選擇基準線儲存格式：lz4 (讀寫快), zstd (壓縮高), gzip (相容性)。',
+        type='choice',
+        choices=('lz4','zstd','gzip')
+    ),
+    Param(
+        key='LZ4_COMPRESSION_LEVEL',
+        label='LZ4 壓縮等級 (0-16)',
+        help='速度最快，讀取幾乎不受影響。等級越高壓縮率越好但寫入較慢：0-3 非常快、壓縮較低；4-9 折衝；10-16 壓縮更高但明顯變慢。',
+        type='int',
+    ),
+    Param(
+        key='ZSTD_COMPRESSION_LEVEL',
+        label='Zstd 壓縮等級 (1-22)',
+        help='高壓縮比通用首選：1-3 偏速度；4-9 折衝（常用 3-6）；10-18 更高壓縮但寫入耗時；19-22 極致壓縮、CPU時間很長（僅限空間極度敏感）。',
+        type='int',
+    ),
+    Param(
+        key='GZIP_COMPRESSION_LEVEL',
+        label='gzip 壓縮等級 (1-9)',
+        help='兼容性最佳：1-3 較快、壓縮一般；4-6 折衝（6 常用）；7-9 壓縮略升但耗時顯著，除非相容性/可攜性為先。',
+        type='int',
+    ),
+    Param(
+        key='ENABLE_ARCHIVE_MODE',
+        label='啟用歸檔模式',
+        help='基準線建立一段時間後可轉存為較高壓縮格式以節省空間。',
+        type='bool',
+    ),
+    Param(
+        key='ARCHIVE_AFTER_DAYS',
+        label='轉為歸檔的天數',
+        help='建立後超過此天數的基準線將轉為歸檔格式。',
+        type='int',
+    ),
+    Param(
+        key='ARCHIVE_COMPRESSION_FORMAT',
+        label='歸檔壓縮格式',
+        help='歸檔時使用的壓縮格式。',
+        type='choice',
+        choices=('lz4','zstd','gzip')
+    ),
+    Param(
+        key='SHOW_COMPRESSION_STATS',
+        label='顯示壓縮統計',
+        help='在儲存/讀取基準線時顯示壓縮比與耗時。',
+        type='bool',
+    ),
+    Param(
+        key='SHOW_DEBUG_MESSAGES',
+        label='顯示除錯訊息',
+        help='輸出較詳細的內部流程訊息。',
+        type='bool',
+    ),
 
     # 日誌/輸出
-    {
-        'key': 'LOG_FOLDER',
-        'priority': 5,
-        'label': '日誌資料夾（CSV/日誌輸出）',
-        'help': '記錄 CSV 與其他日誌的資料夾。',
-        'type': 'path',
-        'path_kind': 'dir',
-    },
-    {
-        'key': 'LOG_FILE_DATE',
-        'label': '日誌日期（唯讀）',
-        'help': '用於組合 CSV_LOG_FILE 的日期字串。',
-        'type': 'readonly',
-    },
-    {
-        'key': 'CSV_LOG_FILE',
-        'label': 'CSV 記錄檔（唯讀）',
-        'help': '比較結果輸出的壓縮 CSV 檔路徑，從 LOG_FOLDER + 日期組合而來。',
-        'type': 'readonly',
-    },
-    {
-        'key': 'CONSOLE_TEXT_LOG_ENABLED',
-        'label': '將 Console 輸出寫入文字檔',
-        'help': '將所有 Console 訊息（含表格）追加寫入指定的文字檔（UTF-8）。可用於長期留存或排查。',
-        'type': 'bool',
-    },
-    {
-        'key': 'CONSOLE_TEXT_LOG_FILE',
-        'label': 'Console 文字檔路徑',
-        'help': '預設為 LOG_FOLDER/console_log_YYYYMMDD.txt（依據日誌日期）。你亦可自訂儲存位置。',
-        'type': 'path',
-        'path_kind': 'save_file',
-    },
+    Param(
+        key='LOG_FOLDER',
+        priority=5,
+        label='日誌資料夾（CSV/日誌輸出）',
+        help='記錄 CSV 與其他日誌的資料夾。',
+        type='path',
+        path_kind='dir',
+    ),
+    Param(
+        key='LOG_FILE_DATE',
+        label='日誌日期（唯讀）',
+        help='用於組合 CSV_LOG_FILE 的日期字串。',
+        type='readonly',
+    ),
+    Param(
+        key='CSV_LOG_FILE',
+        label='CSV 記錄檔（唯讀）',
+        help='比較結果輸出的壓縮 CSV 檔路徑，從 LOG_FOLDER + 日期組合而來。',
+        type='readonly',
+    ),
+    Param(
+        key='CONSOLE_TEXT_LOG_ENABLED',
+        label='將 Console 輸出寫入文字檔',
+        help='將所有 Console 訊息（含表格）追加寫入指定的文字檔（UTF-8）。可用於長期留存或排查。',
+        type='bool',
+    ),
+    Param(
+        key='CONSOLE_TEXT_LOG_FILE',
+        label='Console 文字檔路徑',
+        help='預設為 LOG_FOLDER/console_log_YYYYMMDD.txt（依據日誌日期）。你亦可自訂儲存位置。',
+        type='path',
+        path_kind='save_file',
+    ),
 
     # 快速模式
-    {
-        'key': 'ENABLE_FAST_MODE',
-        'label': '啟用快速模式',
-        'help': '針對常見情境優化，可能略過部分詳細檢查以加速。',
-        'type': 'bool',
-    },
+    Param(
+        key='ENABLE_FAST_MODE',
+        label='啟用快速模式',
+        help='針對常見情境優化，可能略過部分詳細檢查以加速。',
+        type='bool',
+    ),
 
     # 重試/臨時複本
-    {
-        'key': 'MAX_RETRY',
-        'label': '失敗重試次數',
-        'help': '讀取或比較失敗時最多重試次數。',
-        'type': 'int',
-    },
-    {
-        'key': 'RETRY_INTERVAL_SEC',
-        'label': '重試間隔 (秒)',
-        'help': '兩次重試之間等待的秒數。',
-        'type': 'int',
-    },
-    {
-        'key': 'USE_TEMP_COPY',
-        'label': '使用暫存複本',
-        'help': '比較前先複製檔案到暫存位置以避免占用與鎖檔。',
-        'type': 'bool',
-    },
+    Param(
+        key='MAX_RETRY',
+        label='失敗重試次數',
+        help='讀取或比較失敗時最多重試次數。',
+        type='int',
+    ),
+    Param(
+        key='RETRY_INTERVAL_SEC',
+        label='重試間隔 (秒)',
+        help='兩次重試之間等待的秒數。',
+        type='int',
+    ),
+    Param(
+        key='USE_TEMP_COPY',
+        label='使用暫存複本',
+        help='比較前先複製檔案到暫存位置以避免占用與鎖檔。',
+        type='bool',
+    ),
 
     # 進階／穩定性（複製與嚴格模式）
-    {
-        'key': 'STRICT_NO_ORIGINAL_READ',
-        'label': '嚴格模式：永不開原始檔',
-        'help': '啟用後，任何讀取都必須來自本地快取副本；若複製到快取最終失敗，會略過本次處理，絕不打開原始檔（避免鎖檔）。',
-        'type': 'bool',
-    },
-    {
-        'key': 'IGNORE_CACHE_FOLDER',
-        'label': '忽略快取資料夾事件',
-        'help': '忽略 CACHE_FOLDER 內所有檔案事件，避免快取本身引起的監控噪音（建議啟用）。',
-        'type': 'bool',
-    },
-    {
-        'key': 'COPY_RETRY_COUNT',
-        'label': '複製重試次數',
-        'help': '將來源檔案複製到本地快取時的最大重試次數。來源檔案正被儲存／網路不穩時可提高此值。',
-        'type': 'int',
-    },
-    {
-        'key': 'COPY_RETRY_BACKOFF_SEC',
-        'label': '重試退避（秒）',
-        'help': '兩次重試之間的等待秒數（可輸入小數）。會按嘗試次數逐步增加等待，例如 1.0 → 2.0 → 3.0 秒。',
-        'type': 'text',
-    },
-    {
-        'key': 'COPY_CHUNK_SIZE_MB',
-        'label': '分塊複製大小 (MB)',
-        'help': '以較小區塊逐段讀寫來源檔，可降低一次性長時間把持來源句柄的風險。0 表示關閉。',
-        'type': 'int',
-    },
-    {
-        'key': 'COPY_POST_SLEEP_SEC',
-        'label': '複製完成後短暫等待（秒）',
-        'help': '複製完成後等待短暫時間（可輸入小數）讓檔案系統穩定，避免隨後讀取時競態。',
-        'type': 'text',
-    },
-    {
-        'key': 'COPY_STABILITY_CHECKS',
-        'label': '複製前穩定性檢查次數',
-        'help': '開始複製前，連續 N 次檢查來源檔的修改時間（mtime）一致才開始複製。',
-        'type': 'int',
-    },
-    {
-        'key': 'COPY_STABILITY_INTERVAL_SEC',
-        'label': '穩定性檢查間隔（秒）',
-        'help': '兩次 mtime 穩定性檢查之間的等待秒數（可輸入小數）。',
-        'type': 'text',
-    },
-    {
-        'key': 'COPY_STABILITY_MAX_WAIT_SEC',
-        'label': '穩定性檢查最大等待（秒）',
-        'help': '最多等待多少秒來達到所需的穩定檢查次數；超時則本次複製跳過。',
-        'type': 'text',
-    },
+    Param(
+        key='STRICT_NO_ORIGINAL_READ',
+        label='嚴格模式：永不開原始檔',
+        help='啟用後，任何讀取都必須來自本地快取副本；若複製到快取最終失敗，會略過本次處理，絕不打開原始檔（避免鎖檔）。',
+        type='bool',
+    ),
+    Param(
+        key='IGNORE_CACHE_FOLDER',
+        label='忽略快取資料夾事件',
+        help='忽略 CACHE_FOLDER 內所有檔案事件，避免快取本身引起的監控噪音（建議啟用）。',
+        type='bool',
+    ),
+    Param(
+        key='COPY_RETRY_COUNT',
+        label='複製重試次數',
+        help='將來源檔案複製到本地快取時的最大重試次數。來源檔案正被儲存／網路不穩時可提高此值。',
+        type='int',
+    ),
+    Param(
+        key='COPY_RETRY_BACKOFF_SEC',
+        label='重試退避（秒）',
+        help='兩次重試之間的等待秒數（可輸入小數）。會按嘗試次數逐步增加等待，例如 1.0 → 2.0 → 3.0 秒。',
+        type='text',
+    ),
+    Param(
+        key='COPY_CHUNK_SIZE_MB',
+        label='分塊複製大小 (MB)',
+        help='以較小區塊逐段讀寫來源檔，可降低一次性長時間把持來源句柄的風險。0 表示關閉。',
+        type='int',
+    ),
+    Param(
+        key='COPY_POST_SLEEP_SEC',
+        label='複製完成後大小確認最長等待（秒）',
+        help='複製完成後確認快取檔大小與來源一致才讀取；一致即繼續，最多等待此秒數（可輸入小數）。',
+        type='text',
+    ),
+    Param(
+        key='COPY_STABILITY_CHECKS',
+        label='複製前穩定性檢查次數',
+        help='開始複製前，連續 N 次檢查來源檔的修改時間（mtime）一致才開始複製。',
+        type='int',
+    ),
+    Param(
+        key='COPY_STABILITY_INTERVAL_SEC',
+        label='穩定性檢查間隔（秒）',
+        help='兩次 mtime 穩定性檢查之間的等待秒數（可輸入小數）。',
+        type='text',
+    ),
+    Param(
+        key='COPY_STABILITY_MAX_WAIT_SEC',
+        label='穩定性檢查最大等待（秒）',
+        help='最多等待多少秒來達到所需的穩定檢查次數；超時則本次複製跳過。',
+        type='text',
+    ),
     # Phase 1 新增：快速跳過與鎖檔判斷
-    {
-        'key': 'QUICK_SKIP_BY_STAT',
-        'label': '快速跳過：mtime/size 未變時不讀取',
-        'help': '啟用後，若來源檔案的修改時間與大小與基準線一致（含容差），直接判定無變更，跳過複製與讀取內容。',
-        'type': 'bool',
-    },
-    {
-        'key': 'MTIME_TOLERANCE_SEC',
-        'label': 'mtime 容差（秒）',
-        'help': '快速跳過時允許的修改時間容差（秒，可輸入小數）。',
-        'type': 'text',
-    },
-    {
-        'key': 'SKIP_WHEN_TEMP_LOCK_PRESENT',
-        'label': '偵測暫存鎖檔 (~$) 時延後觸碰',
-        'help': '當偵測到 Office 暫存鎖檔（~$開頭）存在時，延後複製與比較以避開 Excel 保存尾段。',
-        'type': 'bool',
-    },
+    Param(
+        key='QUICK_SKIP_BY_STAT',
+        label='快速跳過：mtime/size 未變時不讀取',
+        help='啟用後，若來源檔案的修改時間與大小與基準線一致（含容差），直接判定無變更，跳過複製與讀取內容。',
+        type='bool',
+    ),
+    Param(
+        key='MTIME_TOLERANCE_SEC',
+        label='mtime 容差（秒）',
+        help='快速跳過時允許的修改時間容差（秒，可輸入小數）。',
+        type='text',
+    ),
+    Param(
+        key='SKIP_WHEN_TEMP_LOCK_PRESENT',
+        label='偵測暫存鎖檔 (~$) 時延後觸碰',
+        help='當偵測到 Office 暫存鎖檔（~$開頭）存在時，延後複製與比較以避開 Excel 保存尾段。',
+        type='bool',
+    ),
     # Phase 2：複製引擎
-    {
-        'key': 'COPY_ENGINE',
-        'label': '複製引擎（Windows）',
-        'help': '選擇複製檔案所使用的引擎：python（內建）、powershell（Copy-Item）、robocopy（穩定、對網路良好）。',
-        'type': 'choice',
-        'choices': ['python','powershell','robocopy']
-    },
-    {
-        'key': 'PREFER_SUBPROCESS_FOR_XLSM',
-        'label': '對 .xlsm 一律使用子程序複製',
-        'help': '對含巨集的 .xlsm 檔案優先使用系統子程序（robocopy/PowerShell）複製，以降低鎖檔風險。',
-        'type': 'bool',
-    },
-    {
-        'key': 'SUBPROCESS_ENGINE_FOR_XLSM',
-        'label': '.xlsm 子程序複製引擎',
-        'help': '當啟用「對 .xlsm 一律使用子程序複製」時，選擇 robocopy 或 PowerShell 作為引擎。',
-        'type': 'choice',
-        'choices': ['robocopy','powershell']
-    },
+    Param(
+        key='COPY_ENGINE',
+        label='複製引擎（Windows）',
+        help='選擇複製檔案所使用的引擎：python（內建）、powershell（Copy-Item）、robocopy（穩定、對網路良好）。',
+        type='choice',
+        choices=('python','powershell','robocopy')
+    ),
+    Param(
+        key='PREFER_SUBPROCESS_FOR_XLSM',
+        label='對 .xlsm 一律使用子程序複製',
+        help='對含巨集的 .xlsm 檔案優先使用系統子程序（robocopy/PowerShell）複製，以降低鎖檔風險。',
+        type='bool',
+    ),
+    Param(
+        key='SUBPROCESS_ENGINE_FOR_XLSM',
+        label='.xlsm 子程序複製引擎',
+        help='當啟用「對 .xlsm 一律使用子程序複製」時，選擇 robocopy 或 PowerShell 作為引擎。',
+        type='choice',
+        choices=('robocopy','powershell')
+    ),
 
     # 日誌／去重
-    {
-        'key': 'LOG_DEDUP_WINDOW_SEC',
-        'label': 'CSV 去重時間窗（秒）',
-        'help': '在此秒數內，相同檔案＋工作表＋相同內容的變更只記錄一次至 CSV（避免短時間重覆記錄同一批變更）。',
-        'type': 'int',
-    },
+    Param(
+        key='LOG_DEDUP_WINDOW_SEC',
+        label='CSV 去重時間窗（秒）',
+        help='在此秒數內，相同檔案＋工作表＋相同內容的變更只記錄一次至 CSV（避免短時間重覆記錄同一批變更）。',
+        type='int',
+    ),
 
     # 白名單
-    {
-        'key': 'WHITELIST_USERS',
-        'label': '使用者白名單 (每行一個)',
-        'help': '在白名單內的使用者修改可選擇不顯示或單獨記錄。',
-        'type': 'multiline',
-    },
-    {
-        'key': 'LOG_WHITELIST_USER_CHANGE',
-        'label': '記錄白名單使用者變更',
-        'help': '啟用後，白名單使用者的變更也會寫入記錄。',
-        'type': 'bool',
-    },
-    {
-        'key': 'FORCE_BASELINE_ON_FIRST_SEEN',
-        'label': '首次遇見即強制建立基準線 (每行一個關鍵字)',
-        'help': '支援關鍵字或部分路徑比對。若檔案路徑包含其一，第一次掃描或偵測到時即建立基準線。',
-        'type': 'multiline',
-    },
+    Param(
+        key='WHITELIST_USERS',
+        label='使用者白名單 (每行一個)',
+        help='在白名單內的使用者修改可選擇不顯示或單獨記錄。',
+        type='multiline',
+    ),
+    Param(
+        key='LOG_WHITELIST_USER_CHANGE',
+        label='記錄白名單使用者變更',
+        help='啟用後，白名單使用者的變更也會寫入記錄。',
+        type='bool',
+    ),
+    Param(
+        key='FORCE_BASELINE_ON_FIRST_SEEN',
+        label='首次遇見即強制建立基準線 (每行一個關鍵字)',
+        help='支援關鍵字或部分路徑比對。若檔案路徑包含其一，第一次掃描或偵測到時即建立基準線。',
+        type='multiline',
+    ),
 
     # 輪詢
-    {
-        'key': 'POLLING_SIZE_THRESHOLD_MB',
-        'label': '輪詢大小分界 (MB)',
-        'help': '小於此大小的檔案採用較密集的輪詢間隔；大於則採用較稀疏的間隔。',
-        'type': 'int',
-    },
-    {
-        'key': 'DENSE_POLLING_INTERVAL_SEC',
-        'label': '密集輪詢間隔 (秒)',
-        'help': '適用於較小檔案的輪詢頻率。',
-        'type': 'int',
-    },
-    {
-        'key': 'DENSE_POLLING_DURATION_SEC',
-        'label': '密集輪詢總時長 (秒)',
-        'help': '沒有進一步變更時，密集輪詢會在總時長用盡後停止。',
-        'type': 'int',
-    },
-    {
-        'key': 'SPARSE_POLLING_INTERVAL_SEC',
-        'label': '稀疏輪詢間隔 (秒)',
-        'help': '適用於較大檔案的輪詢頻率。',
-        'type': 'int',
-    },
-    {
-        'key': 'SPARSE_POLLING_DURATION_SEC',
-        'label': '稀疏輪詢總時長 (秒)',
-        'help': '如需使用舊版 watcher 的稀疏輪詢策略可參考 legacy；現版本用自適應穩定檢查。',
-        'type': 'int',
-    },
+    Param(
+        key='POLLING_SIZE_THRESHOLD_MB',
+        label='輪詢大小分界 (MB)',
+        help='小於此大小的檔案採用較密集的輪詢間隔；大於則採用較稀疏的間隔。',
+        type='int',
+    ),
+    Param(
+        key='DENSE_POLLING_INTERVAL_SEC',
+        label='密集輪詢間隔 (秒)',
+        help='適用於較小檔案的輪詢頻率。',
+        type='int',
+    ),
+    Param(
+        key='DENSE_POLLING_DURATION_SEC',
+        label='密集輪詢總時長 (秒)',
+        help='沒有進一步變更時，密集輪詢會在總時長用盡後停止。',
+        type='int',
+    ),
+    Param(
+        key='SPARSE_POLLING_INTERVAL_SEC',
+        label='稀疏輪詢間隔 (秒)',
+        help='適用於較大檔案的輪詢頻率。',
+        type='int',
+    ),
+    Param(
+        key='SPARSE_POLLING_DURATION_SEC',
+        label='稀疏輪詢總時長 (秒)',
+        help='如需使用舊版 watcher 的稀疏輪詢策略可參考 legacy；現版本用自適應穩定檢查。',
+        type='int',
+    ),
 
     # Console 視窗
-    {
-        'key': 'ENABLE_BLACK_CONSOLE',
-        'label': '啟用黑色 Console 視窗',
-        'help': '額外顯示一個即時輸出視窗。',
-        'type': 'bool',
-    },
-    {
-        'key': 'CONSOLE_POPUP_ON_COMPARISON',
-        'label': '偵測到比較時彈出視窗',
-        'help': '有比較輸出時自動帶到前景。',
-        'type': 'bool',
-    },
-    {
-        'key': 'CONSOLE_ALWAYS_ON_TOP',
-        'label': '視窗保持最上層',
-        'help': '讓 Console 視窗始終置頂。',
-        'type': 'bool',
-    },
-    {
-        'key': 'CONSOLE_TEMP_TOPMOST_DURATION',
-        'label': '臨時置頂秒數',
-        'help': '收到比較輸出時，視窗臨時置頂的時間。',
-        'type': 'int',
-    },
-    {
-        'key': 'CONSOLE_INITIAL_TOPMOST_DURATION',
-        'label': '啟動初期置頂秒數',
-        'help': '啟動後短暫置頂以避免被其他視窗遮住。',
-        'type': 'int',
-    },
-]
+    Param(
+        key='ENABLE_BLACK_CONSOLE',
+        label='啟用黑色 Console 視窗',
+        help='額外顯示一個即時輸出視窗。',
+        type='bool',
+    ),
+    Param(
+        key='CONSOLE_POPUP_ON_COMPARISON',
+        label='偵測到比較時彈出視窗',
+        help='有比較輸出時自動帶到前景。',
+        type='bool',
+    ),
+    Param(
+        key='CONSOLE_ALWAYS_ON_TOP',
+        label='視窗保持最上層',
+        help='讓 Console 視窗始終置頂。',
+        type='bool',
+    ),
+    Param(
+        key='CONSOLE_TEMP_TOPMOST_DURATION',
+        label='臨時置頂秒數',
+        help='收到比較輸出時，視窗臨時置頂的時間。',
+        type='int',
+    ),
+    Param(
+        key='CONSOLE_INITIAL_TOPMOST_DURATION',
+        label='啟動初期置頂秒數',
+        help='啟動後短暫置頂以避免被其他視窗遮住。',
+        type='int',
+    ),
+)
+
+# 參數鍵 -> Param，模組載入時建立一次
+_SPEC_BY_KEY = {p.key: p for p in PARAMS_SPEC}
+
+def refresh_defaults():
+    """
+    重新讀取各參數在 settings 的目前值作為畫面預設值（settings 會被 runtime JSON 改寫，故每次開啟對話框都要重新讀取）
+    """
+    global SETTINGS_DEFAULTS
+    SETTINGS_DEFAULTS = MappingProxyType({p.key: getattr(settings, p.key, '') for p in PARAMS_SPEC})
+    return SETTINGS_DEFAULTS
+
+# 參數鍵 -> 預設值（唯讀）
+SETTINGS_DEFAULTS = refresh_defaults()
+
+@lru_cache(maxsize=4096)
+def _np(p):
+    # 畫面上只處理使用者設定的路徑，數量有限，重繪清單時直接取快取結果
+    return os.path.normpath(p)
+
+# ---- 各類型輸入元件：建立函式與取值／設值函式 ----
+# 建立函式簽名 (dialog, parent, spec, value) -> widget；取值 widget -> value；設值 (widget, value)
+
+def _get_entry(w):
+    return w.get().strip()
+
+def _set_entry(w, val):
+    w.delete(0, 'end')
+    w.insert(0, ','.join(str(x) for x in val) if isinstance(val, (list, tuple)) else str(val))
+
+def _get_path(w):
+    val = w.get().strip()
+    if val:
+        try:
+            val = _np(val)
+        except Exception:
+            pass
+    return val
+
+def _set_path(w, val):
+    w.delete(0, 'end')
+    if val:
+        try:
+            w.insert(0, _np(val))
+        except Exception:
+            w.insert(0, str(val))
+
+def _get_text(w):
+    return [s for s in (l.strip() for l in w.get('1.0', 'end').splitlines()) if s]
+
+def _set_text(w, val):
+    w.delete('1.0', 'end')
+    w.insert('1.0', '\n'.join(val) if isinstance(val, (list, tuple)) else str(val))
+
+def _get_listbox(w):
+    return list(w.get(0, 'end'))
+
+def _set_listbox(w, val):
+    w.delete(0, 'end')
+    for v in (val or []):
+        try:
+            w.insert('end', _np(v))
+        except Exception:
+            w.insert('end', str(v))
+
+def _get_bool(w):
+    return bool(w.var.get())
+
+def _set_bool(w, val):
+    w.var.set(bool(val))
+
+def _set_choice(w, val):
+    w.set(str(val))
+
+def _get_subselect(w):
+    return [path for path, var in w.vars_list if bool(var.get())]
+
+def _set_subselect(w, val):
+    # 未指定任何資料夾時視為全選
+    selected = set(val or []) or {path for path, _ in w.vars_list}
+    for path, var in w.vars_list:
+        var.set(path in selected)
+
+def _build_text(dialog, parent, spec, value):
+    w = ttk.Entry(parent, width=80)
+    w.pack(anchor='w', fill='x')
+    _set_entry(w, value)
+    return w
+
+def _build_int(dialog, parent, spec, value):
+    w = ttk.Entry(parent, width=20)
+    w.pack(anchor='w')
+    _set_entry(w, value)
+    return w
+
+def _build_choice(dialog, parent, spec, value):
+    w = ttk.Combobox(parent, values=spec.choices, state='readonly', width=20)
+    w.pack(anchor='w')
+    _set_choice(w, value)
+    return w
+
+def _build_bool(dialog, parent, spec, value):
+    var = tk.BooleanVar(value=bool(value))
+    w = ttk.Checkbutton(parent, variable=var, text='啟用/勾選')
+    w.var = var
+    w.pack(anchor='w')
+    return w
+
+def _build_multiline(dialog, parent, spec, value):
+    w = tk.Text(parent, height=4, width=80)
+    w.pack(anchor='w', fill='x')
+    _set_text(w, value)
+    return w
+
+def _build_path(dialog, parent, spec, value):
+    frame2 = ttk.Frame(parent)
+    frame2.pack(anchor='w', fill='x')
+    entry = ttk.Entry(frame2, width=70)
+    entry.pack(side='left', fill='x', expand=True)
+    _set_path(entry, value)
+    def browse():
+        if spec.path_kind == 'file':
+            p = filedialog.askopenfilename()
+        elif spec.path_kind == 'save_file':
+            p = filedialog.asksaveasfilename()
+        else:
+            p = filedialog.askdirectory()
+        if p:
+            _set_path(entry, p)
+    ttk.Button(frame2, text='瀏覽...', command=browse).pack(side='left', padx=6)
+    return entry
+
+def _build_paths(dialog, parent, spec, value):
+    frame2 = ttk.Frame(parent)
+    frame2.pack(anchor='w', fill='x')
+    listbox = tk.Listbox(frame2, height=5, width=80, selectmode=tk.EXTENDED)
+    listbox.pack(side='left', fill='both', expand=True)
+    _set_listbox(listbox, value)
+    btns = ttk.Frame(frame2)
+    btns.pack(side='left', padx=6)
+    def live_sync_scan_targets():
+        # 啟用自動同步時，WATCH_FOLDERS 的改動即時反映到 SCAN_TARGET_FOLDERS
+        try:
+            if spec.key != 'WATCH_FOLDERS':
+                return
+            auto_spec, auto_widget = dialog._widgets.get('AUTO_SYNC_SCAN_TARGETS', (None, None))
+            if not (auto_widget and hasattr(auto_widget, 'var') and auto_widget.var.get()):
+                return
+            tgt_spec, tgt_widget = dialog._widgets.get('SCAN_TARGET_FOLDERS', (None, None))
+            if tgt_widget:
+                _set_listbox(tgt_widget, _get_listbox(listbox))
+        except Exception:
+            pass
+    def add_path():
+        p = filedialog.askopenfilename() if spec.path_kind == 'file' else filedialog.askdirectory()
+        if p:
+            listbox.insert('end', _np(p))
+            live_sync_scan_targets()
+    def remove_selected():
+        for idx in reversed(listbox.curselection()):
+            listbox.delete(idx)
+        live_sync_scan_targets()
+    def clear_all():
+        listbox.delete(0, 'end')
+        live_sync_scan_targets()
+    ttk.Button(btns, text='新增', command=add_path).pack(fill='x')
+    ttk.Button(btns, text='移除選取', command=remove_selected).pack(fill='x', pady=2)
+    ttk.Button(btns, text='全部清除', command=clear_all).pack(fill='x')
+    return listbox
+
+def _build_watch_subselect(dialog, parent, spec, value):
+    frame2 = ttk.Frame(parent)
+    frame2.pack(anchor='w', fill='x')
+    def fill(selected):
+        for child in frame2.winfo_children():
+            child.destroy()
+        rt = dialog._runtime_data
+        watch_list = rt.get('WATCH_FOLDERS') if rt.get('WATCH_FOLDERS') else getattr(settings, 'WATCH_FOLDERS', [])
+        frame2.vars_list = []
+        for path in watch_list:
+            var = tk.BooleanVar()
+            ttk.Checkbutton(frame2, text=_np(path), variable=var).pack(anchor='w')
+            frame2.vars_list.append((path, var))
+        _set_subselect(frame2, selected)
+    fill(value)
+    ttk.Button(parent, text='從監控資料夾同步', command=lambda: fill(None)).pack(anchor='w', pady=4)
+    return frame2
+
+_BUILDERS = {
+    'text': _build_text,
+    'int': _build_int,
+    'choice': _build_choice,
+    'bool': _build_bool,
+    'multiline': _build_multiline,
+    'path': _build_path,
+    'paths': _build_paths,
+    'watch_subselect': _build_watch_subselect,
+}
+
+# 類型 -> (取值, 設值)
+_ACCESSORS = {
+    'text': (_get_entry, _set_entry),
+    'int': (_get_entry, _set_entry),
+    'choice': (_get_entry, _set_choice),
+    'bool': (_get_bool, _set_bool),
+    'multiline': (_get_text, _set_text),
+    'path': (_get_path, _set_path),
+    'paths': (_get_listbox, _set_listbox),
+    'watch_subselect': (_get_subselect, _set_subselect),
+}
+
+# 開啟分頁時不自動補預設值的類型（勾選狀態本身就是使用者的選擇）
+_NO_DEFAULT_FILL = frozenset(('bool', 'watch_subselect'))
 
 class SettingsDialog(tk.Toplevel):
     def __init__(self, master=None):
         super().__init__(master)
         self.title('Excel Watchdog 設定')
         self.geometry('900x700')
-        self.grab_set()
+        # 建立元件期間先隱藏視窗，全部排版完成後只計算一次幾何再顯示
+        self.withdraw()
         self._widgets: Dict[str, Any] = {}
         self.protocol('WM_DELETE_WINDOW', self._on_close)
 
         # Load defaults: apply last runtime into settings first, then read from settings only
+        # 對話框開啟期間 runtime JSON 不會被改寫，只讀一次，之後各處共用 self._runtime_data
         try:
-            _rt = load_runtime_settings()
-            if _rt:
-                apply_to_settings(_rt)
+            self._runtime_data = load_runtime_settings() or {}
+        except Exception:
+            self._runtime_data = {}
+        try:
+            if self._runtime_data:
+                apply_to_settings(self._runtime_data)
         except Exception:
             pass
+        refresh_defaults()
 
         # Tabs (Notebook)
         nb = ttk.Notebook(self)
@@ -544,9 +785,6 @@ class SettingsDialog(tk.Toplevel):
                 return True
             return False
 
-        # Build a dict for quick lookup
-        _spec_by_key = {s['key']: s for s in PARAMS_SPEC}
-
         # Define tabs and contained keys
         TABS = [
             ('監控範圍與啟動掃描', [
@@ -584,188 +822,69 @@ class SettingsDialog(tk.Toplevel):
             ]),
         ]
 
+        # 每個分頁一個可捲動區域；滾輪只捲動目前選取分頁的 canvas
+        canvases = {}
+        def _on_mousewheel(event):
+            canvas = canvases.get(nb.select())
+            if canvas is not None:
+                canvas.yview_scroll(int(-1 * (event.delta / 120)), 'units')
+            return 'break'
+        self.bind_all('<MouseWheel>', _on_mousewheel)
+
         # Helper to create a scrollable frame
         def make_scrollable(parent):
             frm = ttk.Frame(parent)
-            canvas = tk.Canvas(frm)
+            canvas = tk.Canvas(frm, highlightthickness=0)
             vbar = ttk.Scrollbar(frm, orient='vertical', command=canvas.yview)
             inner = ttk.Frame(canvas)
             inner.bind('<Configure>', lambda e: canvas.configure(scrollregion=canvas.bbox('all')))
-            canvas.create_window((0, 0), window=inner, anchor='nw')
+            win = canvas.create_window((0, 0), window=inner, anchor='nw')
+            # 內層寬度跟隨 canvas，grid 的 weight 才會生效
+            canvas.bind('<Configure>', lambda e: canvas.itemconfigure(win, width=e.width))
             canvas.configure(yscrollcommand=vbar.set)
             canvas.pack(side='left', fill='both', expand=True)
             vbar.pack(side='right', fill='y')
-            # mouse wheel
-            def _on_mousewheel(event):
-                delta = int(-1 * (event.delta / 120))
-                canvas.yview_scroll(delta, 'units')
-                return 'break'
-            canvas.bind_all('<MouseWheel>', _on_mousewheel)
+            canvases[str(parent)] = canvas
             return frm, inner
 
-        # Render controls into tabs
+        # Render controls into tabs：每個參數佔兩列 grid（名稱＋輸入元件、說明），不再每項各包一層 Frame
+        def build_tab(holder, keys):
+            holder.columnconfigure(1, weight=1)
+            grid_row = 0
+            for k in keys:
+                spec = _SPEC_BY_KEY.get(k)
+                if spec is None:
+                    continue
+                ttk.Label(holder, text=spec.label).grid(row=grid_row, column=0, sticky='nw', padx=(10, 8), pady=(8, 0))
+                row = ttk.Frame(holder)
+                row.grid(row=grid_row, column=1, sticky='ew', padx=(0, 10), pady=(8, 0))
+                help_lbl = ttk.Label(holder, text=spec.help, foreground='#666', wraplength=820, justify='left')
+                help_lbl.grid(row=grid_row + 1, column=0, columnspan=2, sticky='w', padx=10)
+                grid_row += 2
+                w = _BUILDERS[spec.type](self, row, spec, SETTINGS_DEFAULTS[spec.key])
+                self._widgets[spec.key] = (spec, w)
+
+        # 分頁內容延遲建立：開啟時只建立第一個分頁，其餘在首次切換到該分頁時才建立元件
+        self._tab_builders = {}
         for tab_title, keys in TABS:
             tab = ttk.Frame(nb)
             nb.add(tab, text=tab_title)
             frame, holder = make_scrollable(tab)
             frame.pack(fill='both', expand=True)
-            for k in keys:
-                if k not in _spec_by_key:
-                    continue
-                spec = _spec_by_key[k]
-                row = ttk.Frame(holder)
-                row.pack(fill='x', padx=10, pady=6)
-                ttk.Label(row, text=spec['label']).pack(anchor='w')
-                help_lbl = ttk.Label(row, text=spec['help'], foreground='#666', wraplength=820, justify='left')
-                help_lbl.pack(anchor='w')
-                key = spec['key']
-                cur_val = getattr(settings, key, '')
-                w = None
-                if spec['type'] == 'text':
-                    display_val = ''
-                    if key == 'SUPPORTED_EXTS':
-                        if isinstance(cur_val, (list, tuple)):
-                            display_val = ','.join([str(x) for x in cur_val])
-                        else:
-                            display_val = str(cur_val)
-                    else:
-                        display_val = str(cur_val)
-                    var = tk.StringVar(value=display_val)
-                    w = ttk.Entry(row, textvariable=var, width=80)
-                    w.pack(anchor='w', fill='x')
-                elif spec['type'] == 'multiline':
-                    text = tk.Text(row, height=4, width=80)
-                    if isinstance(cur_val, (list, tuple)):
-                        text.insert('1.0', '\n'.join(cur_val))
-                    else:
-                        text.insert('1.0', str(cur_val))
-                    text.pack(anchor='w', fill='x')
-                    w = text
-                elif spec['type'] == 'watch_subselect':
-                    frame2 = ttk.Frame(row)
-                    frame2.pack(anchor='w', fill='x')
-                    vars_list = []
-                    rt = runtime.load_runtime_settings()
-                    watch_list = rt.get('WATCH_FOLDERS') if rt.get('WATCH_FOLDERS') else getattr(settings, 'WATCH_FOLDERS', [])
-                    cur_selected = set(cur_val or [])
-                    if not cur_selected:
-                        cur_selected = set(watch_list)
-                    for path in watch_list:
-                        var = tk.BooleanVar(value=(path in cur_selected))
-                        cb = ttk.Checkbutton(frame2, text=os.path.normpath(path), variable=var)
-                        cb.pack(anchor='w')
-                        vars_list.append((path, var))
-                    def sync_from_watch():
-                        nonlocal vars_list
-                        for child in frame2.winfo_children():
-                            child.destroy()
-                        vars_list = []
-                        rt2 = runtime.load_runtime_settings()
-                        watch_list2 = rt2.get('WATCH_FOLDERS') if rt2.get('WATCH_FOLDERS') else getattr(settings, 'WATCH_FOLDERS', [])
-                        for path in watch_list2:
-                            var = tk.BooleanVar(value=True)
-                            cb = ttk.Checkbutton(frame2, text=os.path.normpath(path), variable=var)
-                            cb.pack(anchor='w')
-                            vars_list.append((path, var))
-                    ttk.Button(row, text='從監控資料夾同步', command=sync_from_watch).pack(anchor='w', pady=4)
-                    frame2.vars_list = vars_list
-                    w = frame2
-                elif spec['type'] == 'paths':
-                    frame2 = ttk.Frame(row)
-                    frame2.pack(anchor='w', fill='x')
-                    listbox = tk.Listbox(frame2, height=5, width=80, selectmode=tk.EXTENDED)
-                    listbox.pack(side='left', fill='both', expand=True)
-                    for v in (cur_val or []):
-                        try:
-                            listbox.insert('end', os.path.normpath(v))
-                        except Exception:
-                            listbox.insert('end', str(v))
-                    btns = ttk.Frame(frame2)
-                    btns.pack(side='left', padx=6)
-                    def _live_sync_scan_targets():
-                        try:
-                            auto_spec, auto_widget = self._widgets.get('AUTO_SYNC_SCAN_TARGETS', (None, None))
-                            auto_on = bool(auto_widget.var.get()) if auto_widget and hasattr(auto_widget, 'var') else False
-                            if not auto_on:
-                                return
-                            if key != 'WATCH_FOLDERS':
-                                return
-                            tgt_spec, tgt_widget = self._widgets.get('SCAN_TARGET_FOLDERS', (None, None))
-                            if not tgt_widget:
-                                return
-                            items = list(listbox.get(0, 'end'))
-                            tgt_widget.delete(0, 'end')
-                            for it in items:
-                                tgt_widget.insert('end', it)
-                        except Exception:
-                            pass
-                    def add_path(lb=listbox, sp=spec):
-                        if sp.get('path_kind') == 'file':
-                            p = filedialog.askopenfilename()
-                        else:
-                            p = filedialog.askdirectory()
-                        if p:
-                            p = os.path.normpath(p)
-                            lb.insert('end', p)
-                            _live_sync_scan_targets()
-                    def remove_selected(lb=listbox):
-                        sel = list(lb.curselection())
-                        sel.reverse()
-                        for idx in sel:
-                            lb.delete(idx)
-                        _live_sync_scan_targets()
-                    def clear_all(lb=listbox):
-                        lb.delete(0, 'end')
-                        _live_sync_scan_targets()
-                    ttk.Button(btns, text='新增', command=add_path).pack(fill='x')
-                    ttk.Button(btns, text='移除選取', command=remove_selected).pack(fill='x', pady=2)
-                    ttk.Button(btns, text='全部清除', command=clear_all).pack(fill='x')
-                    w = listbox
-                elif spec['type'] == 'path':
-                    frame2 = ttk.Frame(row)
-                    frame2.pack(anchor='w', fill='x')
-                    var = tk.StringVar(value=str(cur_val))
-                    entry = ttk.Entry(frame2, textvariable=var, width=70)
-                    entry.pack(side='left', fill='x', expand=True)
-                    def browse():
-                        kind = spec.get('path_kind')
-                        if kind == 'file':
-                            p = filedialog.askopenfilename()
-                        elif kind == 'save_file':
-                            p = filedialog.asksaveasfilename()
-                        else:
-                            p = filedialog.askdirectory()
-                        if p:
-                            var.set(os.path.normpath(p))
-                    ttk.Button(frame2, text='瀏覽...', command=browse).pack(side='left', padx=6)
-                    w = entry
-                elif spec['type'] == 'bool':
-                    var = tk.BooleanVar(value=bool(cur_val))
-                    w = ttk.Checkbutton(row, variable=var, text='啟用/勾選')
-                    w.var = var
-                    w.pack(anchor='w')
-                elif spec['type'] == 'int':
-                    var = tk.StringVar(value=str(cur_val))
-                    w = ttk.Entry(row, textvariable=var, width=20)
-                    w.pack(anchor='w')
-                elif spec['type'] == 'choice':
-                    var = tk.StringVar(value=str(cur_val))
-                    w = ttk.Combobox(row, textvariable=var, values=spec['choices'], state='readonly', width=20)
-                    w.pack(anchor='w')
-                self._widgets[key] = (spec, w)
-
-        # 保證空白欄位會自動填入 settings.py 的預設值
-        self._ensure_defaults_filled()
+            self._tab_builders[str(tab)] = (lambda holder=holder, keys=keys: build_tab(holder, keys), keys)
+        nb.bind('<<NotebookTabChanged>>', lambda e: self._build_tab(nb.select()))
+
+        # 第一個分頁立即建立（_build_tab 同時以 settings.py 的預設值補上空白欄位）
+        self._build_tab(nb.select())
         # 若啟用自動同步，保持 SCAN_TARGET_FOLDERS 與 WATCH_FOLDERS 一致
         try:
-            rt0 = runtime.load_runtime_settings()
-            auto = rt0.get('AUTO_SYNC_SCAN_TARGETS', False)
+            auto = self._runtime_data.get('AUTO_SYNC_SCAN_TARGETS', False)
         except Exception:
             auto = False
         if auto:
             spec_targets, widget_targets = self._widgets.get('SCAN_TARGET_FOLDERS', (None, None))
             spec_watch, widget_watch = self._widgets.get('WATCH_FOLDERS', (None, None))
-            if widget_targets and widget_watch and spec_targets['type'] == 'paths' and spec_watch['type'] == 'paths':
+            if widget_targets and widget_watch and spec_targets.type == 'paths' and spec_watch.type == 'paths':
                 # 清空並以 WATCH_FOLDERS 內容填入
                 widget_targets.delete(0, 'end')
                 for v in list(widget_watch.get(0, 'end')):
@@ -778,110 +897,53 @@ class SettingsDialog(tk.Toplevel):
         ttk.Button(btn_row, text='匯出設定檔...', command=self._save_preset).pack(side='left')
         ttk.Button(btn_row, text='儲存並開始', command=self._save_and_apply).pack(side='right')
 
+        self.update_idletasks()
+        self.deiconify()
+        # 視窗未顯示時無法 grab，等視窗實際顯示後才設定
+        self.wait_visibility()
+        self.grab_set()
+
+    def _build_tab(self, tab_id):
+        """
+        建立分頁的元件（每個分頁只建立一次），並以 settings 預設值補上該分頁的空白欄位
+        """
+        entry = self._tab_builders.pop(tab_id, None)
+        if entry is not None:
+            builder, keys = entry
+            builder()
+            self._ensure_defaults_filled(keys)
+
+    def _build_all_tabs(self):
+        """
+        建立所有尚未開啟過的分頁（載入預設／範本、匯出範本需要所有欄位）
+        """
+        for tab_id in list(self._tab_builders):
+            self._build_tab(tab_id)
+
     def _reset_defaults(self):
+        self._build_all_tabs()
         for key, (spec, widget) in self._widgets.items():
-            val = getattr(settings, key, '')
-            if spec['type'] == 'text':
-                widget.delete(0, 'end')
-                widget.insert(0, str(val))
-            elif spec['type'] == 'multiline':
-                widget.delete('1.0', 'end')
-                if isinstance(val, (list, tuple)):
-                    widget.insert('1.0', '\n'.join(val))
-                else:
-                    widget.insert('1.0', str(val))
-            elif spec['type'] == 'paths':
-                widget.delete(0, 'end')
-                for v in (val or []):
-                    try:
-                        widget.insert('end', os.path.normpath(v))
-                    except Exception:
-                        widget.insert('end', str(v))
-            elif spec['type'] == 'bool':
-                widget.var.set(bool(val))
-            elif spec['type'] == 'int':
-                widget.delete(0, 'end')
-                widget.insert(0, str(val))
-            elif spec['type'] == 'choice':
-                widget.set(str(val))
-
-    def _ensure_defaults_filled(self):
-        # 將畫面上仍為空白的欄位填入 settings.py 的預設值
-        for key, (spec, widget) in self._widgets.items():
-            val = getattr(settings, key, '')
-            if spec['type'] == 'text' and widget.get().strip() == '':
-                widget.insert(0, str(val))
-            elif spec['type'] == 'multiline':
-                raw = widget.get('1.0', 'end').strip()
-                if raw == '':
-                    if isinstance(val, (list, tuple)):
-                        widget.insert('1.0', '\n'.join(val))
-                    else:
-                        widget.insert('1.0', str(val))
-            elif spec['type'] == 'paths':
-                if widget.size() == 0:
-                    for v in (val or []):
-                        try:
-                            widget.insert('end', os.path.normpath(v))
-                        except Exception:
-                            widget.insert('end', str(v))
-            elif spec['type'] == 'path':
-                if widget.get().strip() == '' and val:
-                    try:
-                        widget.delete(0, 'end')
-                        widget.insert(0, os.path.normpath(val))
-                    except Exception:
-                        widget.insert(0, str(val))
-            elif spec['type'] == 'bool':
-                # 不覆蓋既有勾選狀態
-                pass
-            elif spec['type'] == 'int' and widget.get().strip() == '':
-                widget.insert(0, str(val))
-            elif spec['type'] == 'choice' and not widget.get().strip():
-                widget.set(str(val))
+            _ACCESSORS[spec.type][1](widget, SETTINGS_DEFAULTS[key])
+
+    def _ensure_defaults_filled(self, keys=None):
+        # 將畫面上仍為空白的欄位填入 settings.py 的預設值；keys 指定時只處理這些欄位
+        for key in (self._widgets if keys is None else keys):
+            if key not in self._widgets:
+                continue
+            spec, widget = self._widgets[key]
+            if spec.type in _NO_DEFAULT_FILL:
+                continue
+            getter, setter = _ACCESSORS[spec.type]
+            if getter(widget) in ('', []):
+                setter(widget, SETTINGS_DEFAULTS[key])
 
     def _collect_values(self) -> Dict[str, Any]:
-        data: Dict[str, Any] = {}
-        for key, (spec, widget) in self._widgets.items():
-            if spec['type'] in ('text','int','choice'):
-                data[key] = widget.get().strip()
-            elif spec['type'] == 'path':
-                val = widget.get().strip()
-                if val:
-                    try:
-                        import os
-                        val = os.path.normpath(val)
-                    except Exception:
-                        pass
-                data[key] = val
-            elif spec['type'] == 'multiline':
-                raw = widget.get('1.0', 'end').strip()
-                lines = [l.strip() for l in raw.split('\n') if l.strip()]
-                data[key] = lines
-            elif spec['type'] == 'paths':
-                items = list(widget.get(0, 'end'))
-                data[key] = items
-            elif spec['type'] == 'watch_subselect':
-                # collect checked subset
-                items = []
-                for path, var in getattr(widget, 'vars_list', []):
-                    if bool(var.get()):
-                        items.append(path)
-                data[key] = items
-            elif spec['type'] == 'bool':
-                data[key] = bool(widget.var.get())
+        data: Dict[str, Any] = {key: _ACCESSORS[spec.type][0](widget)
+                                for key, (spec, widget) in self._widgets.items()}
         # normalize SUPPORTED_EXTS string to tuple-like list
         exts = data.get('SUPPORTED_EXTS')
         if isinstance(exts, str):
-            items = [x.strip() for x in exts.replace(';', ',').split(',') if x.strip()]
-            norm = []
-            for x in items:
-                x = x.strip(" ' \"()[]{}").lower()
-                if not x:
-                    continue
-                if not x.startswith('.'):
-                    x = '.' + x
-                norm.append(x)
+            norm = _normalize_exts(exts)
             if norm:
                 data['SUPPORTED_EXTS'] = norm
             else:
@@ -898,8 +960,7 @@ class SettingsDialog(tk.Toplevel):
                 if isinstance(v, str) and v.strip() == '': return True
                 if isinstance(v, (list, tuple, dict)) and len(v) == 0: return True
                 return False
-            old_data = load_runtime_settings() or {}
-            merged = dict(old_data)
+            merged = dict(self._runtime_data)
             for k, v in (new_data or {}).items():
                 if _is_blank(v):
                     continue
@@ -917,7 +978,7 @@ class SettingsDialog(tk.Toplevel):
         # 使用者按視窗右上角關閉：視為取消，停止 watchdog 啟動
         try:
             # 傳回一個特殊旗標到 runtime json，讓 main 判斷不要繼續執行
-            data = runtime.load_runtime_settings() or {}
+            data = dict(self._runtime_data)
             data['STARTUP_CANCELLED'] = True
             save_runtime_settings(data)
         except Exception:
@@ -926,12 +987,12 @@ class SettingsDialog(tk.Toplevel):
 
     def _save_preset(self):
         try:
+            self._build_all_tabs()
             data = self._collect_values()
             path = filedialog.asksaveasfilename(defaultextension='.json', filetypes=[('JSON Files','*.json')])
             if not path:
                 return
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            runtime.write_json_file(path, data)
             messagebox.showinfo('完成', '已儲存為範本')
         except Exception as e:
             messagebox.showerror('錯誤', f'儲存範本失敗: {e}')
@@ -941,33 +1002,12 @@ class SettingsDialog(tk.Toplevel):
             path = filedialog.askopenfilename(filetypes=[('JSON Files','*.json')])
             if not path:
                 return
-            with open(path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = runtime.read_json_file(path)
+            self._build_all_tabs()
             # 將值套到畫面（不直接 apply 到 settings）
             for key, (spec, widget) in self._widgets.items():
-                if key not in data:
-                    continue
-                val = data[key]
-                if spec['type'] == 'text':
-                    widget.delete(0, 'end')
-                    widget.insert(0, str(val))
-                elif spec['type'] == 'int':
-                    widget.delete(0, 'end')
-                    widget.insert(0, str(val))
-                elif spec['type'] == 'choice':
-                    widget.set(str(val))
-                elif spec['type'] == 'multiline':
-                    widget.delete('1.0', 'end')
-                    if isinstance(val, (list, tuple)):
-                        widget.insert('1.0', '\n'.join(val))
-                    else:
-                        widget.insert('1.0', str(val))
-                elif spec['type'] == 'paths':
-                    widget.delete(0, 'end')
-                    for v in val or []:
-                        widget.insert('end', v)
-                elif spec['type'] == 'bool':
-                    widget.var.set(bool(val))
+                if key in data:
+                    _ACCESSORS[spec.type][1](widget, data[key])
             messagebox.showinfo('完成', '已載入範本內容（尚未套用，請按「儲存並開始」）。')
         except Exception as e:
             messagebox.showerror('錯誤', f'載入範本失敗: {e}')
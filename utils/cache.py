@@ -104,6 +104,21 @@ def _ops_log_copy_success(network_path: str, duration: float, attempts: int, eng
         pass
 
 
+def _wait_for_copied_size(src: str, dst: str, max_wait: float) -> bool:
+    """
+    複製完成後確認快取檔大小與來源一致；一致即返回（通常毋須等待），最多等待 max_wait 秒
+    """
+    deadline = time.time() + max(0.0, max_wait)
+    while True:
+        try:
+            if os.path.getsize(dst) == os.path.getsize(src):
+                return True
+        except OSError:
+            pass
+        if time.time() >= deadline:
+            return False
+        time.sleep(0.02)
+
 def _wait_for_stable_mtime(path: str, checks: int, interval: float, max_wait: float) -> bool:
     try:
         if checks <= 1:
@@ -240,8 +255,9 @@ def copy_to_cache(network_path, silent=False):
                         _chunked_copy(network_path, cache_file, chunk_mb=chunk_mb)
                     else:
                         shutil.copy2(network_path, cache_file)
-                # 短暫等待，給檔案系統穩定
-                time.sleep(getattr(settings, 'COPY_POST_SLEEP_SEC', 0.2))
+                # 確認快取檔大小與來源一致，取代固定的短暫等待
+                if not _wait_for_copied_size(network_path, cache_file, float(getattr(settings, 'COPY_POST_SLEEP_SEC', 0.2))):
+                    logging.warning(f"快取檔大小與來源不一致: {cache_file}")
                 duration = time.time() - copy_start
                 if not silent:
                     print(f"      複製完成，耗時 {duration:.1f} 秒（第 {attempt}/{retry} 次嘗試）")
@@ -27,6 +27,12 @@ except ImportError as e:
     print(f"[WARNING] Zstandard 模組載入失敗: {e}")
     print("[WARNING] 請執行: pip install zstandard")
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 import config.settings as settings
 
 class CompressionFormat:
@@ -157,6 +163,28 @@ def decompress_data(compressed_data, format_type=None):
             
             raise ValueError("無法解壓縮數據，未知的壓縮格式")
 
+def _dumps_json_bytes(data):
+    """
+    序列化為緊湊的 UTF-8 JSON bytes（orjson 可用時使用 orjson；超過 64-bit 的整數等內容改用標準庫）
+    """
+    if HAS_ORJSON:
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            pass
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def _loads_json(text):
+    """
+    解析 JSON（orjson 可用時使用 orjson；遇到 NaN 等 orjson 不接受的內容改用標準庫）
+    """
+    if HAS_ORJSON:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
 def save_compressed_file(filepath, data, format_type=None, level=None):
     """
     保存壓縮檔案
@@ -167,18 +195,14 @@ def save_compressed_file(filepath, data, format_type=None, level=None):
     # 驗證格式可用性
     format_type = CompressionFormat.validate_format(format_type)
     
-    # 準備數據
-    if isinstance(data, dict):
-        json_data = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
-    else:
-        json_data = str(data)
-    
-    # 添加時間戳
+    # 準備數據（dict 加上時間戳後只序列化一次）
     if isinstance(data, dict):
         data_with_timestamp = data.copy()
         data_with_timestamp['timestamp'] = datetime.now().isoformat()
         data_with_timestamp['compression_format'] = format_type
-        json_data = json.dumps(data_with_timestamp, ensure_ascii=False, separators=(',', ':'))
+        json_data = _dumps_json_bytes(data_with_timestamp)
+    else:
+        json_data = str(data)
     
     # 壓縮數據
     compressed_data = compress_data(json_data, format_type, level)
@@ -245,7 +269,7 @@ def load_compressed_file(filepath):
         with open(latest_file, 'rb') as f:
             compressed_data = f.read()
         json_data = decompress_data(compressed_data, format_type)
-        return json.loads(json_data)
+        return _loads_json(json_data)
     except (FileNotFoundError, PermissionError, OSError) as e:
         logging.error(f"載入壓縮檔案失敗 {latest_file}: {e}")
         return None
@@ -332,6 +356,63 @@ def migrate_baseline_format(old_filepath, new_format):
     
     return new_filepath
 
+def train_zstd_log_dictionary(log_files, output_path, dict_size=16 * 1024):
+    """
+    以歷史 CSV 記錄（.csv.zst / .csv.gz / .csv）逐行作樣本訓練 zstd 字典，供 ZSTD_LOG_DICT_PATH 使用
+    
+    Args:
+        log_files: 歷史記錄檔案路徑清單
+        output_path: 字典輸出路徑
+        dict_size: 字典大小上限（bytes）
+    
+    Returns:
+        成功時回傳 output_path，否則 None
+    """
+    if not HAS_ZSTD:
+        print("[WARNING] 未安裝 zstandard，無法訓練字典")
+        return None
+
+    # 已用字典寫入的記錄需以同一字典解壓
+    dict_path = getattr(settings, 'ZSTD_LOG_DICT_PATH', '')
+    dctx_kwargs = {}
+    if dict_path and os.path.exists(dict_path):
+        with open(dict_path, 'rb') as f:
+            dctx_kwargs['dict_data'] = zstd.ZstdCompressionDict(f.read())
+
+    samples = []
+    for path in log_files:
+        try:
+            if path.endswith('.zst'):
+                with open(path, 'rb') as f:
+                    reader = zstd.ZstdDecompressor(**dctx_kwargs).stream_reader(f, read_across_frames=True)
+                    data = reader.read()
+            elif path.endswith('.gz'):
+                with gzip.open(path, 'rb') as f:
+                    data = f.read()
+            else:
+                with open(path, 'rb') as f:
+                    data = f.read()
+        except (OSError, zstd.ZstdError) as e:
+            logging.error(f"讀取記錄樣本失敗: {path}, 錯誤: {e}")
+            continue
+        samples.extend(line for line in data.splitlines(keepends=True) if line.strip())
+
+    if not samples:
+        print("[WARNING] 沒有可用的記錄樣本")
+        return None
+
+    try:
+        dictionary = zstd.train_dictionary(dict_size, samples, level=settings.ZSTD_COMPRESSION_LEVEL)
+    except zstd.ZstdError as e:
+        logging.error(f"訓練 zstd 字典失敗（樣本 {len(samples)} 行）: {e}")
+        return None
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'wb') as f:
+        f.write(dictionary.as_bytes())
+    print(f"[INFO] 已由 {len(samples)} 行樣本訓練 zstd 字典: {output_path}")
+    return output_path
+
 def test_compression_support():
     """測試壓縮支援"""
     print("=" * 50)
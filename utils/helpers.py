@@ -26,6 +26,15 @@ def get_file_mtime(filepath):
         logging.error(f"存取檔案時發生 I/O 錯誤: {filepath}，錯誤: {e}")
         return "IOError"
 
+def format_ns(ns):
+    """
+    time.time_ns() 整數 -> 顯示用的本地時間字串；無效值回傳 'N/A'
+    """
+    try:
+        return datetime.fromtimestamp(ns / 1e9).strftime("%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError, OverflowError, OSError):
+        return 'N/A'
+
 def human_readable_size(num_bytes):
     """
     轉換檔案大小為人類可讀格式
@@ -64,19 +73,37 @@ def _baseline_key_for_path(filepath: str) -> str:
         return os.path.basename(filepath)
 
 
+# Excel 開啟檔案時產生的擁有者鎖檔（~$xxx.xlsx）前綴
+_TMP_PREFIX = '~$'
+
+# settings.SUPPORTED_EXTS 的小寫副檔名集合；設定於執行期可被改動，故以原 tuple 作鍵於需要時重建
+_supported_exts_cache = (None, frozenset())
+
+def supported_ext_set():
+    """
+    取得支援副檔名的小寫 frozenset，供 os.path.splitext(path)[1].lower() 查找
+    """
+    global _supported_exts_cache
+    exts = settings.SUPPORTED_EXTS
+    if _supported_exts_cache[0] is not exts:
+        _supported_exts_cache = (exts, frozenset(e.lower() for e in exts))
+    return _supported_exts_cache[1]
+
 def get_all_excel_files(folders):
     """
     獲取所有Excel檔案
     """
     all_files = []
+    ext_set = supported_ext_set()
+    splitext = os.path.splitext
     for folder in folders:
         if os.path.isfile(folder):
-            if folder.lower().endswith(settings.SUPPORTED_EXTS) and not os.path.basename(folder).startswith('~$'):
+            if splitext(folder)[1].lower() in ext_set and os.path.basename(folder)[:2] != _TMP_PREFIX:
                 all_files.append(folder)
         elif os.path.isdir(folder):
             for dirpath, _, filenames in os.walk(folder):
                 for f in filenames:
-                    if f.lower().endswith(settings.SUPPORTED_EXTS) and not f.startswith('~$'):
+                    if splitext(f)[1].lower() in ext_set and f[:2] != _TMP_PREFIX:
                         all_files.append(os.path.join(dirpath, f))
     return all_files
 
@@ -141,11 +168,14 @@ def timeout_handler():
     """
     超時處理器
     """
+    reported = set()  # 已提示過的 (檔案, 開始時間)，每次解析只提示一次
     while not settings.force_stop and not settings.baseline_completed:
         time.sleep(10)
-        if settings.current_processing_file and settings.processing_start_time:
-            elapsed = time.time() - settings.processing_start_time
+        processing = set(dict(settings.processing_files).items())
+        reported &= processing
+        now = time.time()
+        for path, started in processing - reported:
+            elapsed = now - started
             if elapsed > settings.FILE_TIMEOUT_SECONDS:
-                print(f"\n⏰ 檔案處理超時! (檔案: {settings.current_processing_file}, 已處理: {elapsed:.1f}s > {settings.FILE_TIMEOUT_SECONDS}s)")
-                settings.current_processing_file = None
-                settings.processing_start_time = None
\ No newline at end of file
+                print(f"\n⏰ 檔案處理超時! (檔案: {path}, 已處理: {elapsed:.1f}s > {settings.FILE_TIMEOUT_SECONDS}s)")
+                reported.add((path, started))
\ No newline at end of file
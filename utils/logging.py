@@ -3,6 +3,11 @@
 """
 import builtins
 import os
+import sys
+import atexit
+import logging
+import threading
+from collections import deque
 from datetime import datetime
 from io import StringIO
 from wcwidth import wcswidth, wcwidth
@@ -11,12 +16,21 @@ import config.settings as settings
 # 保存原始 print 函數
 _original_print = builtins.print
 
+# 輸出佇列：(時間戳, 訊息)；呼叫端只格式化並放入佇列，寫 stdout、純文字日誌與黑色 console 由背景執行緒按次序進行
+_print_queue = deque()
+# 可重入：輸出途中若再觸發 flush（例如 logging 的 filter），不會自我鎖死
+_print_lock = threading.RLock()
+_print_wakeup = threading.Event()
+_print_thread = None
+
 def timestamped_print(*args, **kwargs):
     """
-    帶時間戳的打印函數
+    帶時間戳的打印函數（非阻塞，實際輸出由背景執行緒完成）
     """
-    # 如果有 file=... 參數，直接用原生 print
+    global _print_thread
+    # 如果有 file=... 參數，直接用原生 print（先輸出佇列中較早的訊息，保持次序）
     if 'file' in kwargs:
+        flush_print_queue()
         _original_print(*args, **kwargs)
         return
 
@@ -26,7 +40,61 @@ def timestamped_print(*args, **kwargs):
     output_buffer.close()
 
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
+    _print_queue.append((timestamp, message))
+    if _print_thread is None:
+        with _print_lock:
+            if _print_thread is None:
+                _print_thread = threading.Thread(target=_print_worker, name="print-writer", daemon=True)
+                _print_thread.start()
+    _print_wakeup.set()
+
+def _print_worker():
+    """
+    背景執行緒：被喚醒時輸出佇列中的訊息
+    """
+    while True:
+        _print_wakeup.wait()
+        _print_wakeup.clear()
+        flush_print_queue()
+
+def flush_print_queue():
+    """
+    按次序輸出佇列中所有訊息（程式結束或需要與 input() 等直接輸出對齊時呼叫）
+    """
+    with _print_lock:
+        while _print_queue:
+            timestamp, message = _print_queue.popleft()
+            try:
+                _emit_print(timestamp, message)
+            except Exception as e:
+                # 輸出失敗時改寫到 stderr，訊息不會就此消失
+                try:
+                    _original_print(f"[{timestamp}] {message.rstrip()}", file=sys.__stderr__)
+                    _original_print(f"[{timestamp}] ⚠️ 輸出訊息失敗: {e!r}", file=sys.__stderr__)
+                except Exception:
+                    pass
+
+atexit.register(flush_print_queue)
+
+def prompt_input(prompt=''):
+    """
+    先輸出佇列中的訊息再等待使用者輸入，提示不會被較早的訊息蓋過或插在中間
+    """
+    flush_print_queue()
+    return input(prompt)
+
+class _FlushBeforeLog(logging.Filter):
+    """
+    logging 輸出前先清空打印佇列，錯誤訊息與之前的 print 保持次序
+    """
+    def filter(self, record):
+        flush_print_queue()
+        return True
+
+def _emit_print(timestamp, message):
+    """
+    實際輸出一則訊息：stdout、純文字日誌（若啟用）及黑色 console
+    """
     # 簡化邏輯：所有行都加時間戳記
     lines = message.rstrip().split('\n')
     timestamped_lines = []
@@ -131,6 +199,11 @@ def init_logging():
     初始化日誌系統
     """
     builtins.print = timestamped_print
+    # 確保 root logger 已有 handler（與首次呼叫 logging.error 時的預設設定相同），再於每個 handler 輸出前清空佇列
+    logging.basicConfig()
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, _FlushBeforeLog) for f in handler.filters):
+            handler.addFilter(_FlushBeforeLog())
 
 def wrap_text_with_cjk_support(text, width):
     """